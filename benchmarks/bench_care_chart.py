@@ -0,0 +1,74 @@
+"""
+Benchmark of core.care_chart (care chart progressions) against the original per-question Python loop.
+
+Histories are synthetic quiz submissions with 15 answers each in [-3, 3] (the quiz range), with unanswered questions
+and out of range linkIds mixed in. Cases: single charts of growing length, and cohorts of many clients
+(compute_cohort_progressions) compared to one loop per client.
+
+Usage (from repo root):
+    python benchmarks/bench_care_chart.py
+    python benchmarks/bench_care_chart.py --lengths 100 10000 --repeat 3
+
+Notes:
+    - Timings only: core/tests.py checks that both engines give the results of the original loop
+      (python manage.py test core).
+    - Without numpy installed, core.care_chart uses its pure Python engine (the speedup is ~1x).
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django
+django.setup()
+
+from core import care_chart
+from core.tests import build_submissions, original_progressions
+
+
+N_QUESTIONS = 15
+
+
+def measure(func, repeat: int) -> float:
+    """Median seconds per call."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 100, 1000], help="Check-ups per chart")
+    parser.add_argument("--cohorts", type=int, nargs="+", default=[100, 1000], help="Clients per cohort (50 check-ups each)")
+    parser.add_argument("--repeat", type=int, default=10, help="Calls measured per case")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"care_chart backend: {care_chart.BACKEND}\n")
+    rng = random.Random(args.seed)
+    print(f"{'case':<36}{'original loop':>16}{'care_chart':>14}{'speedup':>10}")
+
+    for length in args.lengths:
+        submissions = build_submissions(rng, length, N_QUESTIONS)
+        original = measure(lambda: original_progressions(submissions, N_QUESTIONS), args.repeat)
+        engine = measure(lambda: care_chart.compute_progressions(submissions, N_QUESTIONS), args.repeat)
+        print(f"{f'chart x{length} check-ups':<36}{original * 1e3:>13.3f} ms{engine * 1e3:>11.3f} ms{original / engine:>9.1f}x")
+
+    for n_clients in args.cohorts:
+        cohort = {f"patient-{i}": build_submissions(rng, 50, N_QUESTIONS) for i in range(n_clients)}
+        original = measure(lambda: [original_progressions(submissions, N_QUESTIONS) for submissions in cohort.values()], args.repeat)
+        engine = measure(lambda: care_chart.compute_cohort_progressions(cohort, N_QUESTIONS), args.repeat)
+        print(f"{f'cohort x{n_clients} clients':<36}{original * 1e3:>13.3f} ms{engine * 1e3:>11.3f} ms{original / engine:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Compare gunicorn worker classes (sync, gthread, gevent) on the app's views, to pick the production configuration from data.
+
+Each configuration is started with gunicorn.conf.py (overridden through GUNICORN_* env vars) against the FHIR server the
+environment is configured for, then loaded with concurrent requests. Prints throughput and latency percentiles per configuration.
+
+Usage (from repo root):
+    python benchmarks/bench_gunicorn_workers.py
+    python benchmarks/bench_gunicorn_workers.py --paths / /professional/dashboard --session-cookie <sessionid> --concurrency 32 --duration 30
+
+Notes:
+    - Authenticated views need a valid `sessionid` cookie of a user with the matching role.
+    - The gevent configuration is skipped if gevent is not installed.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+
+import requests
+
+
+CONFIGURATIONS = [
+    {"name": "sync", "GUNICORN_WORKER_CLASS": "sync"},
+    {"name": "gthread x8", "GUNICORN_WORKER_CLASS": "gthread", "GUNICORN_THREADS": "8"},
+    {"name": "gthread x16", "GUNICORN_WORKER_CLASS": "gthread", "GUNICORN_THREADS": "16"},
+    {"name": "gevent", "GUNICORN_WORKER_CLASS": "gevent", "GUNICORN_WORKER_CONNECTIONS": "100"},
+]
+
+
+def start_server(configuration: dict, port: int, workers: int) -> subprocess.Popen:
+    env = os.environ.copy()
+    env.update({key: value for key, value in configuration.items() if key.startswith("GUNICORN_")})
+    env["GUNICORN_BIND"] = f"127.0.0.1:{port}"
+    env["GUNICORN_WORKERS"] = str(workers)
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "core.wsgi:application", "--config", "gunicorn.conf.py", "--access-logfile", os.devnull],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    # Wait until the server accepts connections
+    for _ in range(100):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=10)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError(f"gunicorn ({configuration['name']}) did not start.")
+
+
+def run_load(base_url: str, paths: list, cookies: dict, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    def client(client_idx: int):
+        client_latencies, client_errors = [], 0
+        session = requests.Session()
+        i = client_idx
+        while time.monotonic() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                response = session.get(base_url + path, cookies=cookies, timeout=60, allow_redirects=False)
+                if response.status_code >= 500:
+                    client_errors += 1
+            except requests.RequestException:
+                client_errors += 1
+            client_latencies.append(time.perf_counter() - start)
+        return client_latencies, client_errors
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for client_latencies, client_errors in executor.map(client, range(concurrency)):
+            latencies.extend(client_latencies)
+            errors += client_errors
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 if latencies else float("nan")
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / duration,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else float("nan"),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paths", nargs="+", default=["/"], help="View paths to request (round-robin).")
+    parser.add_argument("--session-cookie", default=None, help="sessionid cookie for authenticated views.")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes for every configuration.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients.")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load per configuration.")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    cookies = {"sessionid": args.session_cookie} if args.session_cookie else {}
+
+    print(f"{'configuration':<14} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for configuration in CONFIGURATIONS:
+        if configuration["GUNICORN_WORKER_CLASS"] == "gevent" and find_spec("gevent") is None:
+            print(f"{configuration['name']:<14} skipped (gevent not installed)")
+            continue
+
+        process = start_server(configuration, args.port, args.workers)
+        try:
+            result = run_load(f"http://127.0.0.1:{args.port}", args.paths, cookies, args.concurrency, args.duration)
+        finally:
+            process.terminate()
+            process.wait()
+
+        print(
+            f"{configuration['name']:<14} {result['requests']:>9} {result['rps']:>8.1f} {result['p50_ms']:>8.0f} "
+            f"{result['p95_ms']:>8.0f} {result['p99_ms']:>8.0f} {result['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Microbenchmark of core.json_codec against stdlib json on FHIR bundles of realistic sizes.
+
+Bundles are synthetic but shaped like the app's real searches: QuestionnaireResponse bundles (quiz submissions with
+15 answers each, as loaded for care charts) and Practitioner bundles (homepage directory). Prints the median time per
+decode/encode call and the speedup of the codec over stdlib json.
+
+Usage (from repo root):
+    python benchmarks/bench_json_codec.py
+    python benchmarks/bench_json_codec.py --sizes 10 100 1000 --repeat 50
+
+Notes:
+    - "stdlib json (str)" is what requests' Response.json() did: decode bytes to str, then parse.
+    - Without orjson installed the codec falls back to stdlib json, so both columns measure the same thing.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django
+django.setup()
+
+from core import json_codec
+
+
+def build_questionnaire_response(i: int) -> dict:
+    return {
+        "resourceType": "QuestionnaireResponse",
+        "id": str(uuid.uuid4()),
+        "meta": {"versionId": "1", "lastUpdated": "2025-06-18T04:04:00.000+00:00"},
+        "questionnaire": "Questionnaire/skin-health-check-up",
+        "status": "completed",
+        "subject": {"reference": f"Patient/{uuid.uuid4()}"},
+        "author": {"reference": f"Practitioner/{uuid.uuid4()}"},
+        "authored": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00+00:00",
+        "item": [
+            {
+                "linkId": str(q + 1),
+                "text": f"Compared to your last check-up, how did your skin change regarding question {q + 1}? (é, ü, ç)",
+                "answer": [{"valueInteger": (i + q) % 7 - 3}],
+            }
+            for q in range(15)
+        ],
+    }
+
+
+def build_practitioner(i: int) -> dict:
+    return {
+        "resourceType": "Practitioner",
+        "id": str(uuid.uuid4()),
+        "meta": {"versionId": "3", "lastUpdated": "2025-06-18T04:04:00.000+00:00"},
+        "active": True,
+        "name": [{"prefix": ["Dr."], "given": [f"Given{i}"], "family": f"Family{i}"}],
+        "gender": "female",
+        "address": [{"text": "Skin clinic", "city": "Cairo", "country": "Egypt"}],
+        "telecom": [
+            {"system": "phone", "value": "+201000000000", "use": "mobile", "rank": 1},
+            {"system": "url", "value": "https://wa.me/+201000000000", "use": "mobile", "rank": 2},
+        ],
+        "photo": [{"url": f"https://example.com/photos/{i}.png"}],
+    }
+
+
+def build_bundle(build_resource, size: int) -> dict:
+    return {
+        "resourceType": "Bundle",
+        "type": "searchset",
+        "entry": [{"fullUrl": f"https://fhir.example.com/{i}", "resource": build_resource(i), "search": {"mode": "match"}} for i in range(size)],
+    }
+
+
+def measure(func, repeat: int) -> float:
+    """Median seconds per call."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Bundle sizes (number of entries)")
+    parser.add_argument("--repeat", type=int, default=30, help="Calls measured per case")
+    args = parser.parse_args()
+
+    print(f"json_codec backend: {json_codec.BACKEND}\n")
+    print(f"{'case':<42}{'KiB':>8}{'stdlib json (str)':>20}{'stdlib json (bytes)':>22}{'json_codec':>14}{'speedup':>10}")
+
+    for name, build_resource in [("QuestionnaireResponse", build_questionnaire_response), ("Practitioner", build_practitioner)]:
+        for size in args.sizes:
+            bundle = build_bundle(build_resource, size)
+            raw = json.dumps(bundle, ensure_ascii=False).encode("utf-8")
+
+            decode_str = measure(lambda: json.loads(raw.decode("utf-8")), args.repeat)
+            decode_bytes = measure(lambda: json.loads(raw), args.repeat)
+            decode_codec = measure(lambda: json_codec.loads(raw), args.repeat)
+            print(f"{f'decode {name} x{size}':<42}{len(raw) / 1024:>8.1f}{decode_str * 1e3:>17.3f} ms{decode_bytes * 1e3:>19.3f} ms{decode_codec * 1e3:>11.3f} ms{decode_str / decode_codec:>9.1f}x")
+
+            encode_stdlib = measure(lambda: json.dumps(bundle, ensure_ascii=False).encode("utf-8"), args.repeat)
+            encode_codec = measure(lambda: json_codec.dumps(bundle), args.repeat)
+            print(f"{f'encode {name} x{size}':<42}{len(raw) / 1024:>8.1f}{encode_stdlib * 1e3:>17.3f} ms{'-':>22}{encode_codec * 1e3:>11.3f} ms{encode_stdlib / encode_codec:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ from django.contrib.auth import get_user_model
 
 from django.utils.translation import gettext_lazy as _
 
+from . import utils
+
 # Drives the redirect logic on user login based on user's group (admin, professional, client, other)
 class MyAccountAdapter(DefaultAccountAdapter):
     def get_login_redirect_url(self, request):
@@ -16,11 +18,12 @@ class MyAccountAdapter(DefaultAccountAdapter):
         if not user.is_authenticated:
             return '/'
 
-        if user.groups.filter(name='admin').exists():
+        user_roles = utils.get_user_roles(user)
+        if 'admin' in user_roles:
             return reverse('admin_view')
-        elif user.groups.filter(name='professional').exists():
+        elif 'professional' in user_roles:
             return reverse('professional_dashboard')
-        elif user.groups.filter(name='client').exists():
+        elif 'client' in user_roles:
             return reverse('client_dashboard')
 
         return '/'  # fallback
@@ -1,7 +1,7 @@
 # core/admin.py
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User  # Import your custom user model
+from .models import User, FhirOutbox  # Import your custom user model
 
 # Register the custom user model with the admin site to be visible in Django control panel
 @admin.register(User)
@@ -10,3 +10,11 @@ class UserAdmin(BaseUserAdmin):
     fieldsets = BaseUserAdmin.fieldsets
     list_display = ('username', 'email', 'is_staff', 'is_active')
     search_fields = ('username', 'email')
+
+# Outbox of FHIR writes: check failed deliveries
+@admin.register(FhirOutbox)
+class FhirOutboxAdmin(admin.ModelAdmin):
+    list_display = ('resource_type', 'resource_id', 'subject_id', 'status', 'attempts', 'next_attempt_at', 'created_at', 'delivered_at')
+    list_filter = ('status', 'resource_type')
+    search_fields = ('resource_id', 'subject_id')
+
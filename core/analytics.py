@@ -0,0 +1,324 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+from .models import SyncWatermark, ClientOutcome, QuestionOutcome
+from . import fhir
+from . import fhir_transport
+from . import care_chart
+from . import questionnaires
+
+
+# ============================================================================
+# Outcome analytics
+# The `aggregate_outcomes` command (run on a schedule) streams the QuestionnaireResponses created or updated since its
+# last run (meta.lastUpdated watermark) and continues each affected client's care chart from its stored state, then
+# refreshes the per-professional, per-question aggregates of the professionals concerned. Each page of changes is
+# committed with the watermark, so an interrupted run resumes where it stopped. A run only reads changes older than
+# OUTCOME_ANALYTICS_SAFETY_LAG_SECONDS (newer ones may still become visible with an earlier meta.lastUpdated), and
+# holds a lease on its watermark row, so overlapping runs (e.g. a slow run and the next scheduled one) skip the job.
+# Check-ups authored before a client's latest processed one (late deliveries, edits) make that client's chart be
+# recomputed from its full history, and so are updated ones (meta.versionId > 1), which may have been counted already.
+# Deleted responses are not seen by _lastUpdated searches: run with --rebuild then.
+# ============================================================================
+
+OUTCOMES_WATERMARK_NAME = "outcome_analytics"
+
+
+class AggregationInProgressError(Exception):
+    """Another run holds the outcome aggregation lease."""
+
+
+def _parse_fhir_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=dt_timezone.utc) # Stored in UTC, with or without offset
+
+
+def _get_reference_id(resource: Dict, element: str) -> str:
+    return resource.get(element, {}).get("reference", "").split("/")[-1]
+
+
+def _get_client_history(patient_id: str, practitioner_id: str, questionnaire_title: str) -> List[Dict]:
+    """All QuestionnaireResponses of a client with a professional, sorted by authored datetime."""
+    history = [
+        questionnaire_response
+        for page in fhir.iter_questionnaire_responses_updated_since(
+            query_params={"subject": f"Patient/{patient_id}", "author": f"Practitioner/{practitioner_id}"}
+        )
+        for questionnaire_response in page
+        if questionnaire_response.get("questionnaire", "").endswith(f"/{questionnaire_title}") and questionnaire_response.get("authored")
+    ]
+    history.sort(key=lambda questionnaire_response: _parse_fhir_datetime(questionnaire_response["authored"]))
+    return history
+
+
+def _update_client_outcomes(questionnaire_responses: List[Dict], n_questions: int, questionnaire_title: str) -> Tuple[List[ClientOutcome], List[ClientOutcome], int]:
+    """
+    Continue (or recompute) the care charts of the clients concerned by newly changed QuestionnaireResponses.
+
+    Returns:
+        Tuple[List[ClientOutcome], List[ClientOutcome], int]: Outcomes to save, outcomes to delete (no check-up left)
+            and the number of clients recomputed from their full history.
+    """
+    responses_by_client = {}
+    for questionnaire_response in questionnaire_responses:
+        client_key = (_get_reference_id(questionnaire_response, "subject"), _get_reference_id(questionnaire_response, "author"))
+        responses_by_client.setdefault(client_key, []).append(questionnaire_response)
+
+    existing_outcomes = {
+        (outcome.patient_fhir_id, outcome.practitioner_fhir_id): outcome
+        for outcome in ClientOutcome.objects.filter(patient_fhir_id__in={patient_id for patient_id, _ in responses_by_client})
+    }
+
+    # Split clients whose new check-ups come after everything processed (continued from their state) from the others
+    new_responses_by_client, histories_by_client = {}, {}
+    for client_key, client_responses in responses_by_client.items():
+        client_responses.sort(key=lambda questionnaire_response: _parse_fhir_datetime(questionnaire_response["authored"]))
+        outcome = existing_outcomes.get(client_key)
+        if outcome and (
+            _parse_fhir_datetime(client_responses[0]["authored"]) <= outcome.last_authored
+            or any(questionnaire_response.get("meta", {}).get("versionId", "1") != "1" for questionnaire_response in client_responses) # Updated: may be counted already
+            or len(outcome.values) != n_questions # Questionnaire changed
+        ):
+            histories_by_client[client_key] = _get_client_history(*client_key, questionnaire_title)
+        else:
+            new_responses_by_client[client_key] = client_responses
+
+    new_deltas = {client_key: care_chart.get_answer_deltas(client_responses, n_questions) for client_key, client_responses in new_responses_by_client.items()}
+    history_deltas = {client_key: care_chart.get_answer_deltas(history, n_questions) for client_key, history in histories_by_client.items()}
+    initial_states = {
+        client_key: care_chart.ProgressionState(values=existing_outcomes[client_key].values, prev_deltas=existing_outcomes[client_key].prev_deltas)
+        for client_key in new_responses_by_client if client_key in existing_outcomes
+    }
+    progressions = care_chart.compute_cohort_progressions_from_deltas(new_deltas, n_questions, initial_states)
+    progressions.update(care_chart.compute_cohort_progressions_from_deltas(history_deltas, n_questions))
+
+    outcomes_to_save, outcomes_to_delete = [], []
+    for client_key, deltas, sorted_responses, n_previous_checkups in (
+        [(client_key, new_deltas[client_key], client_responses, getattr(existing_outcomes.get(client_key), "n_checkups", 0)) for client_key, client_responses in new_responses_by_client.items()]
+        + [(client_key, history_deltas[client_key], history, 0) for client_key, history in histories_by_client.items()]
+    ):
+        outcome = existing_outcomes.get(client_key) or ClientOutcome(patient_fhir_id=client_key[0], practitioner_fhir_id=client_key[1])
+        if not deltas:
+            if outcome.pk:
+                outcomes_to_delete.append(outcome)
+            continue
+
+        outcome.n_checkups = n_previous_checkups + len(deltas)
+        outcome.last_authored = _parse_fhir_datetime(sorted_responses[-1]["authored"])
+        outcome.values = [progression[-1] for progression in progressions[client_key]]
+        outcome.prev_deltas = deltas[-1]
+        outcomes_to_save.append(outcome)
+
+    return outcomes_to_save, outcomes_to_delete, len(histories_by_client)
+
+
+def _refresh_question_outcomes(practitioner_ids: Iterable[str], n_questions: int):
+    """Recompute the per-question aggregates of some professionals from their clients' outcomes."""
+    practitioner_ids = set(practitioner_ids)
+    INIT_VAL = settings.CARE_CHART_ANSWER_INITIAL_VAL
+
+    stats = {} # (practitioner_id, question_idx) -> QuestionOutcome
+    for practitioner_id, values in ClientOutcome.objects.filter(practitioner_fhir_id__in=practitioner_ids).values_list("practitioner_fhir_id", "values"):
+        for question_idx, value in enumerate(values[:n_questions]):
+            question_outcome = stats.get((practitioner_id, question_idx))
+            if question_outcome is None:
+                question_outcome = stats[(practitioner_id, question_idx)] = QuestionOutcome(practitioner_fhir_id=practitioner_id, question_idx=question_idx)
+            improvement = value - INIT_VAL
+            question_outcome.n_clients += 1
+            question_outcome.sum_improvement += improvement
+            question_outcome.n_improved += int(improvement > 0)
+            question_outcome.n_worsened += int(improvement < 0)
+
+    QuestionOutcome.objects.filter(practitioner_fhir_id__in=practitioner_ids).delete()
+    QuestionOutcome.objects.bulk_create(stats.values())
+
+
+def _acquire_lease(watermark: SyncWatermark) -> bool:
+    """Lease the job to this run (locked_until of its watermark row). False if another run holds it."""
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=settings.OUTCOME_ANALYTICS_LEASE_SECONDS)
+    acquired = SyncWatermark.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now), pk=watermark.pk
+    ).update(locked_until=locked_until)
+    watermark.locked_until = locked_until
+    return acquired == 1
+
+
+def _renew_lease(watermark: SyncWatermark, release: bool = False):
+    """
+    Extend (or release) this run's lease.
+
+    Raises:
+        AggregationInProgressError: The lease expired and another run took the job.
+    """
+    locked_until = None if release else timezone.now() + timedelta(seconds=settings.OUTCOME_ANALYTICS_LEASE_SECONDS)
+    if not SyncWatermark.objects.filter(pk=watermark.pk, locked_until=watermark.locked_until).update(locked_until=locked_until):
+        raise AggregationInProgressError("The outcome aggregation lease expired and another run took over.")
+    watermark.locked_until = locked_until
+
+
+def _save_watermark(watermark: SyncWatermark):
+    """
+    Save how far the run got, as long as it still holds the lease.
+
+    Raises:
+        AggregationInProgressError: Another run took the job (the caller's transaction rolls back).
+    """
+    saved = SyncWatermark.objects.filter(pk=watermark.pk, locked_until=watermark.locked_until).update(
+        last_updated=watermark.last_updated,
+        ids_at_last_updated=watermark.ids_at_last_updated,
+        updated_at=timezone.now(),
+    )
+    if not saved:
+        raise AggregationInProgressError("The outcome aggregation lease expired and another run took over.")
+
+
+@fhir_transport.priority(fhir_transport.FhirPriority.BULK)
+def aggregate_outcomes(rebuild: bool = False) -> Dict[str, int]:
+    """
+    Bring the outcome analytics tables up to date with the QuestionnaireResponses changed since the last run.
+
+    Args:
+        rebuild (bool): Drop all aggregates and the watermark first, and process every QuestionnaireResponse.
+
+    Returns:
+        Dict[str, int]: Counts of processed "responses", updated "clients" (of which "recomputed_clients" from their
+            full history) and "practitioners" whose aggregates were refreshed.
+
+    Raises:
+        AggregationInProgressError: Another run is in progress (nothing was done), or took over this one's expired lease.
+    """
+    questionnaire_title = settings.ACTIVE_QUESTIONNAIRE_TITLE
+    n_questions = len(questionnaires.get_questionnaire(questionnaire_title=questionnaire_title))
+
+    watermark, _ = SyncWatermark.objects.get_or_create(name=OUTCOMES_WATERMARK_NAME)
+    if not _acquire_lease(watermark):
+        raise AggregationInProgressError("Another outcome aggregation run is in progress.")
+    watermark.refresh_from_db(fields=["last_updated", "ids_at_last_updated"]) # As left by the previous run
+
+    until = timezone.now() - timedelta(seconds=settings.OUTCOME_ANALYTICS_SAFETY_LAG_SECONDS)
+    counts = {"responses": 0, "clients": 0, "recomputed_clients": 0}
+    refreshed_practitioner_ids = set()
+
+    try:
+        if rebuild:
+            with transaction.atomic():
+                ClientOutcome.objects.all().delete()
+                QuestionOutcome.objects.all().delete()
+                watermark.last_updated, watermark.ids_at_last_updated = None, []
+                _save_watermark(watermark)
+
+        ids_at_last_updated = set(watermark.ids_at_last_updated)
+        for page in fhir.iter_questionnaire_responses_updated_since(watermark.last_updated, until=until):
+            changed_responses = []
+            for questionnaire_response in page:
+                last_updated = questionnaire_response.get("meta", {}).get("lastUpdated")
+                last_updated = _parse_fhir_datetime(last_updated) if last_updated else None
+
+                if last_updated is not None:
+                    if last_updated == watermark.last_updated and questionnaire_response["id"] in ids_at_last_updated:
+                        continue # Processed by the previous run (the search includes the watermark's timestamp)
+                    if watermark.last_updated is None or last_updated > watermark.last_updated:
+                        watermark.last_updated = last_updated
+                        ids_at_last_updated = set()
+                    if last_updated == watermark.last_updated:
+                        ids_at_last_updated.add(questionnaire_response["id"])
+
+                if questionnaire_response.get("questionnaire", "").endswith(f"/{questionnaire_title}") and questionnaire_response.get("authored"):
+                    changed_responses.append(questionnaire_response)
+
+            outcomes_to_save, outcomes_to_delete, n_recomputed = _update_client_outcomes(changed_responses, n_questions, questionnaire_title)
+            practitioner_ids = {outcome.practitioner_fhir_id for outcome in outcomes_to_save + outcomes_to_delete}
+
+            now = timezone.now()
+            for outcome in outcomes_to_save:
+                outcome.updated_at = now # Not set by bulk_update
+
+            # Outcomes, aggregates and watermark of a page are saved together
+            _renew_lease(watermark)
+            with transaction.atomic():
+                watermark.ids_at_last_updated = sorted(ids_at_last_updated)
+                _save_watermark(watermark) # First: a run that lost its lease writes nothing
+
+                ClientOutcome.objects.bulk_create([outcome for outcome in outcomes_to_save if outcome.pk is None])
+                ClientOutcome.objects.bulk_update(
+                    [outcome for outcome in outcomes_to_save if outcome.pk is not None],
+                    fields=["n_checkups", "last_authored", "values", "prev_deltas", "updated_at"],
+                )
+                ClientOutcome.objects.filter(pk__in=[outcome.pk for outcome in outcomes_to_delete]).delete()
+                _refresh_question_outcomes(practitioner_ids, n_questions)
+
+            counts["responses"] += len(changed_responses)
+            counts["clients"] += len(outcomes_to_save) + len(outcomes_to_delete)
+            counts["recomputed_clients"] += n_recomputed
+            refreshed_practitioner_ids |= practitioner_ids
+
+        _save_watermark(watermark) # updated_at -> time of the last run
+        _renew_lease(watermark, release=True)
+    finally:
+        # Failed runs let the next one start right away (a no-op if the lease was released or lost)
+        if watermark.locked_until is not None:
+            SyncWatermark.objects.filter(pk=watermark.pk, locked_until=watermark.locked_until).update(locked_until=None)
+
+    counts["practitioners"] = len(refreshed_practitioner_ids)
+    return counts
+
+
+def get_outcomes_overview(questionnaire_questions: List[Dict]) -> Optional[Dict]:
+    """
+    Read the precomputed outcome aggregates for the admin dashboard (no FHIR call).
+
+    Args:
+        questionnaire_questions (List[Dict]): Questions of the active questionnaire (for their text).
+
+    Returns:
+        Optional[Dict]: None if the aggregation never ran. Otherwise {
+            "updated_at" (datetime): End of the last aggregation run,
+            "per_question" (List[dict]): {"question", "n_clients", "avg_improvement", "pct_improved", "pct_worsened"},
+            "per_practitioner" (List[dict]): {"practitioner_id", "n_clients", "avg_improvement"} (over all questions),
+        }
+    """
+    watermark = SyncWatermark.objects.filter(name=OUTCOMES_WATERMARK_NAME).first()
+    if watermark is None:
+        return None
+
+    per_question = []
+    for row in (
+        QuestionOutcome.objects.values("question_idx")
+        .annotate(total_clients=Sum("n_clients"), total_improvement=Sum("sum_improvement"), total_improved=Sum("n_improved"), total_worsened=Sum("n_worsened"))
+        .order_by("question_idx")
+    ):
+        if row["question_idx"] >= len(questionnaire_questions) or not row["total_clients"]:
+            continue
+        per_question.append({
+            "question": questionnaire_questions[row["question_idx"]]["q"],
+            "n_clients": row["total_clients"],
+            "avg_improvement": row["total_improvement"] / row["total_clients"],
+            "pct_improved": 100 * row["total_improved"] / row["total_clients"],
+            "pct_worsened": 100 * row["total_worsened"] / row["total_clients"],
+        })
+
+    per_practitioner = []
+    for row in (
+        QuestionOutcome.objects.values("practitioner_fhir_id")
+        .annotate(max_clients=Max("n_clients"), n_answers=Sum("n_clients"), total_improvement=Sum("sum_improvement"))
+        .order_by("practitioner_fhir_id")
+    ):
+        if not row["n_answers"]:
+            continue
+        per_practitioner.append({
+            "practitioner_id": row["practitioner_fhir_id"],
+            "n_clients": row["max_clients"], # Every client answers every question
+            "avg_improvement": row["total_improvement"] / row["n_answers"],
+        })
+
+    return {
+        "updated_at": watermark.updated_at,
+        "per_question": per_question,
+        "per_practitioner": per_practitioner,
+    }
@@ -4,12 +4,10 @@ from django.conf import settings
 class CoreAppConfig(AppConfig):
     name = 'core'
 
-    def ready(self):
-
-        from . import startup
+    # No FHIR calls on app startup: worker boot must not depend on the network.
+    # FHIR resources the app depends on are seeded once per deploy with `python manage.py seed_fhir`
 
-        # TODO: uncomment for production
-        #startup.init_quiz_questionnaire_fhir_resource()
-        
-        # TODO uncomment for production
-        # startup.init_platform_plans()
\ No newline at end of file
+    def ready(self):
+        from . import db, auth_backends
+        db.connect_signals() # Tune SQLite connections (WAL, busy timeout...) as they are created
+        auth_backends.connect_signals() # Drop cached users when they or their groups change
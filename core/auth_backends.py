@@ -0,0 +1,62 @@
+from allauth.account.auth_backends import AuthenticationBackend
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .models import User
+from . import utils
+from . import caching
+
+
+# ============================================================================
+# Cached authentication
+# AuthenticationMiddleware loads request.user through the session's backend on every request, and role checks
+# (is_professional, ...) then query the user's groups. Both are served from the cache instead: the user is cached
+# with its roles (and FHIR id, a field of the user) for settings.USER_CACHE_SECONDS, and dropped from the cache
+# whenever the user or its groups change.
+# Only with a cache shared by all workers (settings.USER_CACHE_SECONDS is 0 otherwise): invalidation must reach them all.
+# ============================================================================
+
+class CachedUserBackendMixin:
+    def get_user(self, user_id):
+        if settings.USER_CACHE_SECONDS <= 0: # No shared cache: read the user from the database on every request
+            return super().get_user(user_id)
+
+        user = cache.get(caching.get_user_cache_key(user_id))
+
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            utils.get_user_roles(user) # Load roles so they are cached with the user
+            cache.set(caching.get_user_cache_key(user_id), user, timeout=settings.USER_CACHE_SECONDS)
+
+        return user if self.user_can_authenticate(user) else None
+
+
+class CachedModelBackend(CachedUserBackendMixin, ModelBackend):
+    pass
+
+
+class CachedAllauthBackend(CachedUserBackendMixin, AuthenticationBackend):
+    pass
+
+
+def _invalidate_user(sender, instance, **kwargs):
+    caching.invalidate_cached_users([instance.pk])
+
+def _invalidate_user_groups(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse: # user.groups.add(...)
+        caching.invalidate_cached_users([instance.pk])
+    elif pk_set: # group.user_set.add(...)
+        caching.invalidate_cached_users(pk_set)
+    else: # group.user_set.clear(): affected users are unknown
+        caching.invalidate_cached_users(User.objects.filter(groups=instance).values_list("pk", flat=True))
+
+def connect_signals():
+    post_save.connect(_invalidate_user, sender=User, dispatch_uid="core.auth_backends.invalidate_user_on_save")
+    post_delete.connect(_invalidate_user, sender=User, dispatch_uid="core.auth_backends.invalidate_user_on_delete")
+    m2m_changed.connect(_invalidate_user_groups, sender=User.groups.through, dispatch_uid="core.auth_backends.invalidate_user_groups")
@@ -0,0 +1,196 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from . import fhir_transport
+
+
+# ============================================================================
+# Stale-while-revalidate
+# Serve the last good value immediately. Once it is older than `fresh_seconds`, one worker (holding a cache lock)
+# rebuilds it in a background thread while everybody keeps getting the stale value. If the rebuild fails
+# (e.g. FHIR unavailable) the stale value keeps being served. On a cold cache, the lock holder builds the value
+# while the other workers wait for it, so FHIR is never asked for it by every concurrent request.
+# The refresh time is kept under its own small key, so checking freshness never loads the (large) value.
+# ============================================================================
+
+def _get_refreshed_at_key(key: str) -> str:
+    return f"{key}:refreshed_at"
+
+
+def _get_lock_key(key: str) -> str:
+    return f"{key}:refresh_lock"
+
+
+def _store_value(key: str, value):
+    cache.set(key, {"value": value}, timeout=None)
+    cache.set(_get_refreshed_at_key(key), time.time(), timeout=None)
+
+
+def get_stale_while_revalidate(key: str, build, fresh_seconds: float, on_refreshed=None):
+    """
+    Args:
+        key (str): Cache key of the value.
+        build (callable): Builds the value (e.g. from FHIR). Only called synchronously if nothing was ever cached.
+        fresh_seconds (float): Age after which the value is refreshed in the background.
+        on_refreshed (callable, optional): Called after a background refresh stored a new value.
+
+    Returns:
+        The cached (possibly stale) value, or the freshly built one on a cold cache.
+
+    Raises:
+        TimeoutError: If the cache is cold and another worker building the value didn't finish within
+            STALE_WHILE_REVALIDATE_COLD_WAIT_SECONDS.
+    """
+    entry = cache.get(key)
+
+    if entry is None: # Cold cache: nothing to serve, build synchronously (one worker at a time)
+        return _build_cold(key, build)
+
+    refresh_if_stale(key, build, fresh_seconds, on_refreshed)
+    return entry["value"]
+
+
+def _build_cold(key: str, build):
+    lock_key = _get_lock_key(key)
+    wait_until = time.monotonic() + settings.STALE_WHILE_REVALIDATE_COLD_WAIT_SECONDS
+
+    while not cache.add(lock_key, 1, timeout=settings.STALE_WHILE_REVALIDATE_LOCK_SECONDS):
+        # Another worker is building it: wait for its value instead of building it too
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["value"]
+        if time.monotonic() > wait_until:
+            raise TimeoutError(f"'{key}' is being built by another worker and is not ready yet.")
+
+    try:
+        entry = cache.get(key) # Built by the previous lock holder while this worker was waiting for the lock
+        if entry is not None:
+            return entry["value"]
+        value = build()
+        _store_value(key, value)
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+def refresh_if_stale(key: str, build, fresh_seconds: float, on_refreshed=None):
+    """Start a background refresh of `key` if its value is older than `fresh_seconds` (without loading the value)."""
+    refreshed_at = cache.get(_get_refreshed_at_key(key), 0) # Missing (evicted) -> stale
+    if time.time() - refreshed_at > fresh_seconds:
+        refresh_in_background(key, build, on_refreshed)
+
+
+def mark_stale(key: str):
+    """Make the next get_stale_while_revalidate() of `key` start a background refresh (the stale value is still served)."""
+    cache.set(_get_refreshed_at_key(key), 0, timeout=None)
+
+
+def refresh_in_background(key: str, build, on_refreshed=None):
+    """
+    Rebuild the value of `key` in a daemon thread, unless another worker is already doing it.
+    """
+    lock_key = _get_lock_key(key)
+    if not cache.add(lock_key, 1, timeout=settings.STALE_WHILE_REVALIDATE_LOCK_SECONDS):
+        return # Someone else is refreshing -> no stampede
+
+    def refresh():
+        try:
+            with fhir_transport.priority(fhir_transport.FhirPriority.BACKGROUND), fhir_transport.deadline(settings.STALE_WHILE_REVALIDATE_LOCK_SECONDS):
+                value = build()
+            _store_value(key, value)
+            if on_refreshed:
+                on_refreshed()
+        except Exception as e:
+            print(f"! Background refresh of '{key}' failed, keep serving stale value: ", str(e))
+        finally:
+            cache.delete(lock_key)
+            connection.close() # Threads get their own DB connection, don't leak it
+
+    threading.Thread(target=refresh, name=f"refresh:{key}", daemon=True).start()
+
+
+# ============================================================================
+# Homepage professionals directory cache
+# The rendered directory is cached per language under a versioned key. Changing anything visible on the directory
+# bumps the version, which invalidates the entries of all languages at once without having to know them.
+# ============================================================================
+
+HOME_DIRECTORY_VERSION_KEY = "home_directory:version"
+HOME_DIRECTORY_DATA_KEY = "home_directory:data" # Professionals data behind the directory, served stale-while-revalidate
+
+
+def get_home_directory_version() -> int:
+    # Start from the current time (not 1) so entries of an evicted version key can never be served again
+    return cache.get_or_set(HOME_DIRECTORY_VERSION_KEY, int(time.time()), timeout=None)
+
+
+def get_home_directory_cache_key(language_code: str) -> str:
+    """
+    Args:
+        language_code (str): Language the directory is rendered in (e.g. "en", "ar").
+
+    Returns:
+        str: Cache key of the rendered homepage professionals directory for the language.
+    """
+    return f"home_directory:{language_code}:v{get_home_directory_version()}"
+
+
+def bump_home_directory_version():
+    """Invalidate the rendered homepage professionals directory of all languages."""
+    try:
+        cache.incr(HOME_DIRECTORY_VERSION_KEY)
+    except ValueError: # Version key missing or evicted -> nothing cached under a reachable key
+        cache.set(HOME_DIRECTORY_VERSION_KEY, int(time.time()), timeout=None)
+
+
+def invalidate_home_directory():
+    """
+    Invalidate the homepage professionals directory.
+    Call after any change visible on the directory (practitioner data, active status, clients plan).
+
+    The directory data is only marked stale: visitors keep getting the last good copy while it is refreshed in the
+    background, and the rendered directory is invalidated again once the refresh is done.
+    """
+    mark_stale(HOME_DIRECTORY_DATA_KEY)
+    bump_home_directory_version()
+
+
+# ============================================================================
+# Professional dashboard check-up summaries
+# Summaries need the full history of every client (progression is cumulative), so they are cached per professional
+# and invalidated when one of their clients' submissions is queued or given up on. "This month" is part of the key.
+# ============================================================================
+
+def get_care_summaries_cache_key(practitioner_id: str) -> str:
+    return f"care_summaries:{practitioner_id}:{datetime.now(timezone.utc):%Y-%m}"
+
+
+def invalidate_care_summaries(practitioner_id: str):
+    """Drop the cached check-up summaries of a professional's clients (call when one of their submissions changes)."""
+    cache.delete(get_care_summaries_cache_key(practitioner_id))
+
+
+# ============================================================================
+# Authenticated users cache
+# Logged in users are cached with their roles by core.auth_backends, so request.user and role checks don't query
+# the database. Anything updating users without save() (e.g. QuerySet.update) must invalidate them.
+# ============================================================================
+
+def get_user_cache_key(user_id) -> str:
+    return f"auth:user:{user_id}"
+
+
+def invalidate_cached_users(user_ids):
+    """
+    Drop users from the auth cache, so their next request reloads them (and their roles) from the database.
+
+    Args:
+        user_ids (Iterable): Primary keys of the users.
+    """
+    cache.delete_many([get_user_cache_key(user_id) for user_id in user_ids])
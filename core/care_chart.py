@@ -0,0 +1,264 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from django.conf import settings
+
+try:
+    import numpy as np # Optional: computes progressions of all questions (and all clients of a cohort) at once
+except ImportError:
+    np = None
+
+
+# ============================================================================
+# Care chart progressions
+# Each quiz answer is a delta on a question's scale, starting at CARE_CHART_ANSWER_INITIAL_VAL. A step is the delta,
+# except when both the previous and the current deltas are negative: then only the change between them counts
+# (worse by the difference if more negative, better by it if less negative). Values are clamped to
+# [CARE_CHART_ANSWER_MIN_VAL, CARE_CHART_ANSWER_MAX_VAL] after every step. The numpy engine computes all check-ups,
+# questions and clients at once. Without numpy the same rules run as plain Python loops, with identical results.
+# ============================================================================
+
+BACKEND = "numpy" if np is not None else "python"
+NUMPY_MIN_CHECKUPS = 12 # Single charts with fewer check-ups are faster in plain Python (numpy per-call overhead)
+
+
+def get_answer_deltas(sorted_submissions: List[dict], n_questions: int) -> List[List[int]]:
+    """
+    Read the answers (deltas) of quiz submissions.
+
+    Args:
+        sorted_submissions (List[dict]): QuestionnaireResponses sorted by authored date.
+        n_questions (int): Number of questions (linkIds "1".."n_questions").
+
+    Returns:
+        List[List[int]]: One row per submission, one delta per question. Unanswered questions are 0.
+    """
+    question_idx_by_link_id = {str(qid): qid - 1 for qid in range(1, n_questions + 1)} # Avoids int() per answer
+
+    deltas = []
+    for submission in sorted_submissions:
+        row = [0] * n_questions
+        for item in submission.get("item", []):
+            answer = item.get("answer")
+            if not answer:
+                continue
+            question_idx = question_idx_by_link_id.get(item["linkId"])
+            if question_idx is None: # Non canonical linkId (e.g. "01") or not a question of the chart
+                qid = int(item["linkId"])
+                if not 1 <= qid <= n_questions:
+                    continue
+                question_idx = qid - 1
+            row[question_idx] = answer[0].get("valueInteger", 0)
+        deltas.append(row)
+    return deltas
+
+
+class ProgressionState(NamedTuple):
+    """Where a chart stands after its last check-up: enough to continue it with newer check-ups only."""
+    values: List[int] # Progression value per question
+    prev_deltas: List[int] # Last answer (delta) per question
+
+
+def _compute_progressions_python(deltas: List[List[int]], n_questions: int, initial_state: Optional[ProgressionState] = None) -> List[List[int]]:
+    """Reference implementation: progressions of one chart, question by question and check-up by check-up."""
+    INIT_VAL = settings.CARE_CHART_ANSWER_INITIAL_VAL
+    MIN_VAL = settings.CARE_CHART_ANSWER_MIN_VAL
+    MAX_VAL = settings.CARE_CHART_ANSWER_MAX_VAL
+
+    progression_per_question = [[] for _ in range(n_questions)]
+    for i in range(n_questions):
+        current_value = initial_state.values[i] if initial_state else INIT_VAL
+        prev_delta = initial_state.prev_deltas[i] if initial_state else 0
+        for row in deltas:
+            delta = row[i]
+            step = delta - prev_delta if (prev_delta < 0 and delta < 0) else delta
+            new_value = max(0, min(MAX_VAL, max(MIN_VAL, current_value + step)))
+            progression_per_question[i].append(new_value)
+            current_value, prev_delta = new_value, delta
+
+    return progression_per_question
+
+
+def _compute_progressions_numpy(deltas, initial_values=None, initial_prev_deltas=None):
+    """
+    Progressions of many charts at once, vectorized over charts, check-ups and questions.
+
+    A step only depends on the answers, and "add the step, then clamp" is x -> min(H, max(L, x + s)). Such functions
+    compose into the same form, so the value after each check-up is a prefix composition, computed with a parallel
+    prefix scan in log2(n_checkups) array operations.
+
+    Args:
+        deltas (np.ndarray): (n_charts, n_checkups, n_questions) answers. Charts with fewer check-ups are zero padded
+            at the end (a check-up only depends on earlier ones, so padding doesn't change their values).
+        initial_values (np.ndarray): (n_charts, n_questions) values before the first check-up. Defaults to the initial value.
+        initial_prev_deltas (np.ndarray): (n_charts, n_questions) answers before the first check-up. Defaults to 0.
+
+    Returns:
+        np.ndarray: (n_charts, n_checkups, n_questions) progression values.
+    """
+    # Clamping to [MIN_VAL, MAX_VAL] then to >= 0 is one clamp to [max(MIN_VAL, 0), max(MAX_VAL, 0)]
+    low = max(settings.CARE_CHART_ANSWER_MIN_VAL, 0)
+    high = max(settings.CARE_CHART_ANSWER_MAX_VAL, 0)
+
+    prev_deltas = np.zeros_like(deltas)
+    prev_deltas[:, 1:, :] = deltas[:, :-1, :]
+    if initial_prev_deltas is not None:
+        prev_deltas[:, 0, :] = initial_prev_deltas
+    shifts = deltas - np.where((prev_deltas < 0) & (deltas < 0), prev_deltas, 0)
+    lows = np.full_like(deltas, low)
+    highs = np.full_like(deltas, high)
+
+    # Inclusive scan: after it, check-up t holds the composition of the functions of check-ups 0..t
+    offset = 1
+    n_checkups = deltas.shape[1]
+    while offset < n_checkups:
+        earlier = (shifts[:, :-offset], lows[:, :-offset], highs[:, :-offset])
+        later = (shifts[:, offset:], lows[:, offset:], highs[:, offset:])
+        composed_lows = np.clip(earlier[1] + later[0], later[1], later[2])
+        composed_highs = np.clip(earlier[2] + later[0], later[1], later[2])
+        composed_shifts = earlier[0] + later[0]
+        shifts[:, offset:], lows[:, offset:], highs[:, offset:] = composed_shifts, composed_lows, composed_highs
+        offset *= 2
+
+    if initial_values is None:
+        return np.clip(settings.CARE_CHART_ANSWER_INITIAL_VAL + shifts, lows, highs)
+    return np.clip(initial_values[:, None, :] + shifts, lows, highs)
+
+
+def compute_progressions(sorted_submissions: List[dict], n_questions: int) -> List[List[int]]:
+    """
+    Compute the care chart progression of every question.
+
+    Args:
+        sorted_submissions (List[dict]): QuestionnaireResponses sorted by authored date.
+        n_questions (int): Number of questions.
+
+    Returns:
+        List[List[int]]: One list per question, with one value per submission.
+    """
+    deltas = get_answer_deltas(sorted_submissions, n_questions)
+    if np is None or not deltas or len(deltas) < NUMPY_MIN_CHECKUPS or not n_questions:
+        return _compute_progressions_python(deltas, n_questions)
+
+    progressions = _compute_progressions_numpy(np.asarray(deltas, dtype=np.int64)[None, :, :])
+    return progressions[0].T.tolist()
+
+
+def compute_cohort_progressions(submissions_by_subject: Dict[str, List[dict]], n_questions: int) -> Dict[str, List[List[int]]]:
+    """
+    Compute the care chart progressions of many clients at once (e.g. all clients of a professional or a clinic).
+
+    Args:
+        submissions_by_subject (Dict[str, List[dict]]): Patient FHIR ID -> QuestionnaireResponses sorted by authored date.
+        n_questions (int): Number of questions.
+
+    Returns:
+        Dict[str, List[List[int]]]: Patient FHIR ID -> progressions as returned by compute_progressions.
+            Clients without submissions are left out.
+    """
+    deltas_by_subject = {
+        patient_id: get_answer_deltas(sorted_submissions, n_questions)
+        for patient_id, sorted_submissions in submissions_by_subject.items()
+        if sorted_submissions
+    }
+    return compute_cohort_progressions_from_deltas(deltas_by_subject, n_questions)
+
+
+def compute_cohort_progressions_from_deltas(
+    deltas_by_key: Dict[Any, List[List[int]]],
+    n_questions: int,
+    initial_states: Optional[Dict[Any, ProgressionState]] = None,
+) -> Dict[Any, List[List[int]]]:
+    """
+    Compute the progressions of many charts at once from their answers (see get_answer_deltas), optionally continuing
+    charts from where they stood (e.g. incremental aggregation of newly submitted check-ups only).
+
+    Args:
+        deltas_by_key (Dict[Any, List[List[int]]]): Chart key (e.g. Patient FHIR ID) -> answers, one row per check-up.
+        n_questions (int): Number of questions.
+        initial_states (Optional[Dict[Any, ProgressionState]]): State to continue from, per chart key. Charts without
+            one start from the initial value.
+
+    Returns:
+        Dict[Any, List[List[int]]]: Chart key -> one list per question, with one value per check-up. Charts without
+            check-ups are left out.
+    """
+    initial_states = initial_states or {}
+    deltas_by_key = {key: deltas for key, deltas in deltas_by_key.items() if deltas}
+    if np is None or not deltas_by_key or not n_questions:
+        return {
+            key: _compute_progressions_python(deltas, n_questions, initial_states.get(key))
+            for key, deltas in deltas_by_key.items()
+        }
+
+    keys = list(deltas_by_key)
+    lengths = np.array([len(deltas_by_key[key]) for key in keys])
+    padded_deltas = np.zeros((len(keys), lengths.max(), n_questions), dtype=np.int64)
+    for idx, key in enumerate(keys):
+        padded_deltas[idx, :lengths[idx], :] = deltas_by_key[key]
+
+    initial_values = initial_prev_deltas = None
+    if initial_states:
+        initial_values = np.full((len(keys), n_questions), settings.CARE_CHART_ANSWER_INITIAL_VAL, dtype=np.int64)
+        initial_prev_deltas = np.zeros((len(keys), n_questions), dtype=np.int64)
+        for idx, key in enumerate(keys):
+            if key in initial_states:
+                initial_values[idx] = initial_states[key].values
+                initial_prev_deltas[idx] = initial_states[key].prev_deltas
+
+    progressions = _compute_progressions_numpy(padded_deltas, initial_values, initial_prev_deltas)
+    return {
+        key: progressions[idx, :lengths[idx], :].T.tolist()
+        for idx, key in enumerate(keys)
+    }
+
+
+# ============================================================================
+# Downsampling
+# Long histories are reduced to a bounded number of points with Largest-Triangle-Three-Buckets (LTTB): one point per
+# bucket, the one making the largest triangle with the previous kept point and the next bucket's average. This keeps
+# peaks, dips and trend changes that averaging would flatten. First and last check-ups are always kept.
+# ============================================================================
+
+def lttb_indices(values: List[float], n_out: int) -> List[int]:
+    """
+    Select the indices of the points to keep from a series (x is the point position, as on the chart's category axis).
+
+    Args:
+        values (List[float]): The series.
+        n_out (int): Number of points to keep. Values below 3 or above len(values) keep every point.
+
+    Returns:
+        List[int]: Sorted indices of the kept points.
+    """
+    n = len(values)
+    if n_out < 3 or n_out >= n:
+        return list(range(n))
+
+    # Points 1..n-2 are split into n_out - 2 buckets. The last bucket's end is exact, whatever the float rounding
+    n_buckets = n_out - 2
+    bucket_size = (n - 2) / n_buckets
+    bucket_ends = [int((bucket + 1) * bucket_size) + 1 for bucket in range(n_buckets - 1)] + [n - 1, n]
+
+    indices = [0]
+    a = 0 # Last kept point
+    for bucket in range(n_buckets):
+        start = bucket_ends[bucket - 1] if bucket else 1
+        end = bucket_ends[bucket]
+        next_end = bucket_ends[bucket + 1]
+
+        # Average point of the next bucket (the last point for the last bucket)
+        avg_x = (end + next_end - 1) / 2
+        avg_y = sum(values[end:next_end]) / (next_end - end)
+
+        a_y = values[a]
+        best_idx, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((a - avg_x) * (values[j] - a_y) - (a - j) * (avg_y - a_y))
+            if area > best_area:
+                best_idx, best_area = j, area
+
+        indices.append(best_idx)
+        a = best_idx
+
+    indices.append(n - 1)
+    return indices
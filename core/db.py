@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """
+    Apply settings.SQLITE_PRAGMAS to each new SQLite connection (connected in CoreAppConfig.ready).
+    Connections to other databases are left untouched.
+
+    Args:
+        sender: Database wrapper class (unused).
+        connection: Django database connection that was just created.
+    """
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value};")
+
+
+def connect_signals():
+    connection_created.connect(configure_sqlite_connection, dispatch_uid="core.db.configure_sqlite_connection")
@@ -6,14 +6,24 @@ from django.shortcuts import redirect
 import json
 from decimal import Decimal
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import uuid
+import copy
+import base64
+import contextlib
+import contextvars
+from dataclasses import dataclass, fields
+from collections.abc import Mapping
 import requests
 from urllib.parse import urlencode
 
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, NamedTuple, Any, Iterator
 
 from .utils import create_fhir_resource_user, email_exists, get_fhir_resource_extension_value
+from . import fhir_transport
+from . import caching
+from . import fhir_mirror
+from . import json_codec
 
 from azure.identity import ClientSecretCredential
 from django.core.cache import cache
@@ -71,19 +81,22 @@ def get_access_token() -> str:
     return token.token
 
 # ============================================================================
-# FHIR Practitioner
+# FHIR Batch
 # ============================================================================
 
-def list_practitioners(only_active: bool = True) -> list:
+def submit_batch(entries: List[Dict], idempotent: bool = False) -> List[Dict]:
     """
-    Retrieve a list of Practitioner resources from Azure Healthcare FHIR service,
-    optionally filtered by active status.
+    Submit several FHIR interactions in one batch Bundle (a single HTTP round-trip).
+    Entries of a batch are processed independently: one failing entry doesn't roll back the others.
 
     Args:
-        only_active (bool): If True, only return active practitioners.
+        entries (List[Dict]): Bundle entries, each with a "request" ({"method", "url", optional "ifNoneExist"/"ifMatch"})
+            and an optional "resource".
+        idempotent (bool): True if every entry is safe to replay (PUT-by-id, conditional creates), which allows automatic retries.
 
     Returns:
-        list: A list of dictionaries, each representing a Practitioner.
+        List[Dict]: Response entries in the same order as `entries`. Each has a "response" ({"status": "201 Created", ..})
+            and optionally the resulting "resource".
     """
     access_token = get_access_token()
     headers = {
@@ -92,50 +105,455 @@ def list_practitioners(only_active: bool = True) -> list:
         "Accept": "application/fhir+json",
     }
 
-    # GET all Practitioner resources
-    response = requests.get(
-        f"{settings.AZURE_FHIR_SERVICE_URL}/Practitioner",
+    bundle = {
+        "resourceType": "Bundle",
+        "type": "batch",
+        "entry": entries,
+    }
+
+    response = fhir_transport.post(
+        settings.AZURE_FHIR_SERVICE_URL,
+        json=bundle,
+        headers=headers,
+        idempotent=idempotent,
+    )
+    response.raise_for_status()
+
+    return response.json().get("entry", [])
+
+def is_batch_entry_successful(response_entry: Dict) -> bool:
+    """Check the HTTP status (e.g. "201 Created") of a batch response entry."""
+    status = response_entry.get("response", {}).get("status", "")
+    return status[:1] == "2"
+
+# ============================================================================
+# FHIR paged search
+# Searches that need all their results follow the Bundle "next" links, one page (up to FHIR_SEARCH_PAGE_SIZE
+# resources) per request, so callers can process results page by page without holding them all.
+# ============================================================================
+
+def iter_search_pages(resource_type: str, query_params: Dict) -> Iterator[List[Dict]]:
+    """
+    Run a FHIR search and yield its matches page by page.
+
+    Args:
+        resource_type (str): Searched resource type (e.g. "QuestionnaireResponse").
+        query_params (Dict): Search parameters. "_count" defaults to settings.FHIR_SEARCH_PAGE_SIZE.
+
+    Yields:
+        List[Dict]: Matching resources of one page, in the search's sort order.
+    """
+    query_params = {"_count": settings.FHIR_SEARCH_PAGE_SIZE, **query_params}
+    url = f"{settings.AZURE_FHIR_SERVICE_URL}/{resource_type}?{urlencode(query_params, doseq=True)}"
+    for bundle in _iter_bundle_pages(url):
+        yield [
+            entry["resource"] for entry in bundle.get("entry", [])
+            if "resource" in entry and entry.get("search", {}).get("mode", "match") == "match"
+        ]
+
+def _iter_bundle_pages(url: str) -> Iterator[Dict]:
+    """GET a searchset/history Bundle and the pages after it (Bundle "next" links)."""
+    access_token = get_access_token()
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/fhir+json"
+    }
+
+    while url:
+        response = fhir_transport.get(url, headers=headers)
+        response.raise_for_status()
+        bundle = response.json()
+
+        yield bundle
+
+        url = next((link["url"] for link in bundle.get("link", []) if link.get("relation") == "next"), None)
+
+# ============================================================================
+# FHIR read mirror sync
+# Brings the local mirror (core.fhir_mirror) of a resource type up to date from its _history since the last sync:
+# every version created, updated or deleted at or after the watermark. Versions are stored page by page, in any
+# order (only the newest version of a resource is kept). The watermark moves, and the mirror counts as synced from
+# the run's start time, only when the whole history was read, so an interrupted run is simply done again.
+# ============================================================================
+
+def iter_history_pages(resource_type: str, since: Optional[datetime] = None) -> Iterator[List[Dict]]:
+    """
+    Read the history of all resources of a type, page by page.
+
+    Args:
+        resource_type (str): e.g. "Practitioner".
+        since (Optional[datetime]): Only versions created at or after this (None -> whole history).
+
+    Yields:
+        List[Dict]: History entries of one page. Each has a "request" ({"method", "url"}) and, unless it is a
+            deletion, the version's "resource".
+    """
+    query_params = {"_count": settings.FHIR_SEARCH_PAGE_SIZE}
+    if since is not None:
+        query_params["_since"] = since.isoformat()
+
+    url = f"{settings.AZURE_FHIR_SERVICE_URL}/{resource_type}/_history?{urlencode(query_params)}"
+    for bundle in _iter_bundle_pages(url):
+        yield bundle.get("entry", [])
+
+@fhir_transport.priority(fhir_transport.FhirPriority.BULK)
+def sync_mirror(resource_type: str, rebuild: bool = False) -> Dict[str, int]:
+    """
+    Apply the changes of a resource type since its last sync to the local mirror.
+
+    Args:
+        resource_type (str): One of settings.FHIR_MIRROR_RESOURCE_TYPES.
+        rebuild (bool): Drop the mirrored resources of the type first and read its whole history.
+
+    Returns:
+        Dict[str, int]: Counts of read history "versions", of those "stored" (newer than the mirrored ones) and of
+            stored "deletions".
+    """
+    if rebuild:
+        fhir_mirror.clear(resource_type)
+
+    started_at = datetime.now(timezone.utc)
+    since = fhir_mirror.get_synced_until(resource_type)
+    newest = since
+    counts = {"versions": 0, "stored": 0, "deletions": 0}
+
+    for history_entries in iter_history_pages(resource_type, since):
+        page_counts, page_newest = fhir_mirror.apply_history_entries(resource_type, history_entries)
+        for key, count in page_counts.items():
+            counts[key] += count
+        if page_newest is not None and (newest is None or page_newest > newest):
+            newest = page_newest
+
+    # Changes of the last FHIR_MIRROR_SAFETY_LAG_SECONDS are read again by the next sync: concurrent FHIR writes may
+    # become visible out of lastUpdated order (versions already stored are skipped)
+    if newest is not None:
+        newest = min(newest, started_at - timedelta(seconds=settings.FHIR_MIRROR_SAFETY_LAG_SECONDS))
+    fhir_mirror.mark_synced(resource_type, synced_until=newest, synced_at=started_at)
+
+    if resource_type == "Practitioner" and counts["stored"]:
+        caching.invalidate_home_directory() # Practitioners changed outside this app (or by another replica)
+
+    return counts
+
+# ============================================================================
+# Request-scoped identity map
+# Within an identity map scope (opened per request by core.middleware.FhirIdentityMapMiddleware), a resource read
+# by ID is fetched from FHIR once and reused by later reads, and writes store the server's version of the resource.
+# Callers get their own deep copy, so mutating a returned resource never changes the map.
+# Outside a scope (management commands, background threads) every read goes to FHIR.
+# ============================================================================
+
+_identity_map: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("fhir_identity_map", default=None)
+
+@contextlib.contextmanager
+def identity_map_scope():
+    """Open a (fresh) identity map for the FHIR reads and writes made inside the `with` block."""
+    token = _identity_map.set({})
+    try:
+        yield
+    finally:
+        _identity_map.reset(token)
+
+def _get_from_identity_map(resource_type: str, resource_id: str) -> Optional[Dict]:
+    identity_map = _identity_map.get()
+    if identity_map is None or (resource_type, resource_id) not in identity_map:
+        return None
+    return copy.deepcopy(identity_map[(resource_type, resource_id)])
+
+def _add_to_identity_map(resource: Dict):
+    identity_map = _identity_map.get()
+    if identity_map is None or "id" not in resource or resource.get("resourceType") == "Bundle":
+        return
+    identity_map[(resource["resourceType"], resource["id"])] = copy.deepcopy(resource)
+
+def _remove_from_identity_map(resource_type: str, resource_id: str):
+    identity_map = _identity_map.get()
+    if identity_map is not None:
+        identity_map.pop((resource_type, resource_id), None)
+
+# ============================================================================
+# Conditional updates (JSON Patch)
+# Edits send only the changed elements in one PATCH request instead of GET + full PUT. With the version the user
+# edited (meta.versionId) as If-Match, a concurrent change is detected (412) instead of silently overwritten.
+# ============================================================================
+
+class FhirConflictError(Exception):
+    """Raised when a resource changed on the FHIR server since the version an update was based on (If-Match failed)."""
+
+
+def _refresh_mirrored_resource(resource_type: str, resource_id: str):
+    """
+    Store the current version of a mirrored resource, read from FHIR. Called after a conflicting update: the edit form
+    may have been loaded from an outdated mirrored version, and the reloaded form must get the current one.
+    """
+    if not fhir_mirror.is_mirrored(resource_type):
+        return
+
+    access_token = get_access_token()
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/fhir+json",
+    }
+    try:
+        response = fhir_transport.get(f"{settings.AZURE_FHIR_SERVICE_URL}/{resource_type}/{resource_id}", headers=headers)
+        response.raise_for_status()
+        fhir_mirror.store_resource(response.json())
+    except requests.RequestException as e:
+        print(f"! Refresh of mirrored {resource_type}/{resource_id} failed (the next sync stores its current version): ", str(e))
+
+
+def patch_resource(resource_type: str, resource_id: str, operations: List[Dict], version_id: Optional[str] = None) -> Dict:
+    """
+    Apply a JSON Patch to a resource.
+
+    Args:
+        resource_type (str): e.g. "Practitioner".
+        resource_id (str): FHIR resource ID.
+        operations (List[Dict]): JSON Patch operations, e.g. [{"op": "add", "path": "/active", "value": False}].
+            "add" on a top-level element sets it whether or not it exists.
+        version_id (Optional[str]): meta.versionId the change is based on. If set, the update only applies to that version.
+
+    Returns:
+        Dict: The updated resource.
+
+    Raises:
+        FhirConflictError: If the resource was changed since `version_id`.
+        requests.HTTPError: If the update fails otherwise.
+    """
+    access_token = get_access_token()
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json-patch+json",
+        "Accept": "application/fhir+json",
+    }
+    if version_id:
+        headers["If-Match"] = f'W/"{version_id}"'
+
+    response = fhir_transport.patch(
+        f"{settings.AZURE_FHIR_SERVICE_URL}/{resource_type}/{resource_id}",
         headers=headers,
+        json=operations,
+        idempotent=not version_id, # Replaying a versioned patch after success would fail If-Match
     )
+
+    if response.status_code in (409, 412):
+        _remove_from_identity_map(resource_type, resource_id)
+        _refresh_mirrored_resource(resource_type, resource_id)
+        raise FhirConflictError(f"{resource_type}/{resource_id} was changed by someone else since version {version_id}.")
     response.raise_for_status()
-    practitioner_entries = response.json().get("entry", [])
+
+    updated_resource = response.json()
+    _add_to_identity_map(updated_resource) # Later reads in this request see the written version
+    fhir_mirror.remember_written(updated_resource) # .. and so do reads served by the mirror
+    return updated_resource
+
+
+def set_resource_active(resource_type: str, resource_id: str, active: bool) -> Dict:
+    """Set the 'active' flag of a Practitioner/Patient in one small PATCH (no read, nothing else overwritten)."""
+    return patch_resource(resource_type, resource_id, [{"op": "add", "path": "/active", "value": active}])
+
+
+def set_resources_active(resource_type: str, resource_ids: List[str], active: bool) -> Dict[str, bool]:
+    """
+    Set the 'active' flag of many Practitioners/Patients with JSON Patch entries of batch Bundles
+    (one request per FHIR_BATCH_MAX_ENTRIES resources instead of one per resource).
+
+    Args:
+        resource_type (str): "Practitioner" or "Patient".
+        resource_ids (List[str]): FHIR resource IDs. Duplicates are ignored.
+        active (bool): New value of 'active'.
+
+    Returns:
+        Dict[str, bool]: Per resource ID (in the given order): True if it was updated, False if its entry failed
+            (e.g. not found). Entries of a batch succeed or fail independently.
+
+    Raises:
+        requests.HTTPError: If a whole batch is rejected.
+    """
+    resource_ids = list(dict.fromkeys(resource_ids))
+    # JSON Patch inside a Bundle is sent as a Binary resource holding the base64 encoded patch document
+    patch_data = base64.b64encode(json_codec.dumps([{"op": "add", "path": "/active", "value": active}])).decode("ascii")
+
+    results = {}
+    batch_size = settings.FHIR_BATCH_MAX_ENTRIES
+    for start in range(0, len(resource_ids), batch_size):
+        batch_ids = resource_ids[start:start + batch_size]
+        entries = [
+            {
+                "resource": {"resourceType": "Binary", "contentType": "application/json-patch+json", "data": patch_data},
+                "request": {"method": "PATCH", "url": f"{resource_type}/{resource_id}"},
+            }
+            for resource_id in batch_ids
+        ]
+        # Setting a fixed value can be replayed safely
+        response_entries = submit_batch(entries, idempotent=True)
+
+        for i, resource_id in enumerate(batch_ids):
+            response_entry = response_entries[i] if i < len(response_entries) else {}
+            results[resource_id] = is_batch_entry_successful(response_entry)
+            if results[resource_id] and response_entry.get("resource"):
+                _add_to_identity_map(response_entry["resource"])
+                fhir_mirror.remember_written(response_entry["resource"])
+            else:
+                _remove_from_identity_map(resource_type, resource_id)
+
+    return results
+
+# ============================================================================
+# Listing rows
+# Compact rows (slotted dataclasses) built in a single pass over each resource by list_practitioners/list_patients.
+# They are read-only Mappings of their fields, with item assignment (row["key"] = ..), so code written for the
+# dicts they replace keeps working. dict(row) gives a plain dict (e.g. for Django's json_script filter).
+# ============================================================================
+
+class _MappingRowMixin(Mapping):
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return (field.name for field in fields(self))
+
+    def __len__(self) -> int:
+        return len(fields(self))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+
+@dataclass(slots=True)
+class PractitionerRow(_MappingRowMixin):
+    practitioner_id: Optional[str]
+    title: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    full_name: str
+    gender: Optional[str]
+    organization_name: Optional[str]
+    organization_city: Optional[str]
+    organization_country: Optional[str]
+    phone_number: str
+    whatsapp_number: str
+    photo_url: Optional[str]
+    active: Optional[bool]
+    # Set by the homepage directory (views.get_home_professionals)
+    clients_plan: Optional[Dict] = None
+    rating: Optional[str] = None
+    n_reviews: Optional[int] = None
+
+
+@dataclass(slots=True)
+class PatientRow(_MappingRowMixin):
+    patient_id: Optional[str]
+    title: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    full_name: str
+    gender: Optional[str]
+    birth_date: Optional[str]
+    phone_number: str
+    whatsapp_number: str
+    practitioner_fhir_id: Optional[str]
+    active: Optional[bool]
+    # Set by the professional dashboard (utils.get_clients_care_summaries)
+    last_checkup: Optional[str] = None
+    n_checkups_this_month: int = 0
+    trend: Optional[str] = None
+
+
+def _extract_name(resource: Dict):
+    """Returns (title, first_name, last_name, full_name) of the first name of a Practitioner/Patient resource."""
+    names = resource.get("name")
+    name = names[0] if names else {}
+    prefixes, given = name.get("prefix"), name.get("given")
+    title = prefixes[0] if prefixes else None
+    first_name = given[0] if given else None
+    last_name = name.get("family")
+    full_name = " ".join(part for part in (title, first_name, last_name) if part)
+    return title, first_name, last_name, full_name
+
+def _extract_phone_and_whatsapp_numbers(resource: Dict):
+    """Returns (phone_number, whatsapp_number) from telecom: phone is ranked first and the WhatsApp link second."""
+    telecom = resource.get("telecom") or []
+    phone_number = telecom[0].get("value", "") if len(telecom) > 0 else ""
+
+    whatsapp_number = ""
+    if len(telecom) > 1:
+        whatsapp_link = telecom[1].get("value", "")
+        if whatsapp_link:
+            whatsapp_number = whatsapp_link.split("https://wa.me/")[-1]  # Extract number from WhatsApp link
+
+    return phone_number, whatsapp_number
+
+# ============================================================================
+# FHIR Practitioner
+# ============================================================================
+
+def list_practitioners(only_active: bool = True) -> list:
+    """
+    Retrieve a list of Practitioner resources from Azure Healthcare FHIR service,
+    optionally filtered by active status.
+
+    Args:
+        only_active (bool): If True, only return active practitioners.
+
+    Returns:
+        List[PractitionerRow]: One row per Practitioner.
+    """
+    practitioner_resources = fhir_mirror.list_resources("Practitioner")
+    if practitioner_resources is None: # Mirror disabled or not synced recently enough
+        access_token = get_access_token()
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/fhir+json",
+            "Accept": "application/fhir+json",
+        }
+
+        # GET all Practitioner resources
+        response = fhir_transport.get(
+            f"{settings.AZURE_FHIR_SERVICE_URL}/Practitioner",
+            headers=headers,
+        )
+        response.raise_for_status()
+        practitioner_resources = [entry.get("resource", {}) for entry in response.json().get("entry", [])]
 
     # Filter and transform practitioners
     practitioners = []
-    for entry in practitioner_entries:
-        resource = entry.get("resource", {})
+    for resource in practitioner_resources:
         if only_active and not resource.get("active", True):
             continue
 
         # Extract required fields
-
-        telecom = resource.get("telecom", [])
-        phone_number = ""
-        if len(telecom) > 0:
-            phone_number = telecom[0].get("value", "")
-            
-        whatsapp_link, whatsapp_number = "", ""
-        if len(telecom) > 1:
-            whatsapp_link = telecom[1].get("value", "")
-            if not whatsapp_link == "":
-                whatsapp_number = whatsapp_link.split("https://wa.me/")[-1]  # Extract number from WhatsApp link
-
-        practitioner_data = {
-            "practitioner_id": resource.get("id"),
-            "title": resource.get("name", [{}])[0].get("prefix", [None])[0],
-            "first_name": resource.get("name", [{}])[0].get("given", [None])[0],
-            "last_name": resource.get("name", [{}])[0].get("family"),
-            "full_name": resource.get("name", [{}])[0].get("prefix", [None])[0] + " " + resource.get("name", [{}])[0].get("given", [None])[0] + " " + resource.get("name", [{}])[0].get("family"),
-            "gender": resource.get("gender"),
-            "organization_name": resource.get("address", [{}])[0].get("text"),
-            "organization_city": resource.get("address", [{}])[0].get("city"),
-            "organization_country": resource.get("address", [{}])[0].get("country"),
-            "phone_number": phone_number,
-            "whatsapp_number": whatsapp_number,
-            "photo_url": resource.get("photo", [{}])[0].get("url"),
-            "active": resource.get("active"),
-        }
-        practitioners.append(practitioner_data)
+        title, first_name, last_name, full_name = _extract_name(resource)
+        phone_number, whatsapp_number = _extract_phone_and_whatsapp_numbers(resource)
+        addresses, photos = resource.get("address"), resource.get("photo")
+        address = addresses[0] if addresses else {}
+
+        practitioners.append(PractitionerRow(
+            practitioner_id=resource.get("id"),
+            title=title,
+            first_name=first_name,
+            last_name=last_name,
+            full_name=full_name,
+            gender=resource.get("gender"),
+            organization_name=address.get("text"),
+            organization_city=address.get("city"),
+            organization_country=address.get("country"),
+            phone_number=phone_number,
+            whatsapp_number=whatsapp_number,
+            photo_url=photos[0].get("url") if photos else None,
+            active=resource.get("active"),
+        ))
 
     return practitioners
 
@@ -149,6 +567,15 @@ def get_practitioner(practitioner_id: str) -> Dict:
     Returns:
         Dict: JSON response from FHIR server (Practitioner resource).
     """
+    practitioner = _get_from_identity_map("Practitioner", practitioner_id)
+    if practitioner is not None: # Already read (or written) during this request
+        return practitioner
+
+    practitioner = fhir_mirror.get_resource("Practitioner", practitioner_id)
+    if practitioner is not None:
+        _add_to_identity_map(practitioner)
+        return practitioner
+
     access_token = get_access_token()
     headers = {
         "Authorization": f"Bearer {access_token}",
@@ -157,13 +584,15 @@ def get_practitioner(practitioner_id: str) -> Dict:
     }
 
     # GET Practitioner resource by ID
-    response = requests.get(
+    response = fhir_transport.get(
         f"{settings.AZURE_FHIR_SERVICE_URL}/Practitioner/{practitioner_id}",
         headers=headers,
     )
     response.raise_for_status()  # Raises HTTPError if status >= 400
 
-    return response.json()
+    practitioner = response.json()
+    _add_to_identity_map(practitioner)
+    return practitioner
 
 
 def create_practitioner(
@@ -203,17 +632,10 @@ def create_practitioner(
     if email_exists(email):
         raise ValueError(f"Email {email} is already registered for another user.")
 
-    # Get access token and prepare headers to connect to Azure FHIR
-    access_token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/fhir+json",
-        "Accept": "application/fhir+json",
-    }
-
-    # Prepare FHIR Practitioner resource JSON body
+    # Prepare FHIR Practitioner resource JSON body. The ID is assigned here so the create is a PUT, safe to retry
     practitioner_payload = {
         "resourceType": "Practitioner",
+        "id": str(uuid.uuid4()),
         "name": [
             {
                 "prefix": [title],
@@ -255,14 +677,8 @@ def create_practitioner(
     }
 
 
-    # POST to FHIR server
-    response = requests.post(
-        f"{settings.AZURE_FHIR_SERVICE_URL}/Practitioner",
-        json=practitioner_payload,
-        headers=headers,
-    )
-    response.raise_for_status()  # Raises HTTPError if status >= 400
-    response_json = response.json()
+    # PUT-as-create to FHIR server. Raises HTTPError if status >= 400
+    response_json = put_resource(practitioner_payload)
 
     # if successful status, create a Django User for this practitioner. This is for roles management purpose
     create_fhir_resource_user(
@@ -278,6 +694,7 @@ def create_practitioner(
 def edit_practitioner(
     practitioner_fhir_id: str,
     updates: Dict,
+    version_id: Optional[str] = None,
 ) -> Dict:
     """
     Edit an existing Practitioner resource by its FHIR resource ID.
@@ -285,66 +702,52 @@ def edit_practitioner(
     Args:
         practitioner_id (str): The FHIR resource ID of the Practitioner to update.
         updates (Dict): Partial JSON with fields to update (FHIR-compliant).
+        version_id (Optional[str]): meta.versionId the edit form was loaded with, to detect concurrent edits.
 
     Returns:
         Dict: Updated Practitioner resource JSON.
-    """
 
-    access_token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/fhir+json",
-        "Accept": "application/fhir+json",
-    }
+    Raises:
+        FhirConflictError: If the Practitioner was changed since `version_id`.
+    """
 
-    # First, GET the current Practitioner resource to merge updates
-    practitioner = get_practitioner(practitioner_fhir_id)
-
-    # Update practioner using form values
-    updated_practitioner = practitioner.copy()
-    updated_practitioner['name'] = [{
-        'prefix': [updates['title']],
-        'given': [updates['first_name']],
-        'family': updates['last_name']
-    }]
-
-    updated_practitioner['gender'] = updates['gender']
-
-    updated_practitioner['address'] = [{
-        'text': updates['organization_name'],
-        'city': updates['organization_city'],
-        'country': updates['organization_country']
-    }]
-
-    updated_practitioner["telecom"] = [
-        {
-            "system": "phone",
-            "value": str(updates["phone_number"]),
-            "use": "mobile",
-            "rank": 1
-        },
-        {
-            "system": "url",
-            "value": f"https://wa.me/{str(updates['whatsapp_number'])}",
-            "use": "mobile",
-            "rank": 2
-        }
+    # Update practioner using form values: only the edited elements are sent
+    operations = [
+        {"op": "add", "path": "/name", "value": [{
+            'prefix': [updates['title']],
+            'given': [updates['first_name']],
+            'family': updates['last_name']
+        }]},
+        {"op": "add", "path": "/gender", "value": updates['gender']},
+        {"op": "add", "path": "/address", "value": [{
+            'text': updates['organization_name'],
+            'city': updates['organization_city'],
+            'country': updates['organization_country']
+        }]},
+        {"op": "add", "path": "/telecom", "value": [
+            {
+                "system": "phone",
+                "value": str(updates["phone_number"]),
+                "use": "mobile",
+                "rank": 1
+            },
+            {
+                "system": "url",
+                "value": f"https://wa.me/{str(updates['whatsapp_number'])}",
+                "use": "mobile",
+                "rank": 2
+            }
+        ]},
+        {"op": "add", "path": "/photo", "value": [{
+            'url': updates['photo_url']
+        }]},
     ]
 
-    updated_practitioner['photo'] = [{
-        'url': updates['photo_url']
-    }]
+    updated_practitioner = patch_resource("Practitioner", practitioner_fhir_id, operations, version_id=version_id)
 
-    # PUT updated resource back
-    put_response = requests.put(
-        f"{settings.AZURE_FHIR_SERVICE_URL}/Practitioner/{practitioner_fhir_id}",
-        json=updated_practitioner,
-        headers=headers,
-    )
-    put_response.raise_for_status()
+    caching.invalidate_home_directory() # Practitioner data is listed on homepage
 
-
-    return put_response.json()
+    return updated_practitioner
 
 
 def deactivate_practitioner(practitioner_id: str, redirect_to_admin_view=True) -> Dict:
@@ -358,32 +761,16 @@ def deactivate_practitioner(practitioner_id: str, redirect_to_admin_view=True) -
     Returns:
         Dict: Updated Practitioner resource JSON with 'active': False (OR) Redirect to admin dashboard [ depending on the redirect_to_admin_view arg ]
     """
-    access_token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/fhir+json",
-        "Accept": "application/fhir+json",
-    }
-
-    # Fetch current practitioner resource
-    practitioner = get_practitioner(practitioner_id)
+    # Set 'active' to False with one PATCH, no need to fetch the resource first
+    updated_practitioner = set_resource_active("Practitioner", practitioner_id, False)
 
-    # Set 'active' to False
-    practitioner["active"] = False
-
-    # Update the resource on the FHIR server
-    update_response = requests.put(
-        f"{settings.AZURE_FHIR_SERVICE_URL}/Practitioner/{practitioner_id}",
-        json=practitioner,
-        headers=headers,
-    )
-    update_response.raise_for_status()
+    caching.invalidate_home_directory() # Only active practitioners are listed on homepage
 
     # Keep the function flexible to be called by different hooks
     if redirect_to_admin_view:
         return redirect("/admin/dashboard")  # Redirect to admin dashboard after deactivation
     else:
-        return update_response.json()
+        return updated_practitioner
 
 def activate_practitioner(practitioner_id: str, redirect_to_admin_view=True) -> Dict:
     """
@@ -396,32 +783,34 @@ def activate_practitioner(practitioner_id: str, redirect_to_admin_view=True) ->
     Returns:
         Dict: Updated Practitioner resource JSON with 'active': True (OR) Redirect to admin dashboard [ depending on the redirect_to_admin_view arg ]
     """
-    access_token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/fhir+json",
-        "Accept": "application/fhir+json",
-    }
-
-    # Fetch current practitioner resource
-    practitioner = get_practitioner(practitioner_id)
+    # Set 'active' to True with one PATCH, no need to fetch the resource first
+    updated_practitioner = set_resource_active("Practitioner", practitioner_id, True)
 
-    # Set 'active' to False
-    practitioner["active"] = True
-
-    # Update the resource on the FHIR server
-    update_response = requests.put(
-        f"{settings.AZURE_FHIR_SERVICE_URL}/Practitioner/{practitioner_id}",
-        json=practitioner,
-        headers=headers,
-    )
-    update_response.raise_for_status()
+    caching.invalidate_home_directory() # Only active practitioners are listed on homepage
 
     # Keep the function flexible to be called by different hooks
     if redirect_to_admin_view:
         return redirect("/admin/dashboard")  # Redirect to admin dashboard after deactivation
     else:
-        return update_response.json()
+        return updated_practitioner
+
+def set_practitioners_active(practitioner_ids: List[str], active: bool) -> Dict[str, bool]:
+    """
+    Activate/Deactivate many Practitioner resources at once (admin dashboard bulk action).
+
+    Args:
+        practitioner_ids (List[str]): FHIR resource IDs of the Practitioners.
+        active (bool): True to activate, False to deactivate.
+
+    Returns:
+        Dict[str, bool]: Per practitioner ID, True if it was updated.
+    """
+    results = set_resources_active("Practitioner", practitioner_ids, active)
+
+    if any(results.values()):
+        caching.invalidate_home_directory() # Once for the whole batch. Only active practitioners are listed on homepage
+
+    return results
 
 
 # ============================================================================
@@ -438,7 +827,7 @@ def list_patients(practitioner_fhir_id: str, only_active: bool = True) -> list:
         only_active (bool): If True, only return active patients.
 
     Returns:
-        list: A list of dictionaries, each representing a Patient.
+        List[PatientRow]: One row per Patient.
     """
     access_token = get_access_token()
     headers = {
@@ -448,7 +837,7 @@ def list_patients(practitioner_fhir_id: str, only_active: bool = True) -> list:
     }
 
     # Filter patients by generalPractitioner reference using FHIR search parameter if practitioner_fhir_id not None
-    response = requests.get(
+    response = fhir_transport.get(
         f"{settings.AZURE_FHIR_SERVICE_URL}/Patient",
         params={ "general-practitioner": f"Practitioner/{practitioner_fhir_id}" } if not practitioner_fhir_id is None else {},
         headers=headers,
@@ -462,31 +851,22 @@ def list_patients(practitioner_fhir_id: str, only_active: bool = True) -> list:
         if only_active and not resource.get("active", True):
             continue
 
-        telecom = resource.get("telecom", [])
-        phone_number = ""
-        if len(telecom) > 0:
-            phone_number = telecom[0].get("value", "")
-
-        whatsapp_link, whatsapp_number = "", ""
-        if len(telecom) > 1:
-            whatsapp_link = telecom[1].get("value", "")
-            if not whatsapp_link == "":
-                whatsapp_number = whatsapp_link.split("https://wa.me/")[-1]  # Extract number from WhatsApp link
-
-        patient_data = {
-            "patient_id": resource.get("id"),
-            "title": resource.get("name", [{}])[0].get("prefix", [None])[0],
-            "first_name": resource.get("name", [{}])[0].get("given", [None])[0],
-            "last_name": resource.get("name", [{}])[0].get("family"),
-            "full_name": resource.get("name", [{}])[0].get("prefix", [None])[0] + " " + resource.get("name", [{}])[0].get("given", [None])[0] + " " + resource.get("name", [{}])[0].get("family"),
-            "gender": resource.get("gender"),
-            "birth_date": resource.get("birthDate"),
-            "phone_number": phone_number,
-            "whatsapp_number": whatsapp_number,
-            "practitioner_fhir_id": practitioner_fhir_id,
-            "active": resource.get("active"),
-        }
-        patients.append(patient_data)
+        title, first_name, last_name, full_name = _extract_name(resource)
+        phone_number, whatsapp_number = _extract_phone_and_whatsapp_numbers(resource)
+
+        patients.append(PatientRow(
+            patient_id=resource.get("id"),
+            title=title,
+            first_name=first_name,
+            last_name=last_name,
+            full_name=full_name,
+            gender=resource.get("gender"),
+            birth_date=resource.get("birthDate"),
+            phone_number=phone_number,
+            whatsapp_number=whatsapp_number,
+            practitioner_fhir_id=practitioner_fhir_id,
+            active=resource.get("active"),
+        ))
 
     return patients
 
@@ -501,6 +881,10 @@ def get_patient(patient_id: str) -> Dict:
     Returns:
         Dict: JSON response from FHIR server (Patient resource).
     """
+    patient = _get_from_identity_map("Patient", patient_id)
+    if patient is not None: # Already read (or written) during this request
+        return patient
+
     access_token = get_access_token()
     headers = {
         "Authorization": f"Bearer {access_token}",
@@ -509,13 +893,15 @@ def get_patient(patient_id: str) -> Dict:
     }
 
     # GET Patient resource by ID
-    response = requests.get(
+    response = fhir_transport.get(
         f"{settings.AZURE_FHIR_SERVICE_URL}/Patient/{patient_id}",
         headers=headers,
     )
     response.raise_for_status()  # Raises HTTPError if status >= 400
 
-    return response.json()
+    patient = response.json()
+    _add_to_identity_map(patient)
+    return patient
 
 
 def create_patient(
@@ -551,15 +937,9 @@ def create_patient(
     if email_exists(email):
         raise ValueError(f"Email {email} is already registered for another user.")
 
-    access_token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/fhir+json",
-        "Accept": "application/fhir+json",
-    }
-
     patient_payload = {
         "resourceType": "Patient",
+        "id": str(uuid.uuid4()), # Assigned here so the create is a PUT, safe to retry
         "name": [
             {
                 "prefix": [title],
@@ -574,10 +954,10 @@ def create_patient(
                 "reference": f"Practitioner/{practitioner_fhir_id}"
             }
         ],
-        "telecom": [{
+        "telecom": [
             {
                 "system": "phone",
-                "value": phone_number,
+                "value": str(phone_number),
                 "use": "mobile",
                 "rank": 1
             },
@@ -587,18 +967,12 @@ def create_patient(
                 "use": "mobile",
                 "rank": 2
             }
-        }],
+        ],
         "active": True,
     }
 
-    response = requests.post(
-        f"{settings.AZURE_FHIR_SERVICE_URL}/Patient",
-        json=patient_payload,
-        headers=headers,
-    )
-
-    response.raise_for_status()
-    response_json = response.json()
+    # PUT-as-create to FHIR server. Raises HTTPError if status >= 400
+    response_json = put_resource(patient_payload)
 
     # If successful status, create Django user linked to this patient
     create_fhir_resource_user(
@@ -614,6 +988,7 @@ def create_patient(
 def edit_patient(
     patient_fhir_id: str,
     updates: Dict,
+    version_id: Optional[str] = None,
 ) -> Dict:
     """
     Edit an existing Patient resource by its FHIR resource ID.
@@ -621,60 +996,45 @@ def edit_patient(
     Args:
         patient_id (str): The FHIR resource ID of the Patient to update.
         updates (Dict): Partial JSON with fields to update (FHIR-compliant).
+        version_id (Optional[str]): meta.versionId the edit form was loaded with, to detect concurrent edits.
 
     Returns:
         Dict: Updated Patient resource JSON.
-    """
-
-    access_token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/fhir+json",
-        "Accept": "application/fhir+json",
-    }
 
-    # First, GET the current Patient resource to merge updates
-    patient = get_patient(patient_fhir_id)
-
-    # Update patient using form values
-    updated_patient = patient.copy()
-
-    updated_patient['name'] = [{
-        'prefix': [updates['title']],
-        'given': [updates['first_name']],
-        'family': updates['last_name']
-    }]
-
-    updated_patient['gender'] = updates['gender']
-    updated_patient['birthDate'] = updates['birth_date'].isoformat()  # Ensure date is in ISO format to make JSON Serialization possible
+    Raises:
+        FhirConflictError: If the Patient was changed since `version_id`.
+    """
 
     phone_number = str(updates["phone_number"]) # Update phone_number
     whatsapp_number = str(updates["whatsapp_number"]) # Update Whatsapp number
-    updated_patient["telecom"] = [
-        {
-            "system": "phone",
-            "value": phone_number,
-            "use": "mobile",
-            "rank": 1
-        },
-        {
-            "system": "url",
-            "value": f"https://wa.me/{str(whatsapp_number)}",
-            "use": "mobile",
-            "rank": 2
-        }
-    ]
 
+    # Update patient using form values: only the edited elements are sent
+    operations = [
+        {"op": "add", "path": "/name", "value": [{
+            'prefix': [updates['title']],
+            'given': [updates['first_name']],
+            'family': updates['last_name']
+        }]},
+        {"op": "add", "path": "/gender", "value": updates['gender']},
+        {"op": "add", "path": "/birthDate", "value": updates['birth_date'].isoformat()}, # Ensure date is in ISO format to make JSON Serialization possible
+        {"op": "add", "path": "/telecom", "value": [
+            {
+                "system": "phone",
+                "value": phone_number,
+                "use": "mobile",
+                "rank": 1
+            },
+            {
+                "system": "url",
+                "value": f"https://wa.me/{str(whatsapp_number)}",
+                "use": "mobile",
+                "rank": 2
+            }
+        ]},
+    ]
 
-    # PUT updated resource back
-    put_response = requests.put(
-        f"{settings.AZURE_FHIR_SERVICE_URL}/Patient/{patient_fhir_id}",
-        json=updated_patient,
-        headers=headers,
-    )
-    put_response.raise_for_status()
+    return patch_resource("Patient", patient_fhir_id, operations, version_id=version_id)
 
-    return put_response.json()
 
 from django.shortcuts import redirect
 
@@ -689,32 +1049,14 @@ def deactivate_patient(patient_id: str, redirect_to_admin_view=True) -> Dict:
     Returns:
         Dict: Updated Patient resource JSON with 'active': False (OR) Redirect to admin dashboard [depending on redirect_to_admin_view].
     """
-    access_token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/fhir+json",
-        "Accept": "application/fhir+json",
-    }
-
-    # Fetch current patient resource
-    patient = get_patient(patient_id)
-
-    # Set 'active' to False
-    patient["active"] = False
-
-    # Update the resource on the FHIR server
-    update_response = requests.put(
-        f"{settings.AZURE_FHIR_SERVICE_URL}/Patient/{patient_id}",
-        json=patient,
-        headers=headers,
-    )
-    update_response.raise_for_status()
+    # Set 'active' to False with one PATCH, no need to fetch the resource first
+    updated_patient = set_resource_active("Patient", patient_id, False)
 
     # Keep the function flexible to be called by different hooks
     if redirect_to_admin_view:
         return redirect("/admin/dashboard")  # Redirect to admin dashboard after deactivation
     else:
-        return update_response.json()
+        return updated_patient
 
 
 def activate_patient(patient_id: str, redirect_to_admin_view=True) -> Dict:
@@ -728,32 +1070,27 @@ def activate_patient(patient_id: str, redirect_to_admin_view=True) -> Dict:
     Returns:
         Dict: Updated Patient resource JSON with 'active': True (OR) Redirect to admin dashboard [depending on redirect_to_admin_view].
     """
-    access_token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/fhir+json",
-        "Accept": "application/fhir+json",
-    }
-
-    # Fetch current patient resource
-    patient = get_patient(patient_id)
-
-    # Set 'active' to True
-    patient["active"] = True
-
-    # Update the resource on the FHIR server
-    update_response = requests.put(
-        f"{settings.AZURE_FHIR_SERVICE_URL}/Patient/{patient_id}",
-        json=patient,
-        headers=headers,
-    )
-    update_response.raise_for_status()
+    # Set 'active' to True with one PATCH, no need to fetch the resource first
+    updated_patient = set_resource_active("Patient", patient_id, True)
 
     # Keep the function flexible to be called by different hooks
     if redirect_to_admin_view:
         return redirect("/admin/dashboard")  # Redirect to admin dashboard after activation
     else:
-        return update_response.json()
+        return updated_patient
+
+def set_patients_active(patient_ids: List[str], active: bool) -> Dict[str, bool]:
+    """
+    Activate/Deactivate many Patient resources at once (admin dashboard bulk action).
+
+    Args:
+        patient_ids (List[str]): FHIR resource IDs of the Patients.
+        active (bool): True to activate, False to deactivate.
+
+    Returns:
+        Dict[str, bool]: Per patient ID, True if it was updated.
+    """
+    return set_resources_active("Patient", patient_ids, active)
 
 
 
@@ -780,6 +1117,15 @@ def get_plan_definition(plan_definition_fhir_id: str, only_latest: bool = False)
     Returns:
         Optional[Dict]: The PlanDefinition resource if found, otherwise None.
     """
+    plan_definition = _get_from_identity_map("PlanDefinition", plan_definition_fhir_id)
+    if plan_definition is not None: # Already read (or written) during this request
+        return plan_definition
+
+    plan_definition = fhir_mirror.get_resource("PlanDefinition", plan_definition_fhir_id)
+    if plan_definition is not None:
+        _add_to_identity_map(plan_definition)
+        return plan_definition
+
     access_token = get_access_token()
     headers = {
         "Authorization": f"Bearer {access_token}",
@@ -787,7 +1133,7 @@ def get_plan_definition(plan_definition_fhir_id: str, only_latest: bool = False)
     }
 
     url = f"{settings.AZURE_FHIR_SERVICE_URL}/PlanDefinition/{plan_definition_fhir_id}"
-    response = requests.get(url, headers=headers)
+    response = fhir_transport.get(url, headers=headers)
 
     if response.status_code == 404:
         return None
@@ -795,6 +1141,7 @@ def get_plan_definition(plan_definition_fhir_id: str, only_latest: bool = False)
     response.raise_for_status()
     
     response_json = response.json()
+    _add_to_identity_map(response_json)
 
     if 'resourceType' in response_json and response_json["resourceType"] == 'Bundle':
         if only_latest:
@@ -827,13 +1174,44 @@ def create_plan_definition(
     Returns:
         Dict: Created PlanDefinition resource JSON.
     """
-    access_token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/fhir+json",
-        "Accept": "application/fhir+json",
-    }
+    plan_definition = build_plan_definition(
+        plan_definition_type=plan_definition_type,
+        author_id=author_id,
+        creator_django_user_id=creator_django_user_id,
+        title=title,
+        plan_details=plan_details,
+        description=description,
+        version=version,
+    )
+
+    # Platform plans have deterministic IDs (see build_plan_definition), clients plans get a new one. Either way the
+    # create is a PUT at a known ID, which a FHIR server honors (POST would assign a random ID) and which is safe to retry
+    if "id" not in plan_definition:
+        plan_definition["id"] = str(uuid.uuid4())
+    response_json = put_resource(plan_definition)
+
+    caching.invalidate_home_directory() # Clients plans are listed on homepage
+
+    return response_json
+
+
+def build_plan_definition(
+    plan_definition_type: PlanDefinitionType,
+    author_id: str,
+    creator_django_user_id: int,
+    title: str,
+    plan_details: Dict,
+    description: str = "",
+    version: str = "1.0"
+) -> Dict:
+    """
+    Build a PlanDefinition resource JSON without sending it. Platform plans get a deterministic ID derived from their title.
+
+    Args: Same as create_plan_definition.
 
+    Returns:
+        Dict: PlanDefinition resource JSON.
+    """
     if plan_definition_type == PlanDefinitionType.PLATFORM_TO_PROFESSIONALS_PLAN:
         author = [ { "name": settings.PLATFORM_ADMIN_FHIR_ID } ]
     elif plan_definition_type == PlanDefinitionType.PROFESSIONAL_TO_CLIENTS_PLAN:
@@ -897,22 +1275,7 @@ def create_plan_definition(
             
     plan_definition["extension"] = extensions
 
-    # To set a custom PlanDefinition ID we must use PUT with convenient URL instead of POST, otherwise a random ID will be generated even if ID is passed
-    if plan_definition_type == PlanDefinitionType.PLATFORM_TO_PROFESSIONALS_PLAN:
-        response = requests.put(
-            f"{settings.AZURE_FHIR_SERVICE_URL}/PlanDefinition{('/' + plan_id)}",
-            headers=headers,
-            json=plan_definition,
-        )
-    elif plan_definition_type == PlanDefinitionType.PROFESSIONAL_TO_CLIENTS_PLAN:
-        response = requests.post(
-            f"{settings.AZURE_FHIR_SERVICE_URL}/PlanDefinition",
-            headers=headers,
-            json=plan_definition,
-        )
-
-    response.raise_for_status()
-    return response.json()
+    return plan_definition
 
 
 def delete_plan_definition(plan_definition_id: str) -> str:
@@ -937,17 +1300,12 @@ def delete_plan_definition(plan_definition_id: str) -> str:
     }
 
     # Get the plan by ID
-    response = requests.get(
-        f"{settings.AZURE_FHIR_SERVICE_URL}/PlanDefinition/{plan_definition_id}",
-        headers=headers,
-    )
-
-    if response.status_code != 200:
-        raise ValueError(f"PlanDefinition/{plan_definition_id} not found: {response.text}")
+    if get_plan_definition(plan_definition_id) is None:
+        raise ValueError(f"PlanDefinition/{plan_definition_id} not found")
 
     
     # Proceed to delete
-    delete_response = requests.delete(
+    delete_response = fhir_transport.delete(
         f"{settings.AZURE_FHIR_SERVICE_URL}/PlanDefinition/{plan_definition_id}",
         headers=headers,
     )
@@ -955,6 +1313,9 @@ def delete_plan_definition(plan_definition_id: str) -> str:
     if delete_response.status_code not in [200, 204]:
         raise RuntimeError(f"Failed to delete PlanDefinition/{plan_definition_id}: {delete_response.text}")
 
+    _remove_from_identity_map("PlanDefinition", plan_definition_id)
+    fhir_mirror.remember_deleted("PlanDefinition", plan_definition_id)
+
     return delete_response.status_code
 
 
@@ -975,8 +1336,14 @@ def get_platform_plan_definitions(plan_fhir_ids) -> List[Dict]:
 
     for plan_fhir_id in plan_fhir_ids:
 
+        plan_json = _get_from_identity_map("PlanDefinition", plan_fhir_id) or fhir_mirror.get_resource("PlanDefinition", plan_fhir_id)
+        if plan_json is not None:
+            _add_to_identity_map(plan_json)
+            plans.append(plan_json)
+            continue
+
         url = f"{settings.AZURE_FHIR_SERVICE_URL}/PlanDefinition/{plan_fhir_id}"
-        response = requests.get(url, headers=headers)
+        response = fhir_transport.get(url, headers=headers)
 
         if response.status_code == 404:
             continue
@@ -984,6 +1351,7 @@ def get_platform_plan_definitions(plan_fhir_ids) -> List[Dict]:
         response.raise_for_status()
 
         plan_json = response.json()
+        _add_to_identity_map(plan_json)
         plans.append(plan_json)
 
 
@@ -1020,13 +1388,6 @@ def subscribe_professional_to_platform_plan(
     Returns:
         Dict: The created CarePlan resource as JSON.
     """
-    access_token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/fhir+json",
-        "Accept": "application/fhir+json",
-    }
-
     plan = get_plan_definition(plan_definition_fhir_id=plan_definition_id)
     if not plan:
         raise ValueError(f"Cannot find a plan associated with ID: {plan_definition_id}.")
@@ -1038,6 +1399,7 @@ def subscribe_professional_to_platform_plan(
     # Build PractionerRole - Represents relationship between organization (app platform) and professional.
     practitioner_role = {
         "resourceType": "PractitionerRole",
+        "id": str(uuid.uuid4()), # Assigned here so the create is a PUT, safe to retry
         "active": True,
         "practitioner": {"reference": f"Practitioner/{practitioner_id}"},
         "organization": {"reference": "Organization/platform-admin"},
@@ -1077,13 +1439,7 @@ def subscribe_professional_to_platform_plan(
         practitioner_role["extension"]
     
     # Submit PractitionerRole
-    response = requests.post(
-        f"{settings.AZURE_FHIR_SERVICE_URL}/PractitionerRole",
-        headers=headers,
-        json=practitioner_role,
-    )
-    response.raise_for_status()
-    return response.json()
+    return put_resource(practitioner_role)
 
 
 def deactivate_practiotioner_subscription(practitioner_id):
@@ -1111,7 +1467,7 @@ def get_practitioner_to_clients_plan_definitions(
     }
 
     url = f"{settings.AZURE_FHIR_SERVICE_URL}/PlanDefinition?author=Practitioner/{practitioner_id}"
-    response = requests.get(url, headers=headers)
+    response = fhir_transport.get(url, headers=headers)
     response.raise_for_status()
 
     bundle = response.json()
@@ -1184,13 +1540,6 @@ def subscribe_patient_to_prfessional_to_clients_plan(
     Returns:
         Dict: The created CarePlan resource as JSON.
     """
-    access_token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/fhir+json",
-        "Accept": "application/fhir+json",
-    }
-
     # If plan ID not provided, auto-select the practitioner's latest plan
     if not plan_definition_id:
         plan = get_practitioner_to_clients_latest_plan_definition(practitioner_id=practitioner_id)
@@ -1205,6 +1554,7 @@ def subscribe_patient_to_prfessional_to_clients_plan(
     # Build CarePlan resource
     careplan = {
         "resourceType": "CarePlan",
+        "id": str(uuid.uuid4()), # Assigned here so the create is a PUT, safe to retry
         "status": "active",
         "intent": "order",
         "subject": {"reference": f"Patient/{patient_id}"},
@@ -1223,13 +1573,7 @@ def subscribe_patient_to_prfessional_to_clients_plan(
         ]
 
     # Submit CarePlan
-    response = requests.post(
-        f"{settings.AZURE_FHIR_SERVICE_URL}/CarePlan",
-        headers=headers,
-        json=careplan,
-    )
-    response.raise_for_status()
-    return response.json()
+    return put_resource(careplan)
 
 def get_patient_active_subscriptions(
     patient_id: str
@@ -1250,7 +1594,7 @@ def get_patient_active_subscriptions(
     }
 
     url = f"{settings.AZURE_FHIR_SERVICE_URL}/CarePlan?subject=Patient/{patient_id}&status=active"
-    response = requests.get(url, headers=headers)
+    response = fhir_transport.get(url, headers=headers)
     response.raise_for_status()
 
     bundle = response.json()
@@ -1294,7 +1638,33 @@ def create_questionnaire(title: str, questions: List[Dict]) -> str:
     }
 
     questionnaire_fhir_id = str(uuid.uuid4())
+    questionnaire_resource = build_questionnaire_resource(title=title, questions=questions, questionnaire_fhir_id=questionnaire_fhir_id)
+
+    response = fhir_transport.put(
+        f"{settings.AZURE_FHIR_SERVICE_URL}/Questionnaire/{questionnaire_fhir_id}",
+        json=questionnaire_resource,
+        headers=headers
+    )
+    if response.status_code not in [200, 201]:
+        raise Exception(f"Failed to create Questionnaire: {response.status_code} {response.text}")
+
+    return questionnaire_fhir_id
+
+def build_questionnaire_resource(title: str, questions: List[Dict], questionnaire_fhir_id: Optional[str] = None) -> Dict:
+    """
+    Build a Questionnaire resource JSON without sending it.
+
+    Args:
+        title (str): Title of the questionnaire.
+        questions (List[Dict]): List of question dicts (see create_questionnaire).
+        questionnaire_fhir_id (Optional[str]): ID to set on the resource. Omitted if None (e.g. for conditional creates).
+
+    Returns:
+        Dict: Questionnaire resource JSON.
 
+    Raises:
+        ValueError: If bad data is passed.
+    """
     items = []
     for idx, q in enumerate(questions, start=1):
         link_id = f"q{idx}"
@@ -1332,22 +1702,15 @@ def create_questionnaire(title: str, questions: List[Dict]) -> str:
 
     questionnaire_resource = {
         "resourceType": "Questionnaire",
-        "id": questionnaire_fhir_id,
         "title": str(title), # ensure str for JSON serialization
         "status": "active",
         "subjectType": ["Patient"],
         "item": items
     }
+    if questionnaire_fhir_id is not None:
+        questionnaire_resource["id"] = questionnaire_fhir_id
 
-    response = requests.put(
-        f"{settings.AZURE_FHIR_SERVICE_URL}/Questionnaire/{questionnaire_fhir_id}",
-        json=questionnaire_resource,
-        headers=headers
-    )
-    if response.status_code not in [200, 201]:
-        raise Exception(f"Failed to create Questionnaire: {response.status_code} {response.text}")
-
-    return questionnaire_fhir_id
+    return questionnaire_resource
 
 def delete_questionnaire(title: str) -> dict:
     """
@@ -1371,7 +1734,7 @@ def delete_questionnaire(title: str) -> dict:
         "Content-Type": "application/fhir+json"
     }
 
-    response = requests.get(search_url, headers=headers)
+    response = fhir_transport.get(search_url, headers=headers)
     response.raise_for_status()
     bundle = response.json()
 
@@ -1384,8 +1747,9 @@ def delete_questionnaire(title: str) -> dict:
     questionnaire_id = entries[0]["resource"]["id"]
 
     delete_url = f"{settings.AZURE_FHIR_SERVICE_URL}/Questionnaire/{questionnaire_id}"
-    delete_response = requests.delete(delete_url, headers=headers)
+    delete_response = fhir_transport.delete(delete_url, headers=headers)
     delete_response.raise_for_status()
+    fhir_mirror.remember_deleted("Questionnaire", questionnaire_id)
 
     return "deleted"
 
@@ -1404,32 +1768,31 @@ def deactivate_questionnaire(title: str) -> dict:
         requests.HTTPError: If the update fails.
     """
     access_token = get_access_token()
-    search_url = f"{settings.AZURE_FHIR_SERVICE_URL}/Questionnaire?title={title}"
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Accept": "application/fhir+json",
-        "Content-Type": "application/fhir+json"
+        "Content-Type": "application/json-patch+json"
     }
 
-    response = requests.get(search_url, headers=headers)
-    response.raise_for_status()
-    bundle = response.json()
+    # Conditional patch: the server finds the Questionnaire by title and updates it in the same request
+    update_url = f"{settings.AZURE_FHIR_SERVICE_URL}/Questionnaire?{urlencode({'title': title})}"
+    update_response = fhir_transport.patch(
+        update_url,
+        json=[{"op": "add", "path": "/status", "value": "inactive"}],
+        headers=headers,
+        idempotent=True,
+    )
 
-    entries = bundle.get("entry", [])
-    if not entries:
+    if update_response.status_code == 404:
         raise ValueError("No Questionnaire found with the given title.")
-    if len(entries) > 1:
+    if update_response.status_code == 412:
         raise ValueError("Multiple Questionnaires found with the given title. Titles must be unique.")
-
-    questionnaire = entries[0]["resource"]
-    questionnaire_id = questionnaire["id"]
-    questionnaire["status"] = "inactive"
-
-    update_url = f"{settings.AZURE_FHIR_SERVICE_URL}/Questionnaire/{questionnaire_id}"
-    update_response = requests.put(update_url, json=questionnaire, headers=headers)
     update_response.raise_for_status()
 
-    return update_response.json()
+    updated_questionnaire = update_response.json()
+    _add_to_identity_map(updated_questionnaire) # Later reads in this request see the written version
+    fhir_mirror.remember_written(updated_questionnaire)
+    return updated_questionnaire
 
 
 def get_questionnaire(title: str):
@@ -1446,6 +1809,16 @@ def get_questionnaire(title: str):
         ValueError: If multiple Questionnaires are found with the same title.
         requests.HTTPError: For other HTTP errors.
     """
+    mirrored_questionnaires = fhir_mirror.list_resources("Questionnaire")
+    if mirrored_questionnaires is not None:
+        # Same matching as the FHIR string search: case-insensitive, title starts with the searched text
+        matches = [questionnaire for questionnaire in mirrored_questionnaires if questionnaire.get("title", "").lower().startswith(title.lower())]
+        if len(matches) > 1:
+            raise ValueError("Multiple Questionnaires found with the given title. Title must be unique.")
+        if matches:
+            return matches[0]
+        # Not mirrored (e.g. created by another process since the last sync): search FHIR
+
     access_token = get_access_token()
     search_url = f"{settings.AZURE_FHIR_SERVICE_URL}/Questionnaire?title={title}"
     headers = {
@@ -1453,7 +1826,7 @@ def get_questionnaire(title: str):
         "Accept": "application/fhir+json"
     }
 
-    response = requests.get(search_url, headers=headers)
+    response = fhir_transport.get(search_url, headers=headers)
     response.raise_for_status()
 
     bundle = response.json()
@@ -1512,27 +1885,19 @@ def get_questionnaire_questions_as_js_list(questionnaire_json: dict) -> list:
     return quiz_questions
 
 
-def create_questionnaire_response(practitioner_id: str, patient_id: str, question_answers: list[dict]) -> dict:
+def build_questionnaire_response(practitioner_id: str, patient_id: str, question_answers: list[dict], questionnaire_response_id: Optional[str] = None) -> dict:
     """
-    Create a FHIR QuestionnaireResponse at Azure FHIR server (raw JSON version).
+    Build a QuestionnaireResponse resource JSON (answers of the active questionnaire) without sending it.
 
     Args:
         practitioner_id (str): Practitioner ID (e.g., "practitioner-123")
         patient_id (str): Patient ID (e.g., "patient-456")
         question_answers (List[dict]): List of {"linkId", "text", "answer": [{"valueX": ...}]} items
+        questionnaire_response_id (Optional[str]): Client-assigned ID. A new uuid4 if None.
 
     Returns:
-        dict: Azure FHIR server response
+        dict: QuestionnaireResponse resource JSON.
     """
-
-    # Prepare Azure FHIR headers
-    access_token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Accept": "application/fhir+json",
-        "Content-Type": "application/fhir+json"
-    }
-
     # Prepare references and metadata
     questionnaire_title = settings.ACTIVE_QUESTIONNAIRE_TITLE
     questionnaire_ref = f"Questionnaire/{questionnaire_title}"
@@ -1541,7 +1906,7 @@ def create_questionnaire_response(practitioner_id: str, patient_id: str, questio
     # Build the QuestionnaireResponse JSON structure
     questionnaire_response = {
         "resourceType": "QuestionnaireResponse",
-        "id": str(uuid.uuid4()),
+        "id": questionnaire_response_id or str(uuid.uuid4()),
         "status": "completed",
         "questionnaire": questionnaire_ref,
         "subject": {"reference": f"Patient/{patient_id}"},
@@ -1557,17 +1922,56 @@ def create_questionnaire_response(practitioner_id: str, patient_id: str, questio
         }
         questionnaire_response["item"].append(item_entry)
 
-    
+    return questionnaire_response
+
+
+def put_resource(resource: dict) -> dict:
+    """
+    Create or replace a resource at its client-assigned ID (PUT-as-create). Safe to retry: replaying the same PUT
+    leaves a single resource.
+
+    Args:
+        resource (dict): FHIR resource JSON with "resourceType" and "id".
+
+    Returns:
+        dict: Azure FHIR server response (the stored resource)
+    """
+    access_token = get_access_token()
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/fhir+json",
+        "Content-Type": "application/fhir+json"
+    }
 
-    # Send POST request to Azure FHIR
-    url = f"{settings.AZURE_FHIR_SERVICE_URL}/QuestionnaireResponse"
-    response = requests.post(url, headers=headers, json=questionnaire_response)
+    url = f"{settings.AZURE_FHIR_SERVICE_URL}/{resource['resourceType']}/{resource['id']}"
+    response = fhir_transport.put(url, headers=headers, json=resource)
 
     # Raise error on failure, return JSON on success
     response.raise_for_status()
+    _add_to_identity_map(response.json())
+    fhir_mirror.remember_written(response.json())
     return response.json()
 
 
+def create_questionnaire_response(practitioner_id: str, patient_id: str, question_answers: list[dict]) -> dict:
+    """
+    Create a FHIR QuestionnaireResponse at Azure FHIR server (raw JSON version).
+    Quiz submissions go through core.outbox instead, which delivers them in the background.
+
+    Args:
+        practitioner_id (str): Practitioner ID (e.g., "practitioner-123")
+        patient_id (str): Patient ID (e.g., "patient-456")
+        question_answers (List[dict]): List of {"linkId", "text", "answer": [{"valueX": ...}]} items
+
+    Returns:
+        dict: Azure FHIR server response
+    """
+    questionnaire_response = build_questionnaire_response(practitioner_id, patient_id, question_answers)
+
+    # PUT at the client-assigned ID, so a retried request can't create a duplicate
+    return put_resource(questionnaire_response)
+
+
 def get_questionnaire_responses(practitioner_id: str, patient_id: str, questionnaire_title: str) -> list[dict]:
     """
     Retrieve QuestionnaireResponse resources from Azure FHIR server for a specific practitioner,
@@ -1596,7 +2000,7 @@ def get_questionnaire_responses(practitioner_id: str, patient_id: str, questionn
     }
 
     url = f"{settings.AZURE_FHIR_SERVICE_URL}/QuestionnaireResponse?{urlencode(query_params)}"
-    response = requests.get(url, headers=headers)
+    response = fhir_transport.get(url, headers=headers)
     response.raise_for_status()
 
     bundle = response.json()
@@ -1615,4 +2019,173 @@ def get_questionnaire_responses(practitioner_id: str, patient_id: str, questionn
 
     # Keep max(CARE_CHART_MAX_N_QUESTIONNAIRES, total_returned)
     max_n = max(settings.CARE_CHART_MAX_N_QUESTIONNAIRES, len(questionnaire_responses))
-    return questionnaire_responses[:max_n]
\ No newline at end of file
+    return questionnaire_responses[:max_n]
+
+
+def get_questionnaire_responses_by_subject(practitioner_id: str, questionnaire_title: str) -> Dict[str, List[Dict]]:
+    """
+    Retrieve the QuestionnaireResponses authored by a practitioner for all their clients with one search
+    (instead of one search per client), grouped by client.
+
+    Args:
+        practitioner_id (str): FHIR ID of the practitioner (author).
+        questionnaire_title (str): Title of the Questionnaire the responses answer.
+
+    Returns:
+        Dict[str, List[Dict]]: Patient FHIR ID -> its QuestionnaireResponses sorted by authored datetime ascending.
+            Only the elements needed for care chart progressions are returned (subject, authored, questionnaire, item).
+    """
+    query_params = {
+        "author": f"Practitioner/{practitioner_id}",
+        "_sort": "authored",
+        "_elements": "subject,authored,questionnaire,item",
+    }
+
+    # Group by subject in a single pass. Pages come sorted by authored, so each group stays sorted
+    responses_by_subject = {}
+    for page in iter_search_pages("QuestionnaireResponse", query_params):
+        for questionnaire_response in page:
+            if not questionnaire_response.get("questionnaire", "").endswith(f"/{questionnaire_title}"):
+                continue
+            patient_id = questionnaire_response.get("subject", {}).get("reference", "").split("/")[-1]
+            responses_by_subject.setdefault(patient_id, []).append(questionnaire_response)
+
+    return responses_by_subject
+
+
+def iter_questionnaire_responses_updated_since(
+    last_updated: Optional[datetime] = None,
+    query_params: Optional[Dict] = None,
+    until: Optional[datetime] = None,
+) -> Iterator[List[Dict]]:
+    """
+    Stream QuestionnaireResponses created or updated since a watermark, oldest change first (incremental jobs).
+
+    Args:
+        last_updated (Optional[datetime]): Only responses with meta.lastUpdated >= this (inclusive, so changes sharing the
+            watermark's timestamp are not missed: callers skip the ones they already processed). None -> all responses.
+        until (Optional[datetime]): Only responses with meta.lastUpdated < this. None -> up to the latest change.
+        query_params (Optional[Dict]): Extra search parameters (e.g. "subject", "author").
+
+    Yields:
+        List[Dict]: QuestionnaireResponses of one page, sorted by meta.lastUpdated ascending.
+    """
+    query_params = {
+        "_sort": "_lastUpdated",
+        "_elements": "subject,author,authored,questionnaire,item",
+        **(query_params or {}),
+    }
+    last_updated_bounds = []
+    if last_updated is not None:
+        last_updated_bounds.append(f"ge{last_updated.isoformat()}")
+    if until is not None:
+        last_updated_bounds.append(f"lt{until.isoformat()}")
+    if last_updated_bounds:
+        query_params["_lastUpdated"] = last_updated_bounds # Repeated parameter: both bounds apply
+
+    yield from iter_search_pages("QuestionnaireResponse", query_params)
+
+
+# ============================================================================
+# FHIR composite reads
+# Pages that need several related resources get them in one search, with _include (resources referenced by the
+# matches) or _revinclude (resources referencing the matches), instead of one HTTP call per resource.
+# ============================================================================
+
+class PatientWithGeneralPractitioners(NamedTuple):
+    patient: Optional[Dict]
+    general_practitioners: List[Dict]
+
+class PatientWithQuestionnaireResponses(NamedTuple):
+    patient: Optional[Dict]
+    questionnaire_responses: List[Dict] # Sorted by authored datetime ascending
+
+def search_with_includes(resource_type: str, query_params: Dict) -> Dict[str, List[Dict]]:
+    """
+    Run a FHIR search and unpack the result Bundle by search mode and resource type.
+
+    Args:
+        resource_type (str): Searched resource type (e.g. "Patient").
+        query_params (Dict): Search parameters. Use a list value for repeated parameters (e.g. several "_include").
+
+    Returns:
+        Dict[str, List[Dict]]: "match" -> resources matching the search. Included resources are grouped by their
+            resourceType (e.g. "Practitioner" -> [...]). Returned resources are added to the request identity map.
+    """
+    access_token = get_access_token()
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/fhir+json",
+    }
+
+    url = f"{settings.AZURE_FHIR_SERVICE_URL}/{resource_type}?{urlencode(query_params, doseq=True)}"
+    response = fhir_transport.get(url, headers=headers)
+    response.raise_for_status()
+
+    resources = {"match": []}
+    for entry in response.json().get("entry", []):
+        resource = entry.get("resource")
+        if not resource:
+            continue
+
+        if entry.get("search", {}).get("mode", "match") == "match":
+            resources["match"].append(resource)
+        else:
+            resources.setdefault(resource["resourceType"], []).append(resource)
+
+        _add_to_identity_map(resource)
+
+    return resources
+
+def get_patient_with_general_practitioners(patient_id: str) -> PatientWithGeneralPractitioners:
+    """
+    Retrieve a Patient and its general practitioners (Practitioner resources) in one request.
+
+    Args:
+        patient_id (str): FHIR Patient ID.
+
+    Returns:
+        PatientWithGeneralPractitioners: patient (None if not found) and its general practitioners.
+    """
+    resources = search_with_includes("Patient", {
+        "_id": patient_id,
+        "_include": "Patient:general-practitioner",
+    })
+
+    patients = resources["match"]
+    return PatientWithGeneralPractitioners(
+        patient=patients[0] if patients else None,
+        general_practitioners=resources.get("Practitioner", []),
+    )
+
+def get_patient_with_questionnaire_responses(patient_id: str, questionnaire_title: str) -> PatientWithQuestionnaireResponses:
+    """
+    Retrieve a Patient and all its QuestionnaireResponses (submissions of one questionnaire).
+
+    The responses are read with a paged search rather than _revinclude: servers cap the number of included resources
+    per Bundle, which would silently cut long histories (and progression is cumulative, so every check-up counts).
+
+    Args:
+        patient_id (str): FHIR Patient ID.
+        questionnaire_title (str): Title of the Questionnaire the responses answer.
+
+    Returns:
+        PatientWithQuestionnaireResponses: patient (None if not found) and its responses sorted by authored datetime.
+    """
+    resources = search_with_includes("Patient", {"_id": patient_id})
+    if not resources["match"]:
+        return PatientWithQuestionnaireResponses(patient=None, questionnaire_responses=[])
+
+    questionnaire_responses = [
+        questionnaire_response
+        for page in iter_search_pages("QuestionnaireResponse", {"subject": f"Patient/{patient_id}"})
+        for questionnaire_response in page
+        if questionnaire_response.get("questionnaire", "").endswith(f"/{questionnaire_title}")
+    ]
+    questionnaire_responses.sort(key=lambda questionnaire_response: datetime.fromisoformat(questionnaire_response["authored"]).replace(tzinfo=None)) # authored is stored in UTC, with or without offset
+
+    return PatientWithQuestionnaireResponses(
+        patient=resources["match"][0],
+        questionnaire_responses=questionnaire_responses,
+    )
+
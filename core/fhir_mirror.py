@@ -0,0 +1,204 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import MirroredResource, SyncWatermark
+
+
+# ============================================================================
+# FHIR read mirror
+# Reads of the mirrored resource types (settings.FHIR_MIRROR_RESOURCE_TYPES) are served from the local database
+# while the last complete sync of their type started less than FHIR_MIRROR_MAX_STALENESS_SECONDS ago, otherwise
+# they go to FHIR as usual. The sync (fhir.sync_mirror, run by the `sync_fhir_mirror` command) and this process'
+# own writes store resource versions here. A version is only stored if it is newer than the stored one, so
+# versions can be applied in any order and more than once.
+# This module never calls FHIR: core.fhir decides when to use it.
+# ============================================================================
+
+MIRROR_WATERMARK_PREFIX = "fhir_mirror:"
+
+
+def _parse_last_updated(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=dt_timezone.utc)
+
+
+def get_watermark_name(resource_type: str) -> str:
+    return f"{MIRROR_WATERMARK_PREFIX}{resource_type}"
+
+
+def is_mirrored(resource_type: str) -> bool:
+    """Whether reads and writes of this resource type go through the mirror."""
+    return settings.FHIR_MIRROR_ENABLED and resource_type in settings.FHIR_MIRROR_RESOURCE_TYPES
+
+
+def is_fresh(resource_type: str) -> bool:
+    """
+    Whether the mirror may serve reads of a resource type.
+
+    Returns:
+        bool: True if the type is mirrored and its last complete sync started within the staleness bound.
+    """
+    if not is_mirrored(resource_type):
+        return False
+
+    synced_at = SyncWatermark.objects.filter(name=get_watermark_name(resource_type)).values_list("synced_at", flat=True).first()
+    return synced_at is not None and timezone.now() - synced_at <= timedelta(seconds=settings.FHIR_MIRROR_MAX_STALENESS_SECONDS)
+
+
+def get_resource(resource_type: str, resource_id: str) -> Optional[Dict]:
+    """
+    Read a resource from the mirror.
+
+    Args:
+        resource_type (str): e.g. "Practitioner".
+        resource_id (str): FHIR resource ID.
+
+    Returns:
+        Optional[Dict]: The resource, or None if the mirror can't serve it (not fresh, unknown or deleted): read it from FHIR then.
+    """
+    if not is_fresh(resource_type):
+        return None
+
+    return MirroredResource.objects.filter(
+        resource_type=resource_type, resource_id=resource_id, deleted=False
+    ).values_list("resource", flat=True).first()
+
+
+def list_resources(resource_type: str) -> Optional[List[Dict]]:
+    """
+    Read all (not deleted) resources of a type from the mirror.
+
+    Returns:
+        Optional[List[Dict]]: The resources, or None if the mirror is not fresh: search FHIR then.
+    """
+    if not is_fresh(resource_type):
+        return None
+
+    return list(
+        MirroredResource.objects.filter(resource_type=resource_type, deleted=False)
+        .order_by("resource_id")
+        .values_list("resource", flat=True)
+    )
+
+
+def _store(resource_type: str, resource_id: str, last_updated: datetime, resource: Optional[Dict]) -> bool:
+    """Store a version (or a tombstone if `resource` is None) if it is newer than the stored one. Returns True if stored."""
+    fields = {"last_updated": last_updated, "deleted": resource is None, "resource": resource}
+
+    # Conditional update: a concurrent writer of a newer version always wins
+    if MirroredResource.objects.filter(resource_type=resource_type, resource_id=resource_id, last_updated__lt=last_updated).update(**fields):
+        return True
+
+    try:
+        with transaction.atomic():
+            MirroredResource.objects.create(resource_type=resource_type, resource_id=resource_id, **fields)
+        return True
+    except IntegrityError: # Already stored, with this version or a newer one
+        return False
+
+
+def store_resource(resource: Dict) -> bool:
+    """
+    Store a version of a resource read from FHIR (its meta.lastUpdated orders versions).
+
+    Returns:
+        bool: True if stored, False if this version or a newer one was already stored.
+    """
+    last_updated = resource.get("meta", {}).get("lastUpdated")
+    if not last_updated:
+        return False
+    return _store(resource["resourceType"], resource["id"], _parse_last_updated(last_updated), resource)
+
+
+def store_deletion(resource_type: str, resource_id: str, deleted_at: str) -> bool:
+    """
+    Store the deletion of a resource, as reported by its _history (deleted_at is the server's time of the deletion).
+
+    Returns:
+        bool: True if stored, False if this deletion or a newer version was already stored.
+    """
+    return _store(resource_type, resource_id, _parse_last_updated(deleted_at), None)
+
+
+def apply_history_entries(resource_type: str, history_entries: List[Dict]) -> Tuple[Dict[str, int], Optional[datetime]]:
+    """
+    Store the versions and deletions of one page of a resource type's _history, in one transaction.
+
+    Returns:
+        Tuple[Dict[str, int], Optional[datetime]]: Counts of read "versions", of those "stored" and of stored
+            "deletions", and the newest time seen (None if the page was empty).
+    """
+    counts = {"versions": 0, "stored": 0, "deletions": 0}
+    newest = None
+
+    with transaction.atomic():
+        for history_entry in history_entries:
+            resource = history_entry.get("resource")
+            if history_entry.get("request", {}).get("method") == "DELETE" or resource is None:
+                # request.url is "<type>/<id>", optionally followed by "/_history/<versionId>"
+                resource_id = history_entry.get("request", {}).get("url", "").split("/")[1:2]
+                deleted_at = history_entry.get("response", {}).get("lastModified")
+                if not resource_id or not deleted_at:
+                    continue
+                stored = store_deletion(resource_type, resource_id[0], deleted_at)
+                counts["deletions"] += int(stored)
+                changed_at = _parse_last_updated(deleted_at)
+            else:
+                if resource.get("resourceType") != resource_type or not resource.get("meta", {}).get("lastUpdated"):
+                    continue
+                stored = store_resource(resource)
+                changed_at = _parse_last_updated(resource["meta"]["lastUpdated"])
+
+            counts["versions"] += 1
+            counts["stored"] += int(stored)
+            if newest is None or changed_at > newest:
+                newest = changed_at
+
+    return counts, newest
+
+
+def get_synced_until(resource_type: str) -> Optional[datetime]:
+    """Time the next sync of a type reads the history from (None -> never synced: its whole history)."""
+    return SyncWatermark.objects.filter(name=get_watermark_name(resource_type)).values_list("last_updated", flat=True).first()
+
+
+def mark_synced(resource_type: str, synced_until: Optional[datetime], synced_at: datetime):
+    """
+    Record a complete sync of a type.
+
+    Args:
+        resource_type (str): The synced type.
+        synced_until (Optional[datetime]): The next sync reads the history from it: time of the newest change applied,
+            at most the sync's start minus FHIR_MIRROR_SAFETY_LAG_SECONDS.
+        synced_at (datetime): Start of the sync: every change made before it is mirrored (staleness is measured from it).
+    """
+    SyncWatermark.objects.update_or_create(
+        name=get_watermark_name(resource_type),
+        defaults={"last_updated": synced_until, "synced_at": synced_at},
+    )
+
+
+def remember_written(resource: Dict):
+    """Store the server's version of a resource this process just wrote, so reads served by the mirror see the write."""
+    if resource.get("resourceType") and "id" in resource and is_mirrored(resource["resourceType"]):
+        store_resource(resource)
+
+
+def remember_deleted(resource_type: str, resource_id: str):
+    """
+    Forget a resource this process just deleted (reads of it go to FHIR). The deletion's server time is unknown here:
+    the next sync stores its tombstone.
+    """
+    if is_mirrored(resource_type):
+        MirroredResource.objects.filter(resource_type=resource_type, resource_id=resource_id).delete()
+
+
+def clear(resource_type: str):
+    """Drop the mirrored resources and the sync watermark of a type (the next sync reads its full history)."""
+    with transaction.atomic():
+        MirroredResource.objects.filter(resource_type=resource_type).delete()
+        SyncWatermark.objects.filter(name=get_watermark_name(resource_type)).delete()
@@ -0,0 +1,530 @@
+import contextvars
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Optional, Tuple, Dict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import cache
+
+from . import json_codec
+
+
+# ============================================================================
+# FHIR Transport
+# All HTTP calls to Azure Healthcare FHIR service go through this module so timeouts,
+# deadlines and hedging are applied in one place instead of in every function of fhir.py
+# ============================================================================
+
+class FhirDeadlineExceeded(requests.exceptions.Timeout):
+    """Raised when the deadline budget of the current request is spent before a FHIR call could be made."""
+
+
+class FhirCircuitOpen(requests.exceptions.ConnectionError):
+    """Raised without calling FHIR while the circuit breaker of the target endpoint is open."""
+
+
+# Absolute time.monotonic() value after which no FHIR call may start. None means no deadline is set (e.g. management commands)
+_deadline = contextvars.ContextVar("fhir_deadline", default=None)
+
+# One requests.Session per thread: keeps TCP/TLS connections to FHIR alive between calls without sharing a session across threads
+_thread_local = threading.local()
+_sessions_generation = 0
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+HEDGEABLE_METHODS = ("GET", "HEAD")
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE", "OPTIONS") # Only these are retried automatically
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504) # Throttling and transient server errors
+
+# Per-process counters, exposed by get_metrics()
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+
+
+@contextmanager
+def deadline(budget_seconds: float):
+    """
+    Set a deadline budget shared by every FHIR call made inside the block.
+    Nested deadlines can only shrink the budget, never extend it.
+
+    Args:
+        budget_seconds (float): Seconds available from now for all FHIR calls in the block.
+    """
+    new_deadline = time.monotonic() + budget_seconds
+    current_deadline = _deadline.get()
+    if current_deadline is not None:
+        new_deadline = min(new_deadline, current_deadline)
+
+    token = _deadline.set(new_deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """
+    Returns:
+        Optional[float]: Seconds left before the current deadline, or None if no deadline is set.
+    """
+    current_deadline = _deadline.get()
+    if current_deadline is None:
+        return None
+    return current_deadline - time.monotonic()
+
+
+def get_timeout() -> Tuple[float, float]:
+    """
+    Compute (connect, read) timeouts for the next FHIR call from the configured defaults and the remaining deadline budget.
+
+    Returns:
+        Tuple[float, float]: Connect and read timeouts in seconds, as accepted by requests.
+
+    Raises:
+        FhirDeadlineExceeded: If the remaining budget is too small to make another call.
+    """
+    connect_timeout = settings.FHIR_CONNECT_TIMEOUT_SECONDS
+    read_timeout = settings.FHIR_READ_TIMEOUT_SECONDS
+
+    remaining = remaining_budget()
+    if remaining is None:
+        return (connect_timeout, read_timeout)
+
+    if remaining < settings.FHIR_MIN_CALL_BUDGET_SECONDS:
+        raise FhirDeadlineExceeded("Deadline budget for FHIR calls of this request is exhausted.")
+
+    return (min(connect_timeout, remaining), min(read_timeout, remaining))
+
+
+class FhirResponse(requests.Response):
+    """requests.Response decoding its JSON body with core.json_codec, straight from the raw bytes."""
+
+    def json(self, **kwargs):
+        if kwargs: # Custom decoding options are only supported by the stdlib json module
+            return super().json(**kwargs)
+        try:
+            return json_codec.loads(self.content)
+        except ValueError as e: # orjson.JSONDecodeError and json.JSONDecodeError are both ValueErrors
+            raise requests.exceptions.JSONDecodeError(str(e), "", 0) from e
+
+
+class FhirHTTPAdapter(HTTPAdapter):
+    def build_response(self, req, resp) -> FhirResponse:
+        response = super().build_response(req, resp)
+        response.__class__ = FhirResponse # Same attributes, only json() differs
+        return response
+
+
+def get_session() -> requests.Session:
+    """
+    Returns:
+        requests.Session: The session of the calling thread (created on first use or after reset_sessions()).
+    """
+    session = getattr(_thread_local, "session", None)
+    if session is None or getattr(_thread_local, "generation", None) != _sessions_generation:
+        session = requests.Session()
+        session.mount("https://", FhirHTTPAdapter())
+        session.mount("http://", FhirHTTPAdapter())
+        _thread_local.session = session
+        _thread_local.generation = _sessions_generation
+    return session
+
+
+def reset_sessions():
+    """
+    Drop all pooled HTTP sessions and the hedging thread pool. Sessions are lazily re-created on next use.
+    Must be called in a forked child process so sockets and threads are not shared with the parent.
+    """
+    global _sessions_generation, _hedge_executor
+    _sessions_generation += 1
+    _thread_local.__dict__.clear()
+    with _hedge_executor_lock:
+        _hedge_executor = None
+
+
+def reset_after_fork():
+    """
+    Re-initialize all per-process transport state in a forked worker: HTTP sessions, hedging threads,
+    circuit breakers and metrics (called by gunicorn post_fork hook).
+    """
+    global _metrics_lock, _circuit_breakers_lock, _hedge_executor_lock
+    _hedge_executor_lock = threading.Lock() # Locks may have been held by another thread of the parent at fork time
+    reset_sessions()
+    _metrics_lock = threading.Lock()
+    _metrics.clear()
+    _circuit_breakers_lock = threading.Lock()
+    _circuit_breakers.clear()
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(
+                max_workers=settings.FHIR_HEDGE_MAX_WORKERS,
+                thread_name_prefix="fhir-hedge",
+            )
+        return _hedge_executor
+
+
+def _send(method: str, url: str, timeout: Tuple[float, float], **kwargs) -> requests.Response:
+    return get_session().request(method, url, timeout=timeout, **kwargs)
+
+
+def _send_hedged(method: str, url: str, timeout: Tuple[float, float], **kwargs) -> requests.Response:
+    """
+    Send the request, and if no response arrives within FHIR_HEDGE_DELAY_SECONDS send one backup copy.
+    The first successful response wins. Only used for idempotent methods.
+    """
+    executor = _get_hedge_executor()
+    primary = executor.submit(_send, method, url, timeout, **kwargs)
+
+    done, _ = wait([primary], timeout=settings.FHIR_HEDGE_DELAY_SECONDS)
+    if done:
+        return primary.result()
+
+    # Don't hedge if there is no budget left for a second call
+    remaining = remaining_budget()
+    if remaining is not None and remaining < settings.FHIR_MIN_CALL_BUDGET_SECONDS:
+        return primary.result()
+
+    backup = executor.submit(_send, method, url, timeout, **kwargs)
+    pending = {primary, backup}
+    last_error = None
+
+    # Bound total wait by the deadline so a trickling response can't hold the worker past its budget
+    wait_timeout = remaining_budget()
+    while pending:
+        done, pending = wait(pending, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            raise FhirDeadlineExceeded(f"Hedged {method} {url} did not complete before the deadline.")
+        for future in done:
+            try:
+                return future.result()
+            except requests.exceptions.RequestException as e:
+                last_error = e
+
+    raise last_error
+
+
+# ============================================================================
+# Admission control: shared rate limiter with priority classes
+# ============================================================================
+
+class FhirPriority(str, Enum):
+    INTERACTIVE = "interactive" # Page loads of logged-in users and visitors
+    BACKGROUND = "background" # Refreshes and jobs that someone will eventually wait for (e.g. cache refresh, outbox delivery)
+    BULK = "bulk" # Seeding, exports, aggregation jobs
+
+
+_priority = contextvars.ContextVar("fhir_priority", default=FhirPriority.INTERACTIVE)
+
+
+@contextmanager
+def priority(level: FhirPriority):
+    """
+    Set the priority class of every FHIR call made inside the block (usable as a decorator too).
+
+    Args:
+        level (FhirPriority): Priority class. Lower classes may only use a share of the rate limit (settings.FHIR_PRIORITY_SHARES)
+            so they yield to interactive traffic.
+    """
+    token = _priority.set(FhirPriority(level))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _try_acquire_request_unit(level: FhirPriority) -> bool:
+    """
+    Take one request unit from the current 1-second window shared by all workers (through the Django cache).
+    A priority class may only take units while the window usage is below its share of FHIR_RATE_LIMIT_PER_SECOND.
+    """
+    window_key = f"fhir_rate_window:{int(time.time())}"
+    allowed = settings.FHIR_RATE_LIMIT_PER_SECOND * settings.FHIR_PRIORITY_SHARES[level.value]
+
+    try:
+        cache.add(window_key, 0, timeout=5)
+        used = cache.incr(window_key)
+    except Exception: # Fail open: never block FHIR calls because the cache is unavailable
+        return True
+
+    if used > allowed:
+        try:
+            cache.decr(window_key) # Give back the unit we could not use so it is available to higher priorities
+        except Exception:
+            pass
+        return False
+
+    return True
+
+
+def acquire_request_unit():
+    """
+    Wait until the shared rate limiter admits one more FHIR call for the current priority class.
+    Keeps all workers together under the provisioned throughput of the FHIR service instead of tripping 429s.
+
+    Raises:
+        FhirDeadlineExceeded: If the request deadline expires while waiting.
+    """
+    if not settings.FHIR_RATE_LIMIT_PER_SECOND:
+        return
+
+    level = _priority.get()
+    while not _try_acquire_request_unit(level):
+        _count(f"rate_limited_{level.value}")
+
+        # Sleep until the next window, with jitter so waiting workers don't all wake at once
+        delay = (1 - (time.time() % 1)) + random.uniform(0, 0.05)
+        remaining = remaining_budget()
+        if remaining is not None and delay + settings.FHIR_MIN_CALL_BUDGET_SECONDS > remaining:
+            raise FhirDeadlineExceeded("Deadline expired while waiting for FHIR rate limiter.")
+        time.sleep(delay)
+
+
+# ============================================================================
+# Resilience: circuit breaker, retries with jittered backoff, metrics
+# ============================================================================
+
+def _count(metric: str, n: int = 1):
+    with _metrics_lock:
+        _metrics[metric] += n
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker (per process).
+
+    - closed: calls pass. After FHIR_CIRCUIT_FAILURE_THRESHOLD consecutive failures -> open.
+    - open: calls fail fast with FhirCircuitOpen. After FHIR_CIRCUIT_RESET_TIMEOUT_SECONDS -> half_open.
+    - half_open: one probe call passes. Success -> closed, failure -> open again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < settings.FHIR_CIRCUIT_RESET_TIMEOUT_SECONDS:
+                    _count("circuit_rejections")
+                    raise FhirCircuitOpen(f"FHIR endpoint '{self.endpoint}' is unavailable (circuit open).")
+                self.state = self.HALF_OPEN
+                self.probe_in_flight = False
+
+            if self.state == self.HALF_OPEN:
+                if self.probe_in_flight:
+                    _count("circuit_rejections")
+                    raise FhirCircuitOpen(f"FHIR endpoint '{self.endpoint}' is recovering (circuit half-open).")
+                self.probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= settings.FHIR_CIRCUIT_FAILURE_THRESHOLD:
+                if self.state != self.OPEN:
+                    _count("circuit_opened")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def as_dict(self) -> Dict:
+        return {"state": self.state, "consecutive_failures": self.consecutive_failures}
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_endpoint(url: str) -> str:
+    """
+    Map a FHIR URL to the endpoint name used for circuit breaking, e.g. ".../Patient/123?x=y" -> "Patient".
+    Calls to the service root (batch/transaction Bundles) map to "/".
+    """
+    base_path = urlsplit(settings.AZURE_FHIR_SERVICE_URL).path.rstrip("/")
+    path = urlsplit(url).path
+    if path.startswith(base_path):
+        path = path[len(base_path):]
+    return path.strip("/").split("/")[0] or "/"
+
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    endpoint = get_endpoint(url)
+    with _circuit_breakers_lock:
+        if endpoint not in _circuit_breakers:
+            _circuit_breakers[endpoint] = CircuitBreaker(endpoint)
+        return _circuit_breakers[endpoint]
+
+
+def get_retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """
+    Parse the Retry-After header (delay-seconds or HTTP-date) of a throttled/unavailable response.
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the header is missing or invalid.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+        return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _wait_before_retry(attempt: int, response: Optional[requests.Response] = None) -> bool:
+    """
+    Sleep before the next attempt using full-jitter exponential backoff, or longer if the server asked so (Retry-After).
+
+    Returns:
+        bool: False (without sleeping) if the wait would exceed FHIR_RETRY_MAX_DELAY_SECONDS or the remaining deadline budget.
+    """
+    backoff_cap = min(settings.FHIR_RETRY_MAX_DELAY_SECONDS, settings.FHIR_RETRY_BASE_DELAY_SECONDS * (2 ** (attempt - 1)))
+    delay = random.uniform(0, backoff_cap)
+
+    retry_after = get_retry_after_seconds(response) if response is not None else None
+    if retry_after is not None:
+        if retry_after > settings.FHIR_RETRY_MAX_DELAY_SECONDS:
+            return False
+        delay = max(delay, retry_after)
+
+    remaining = remaining_budget()
+    if remaining is not None and delay + settings.FHIR_MIN_CALL_BUDGET_SECONDS > remaining:
+        return False
+
+    time.sleep(delay)
+    return True
+
+
+def get_metrics() -> Dict:
+    """
+    Snapshot of this process' FHIR transport metrics: call/retry/throttling counters and circuit breaker states.
+    """
+    with _metrics_lock:
+        counters = dict(_metrics)
+    with _circuit_breakers_lock:
+        breakers = {endpoint: breaker.as_dict() for endpoint, breaker in _circuit_breakers.items()}
+    return {"counters": counters, "circuit_breakers": breakers}
+
+
+def request(method: str, url: str, hedge: Optional[bool] = None, idempotent: Optional[bool] = None, **kwargs) -> requests.Response:
+    """
+    Send an HTTP request to the FHIR service with timeouts derived from the current deadline budget.
+
+    Args:
+        method (str): HTTP method, e.g. "GET".
+        url (str): Full FHIR URL.
+        hedge (Optional[bool]): Send a hedged backup request if the first one is slow. Only applies to GET/HEAD.
+            Defaults to settings.FHIR_HEDGED_READS.
+        idempotent (Optional[bool]): Whether the call may be retried. Defaults to True for GET/HEAD/PUT/DELETE/OPTIONS.
+        **kwargs: Passed to requests (headers, params, json, data ..).
+
+    Returns:
+        requests.Response: The response. Status is not checked, callers keep calling raise_for_status().
+            A 429/5xx response is returned as is once retries are exhausted.
+
+    Raises:
+        FhirCircuitOpen: If the endpoint's circuit breaker is open.
+        FhirDeadlineExceeded: If the request deadline budget is spent.
+        requests.RequestException: Connection errors and timeouts once retries are exhausted.
+    """
+    method = method.upper()
+
+    if kwargs.get("json") is not None: # Encode once with the fast codec, instead of on every attempt with stdlib json
+        headers = dict(kwargs.get("headers") or {})
+        headers.setdefault("Content-Type", "application/json")
+        kwargs["headers"] = headers
+        kwargs["data"] = json_codec.dumps(kwargs.pop("json"))
+
+    if hedge is None:
+        hedge = settings.FHIR_HEDGED_READS
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+
+    max_attempts = 1 + (settings.FHIR_MAX_RETRIES if idempotent else 0)
+    breaker = get_circuit_breaker(url)
+    attempt = 0
+
+    while True:
+        attempt += 1
+        acquire_request_unit()
+        timeout = get_timeout()
+        breaker.before_call()
+        _count("calls")
+
+        try:
+            if hedge and method in HEDGEABLE_METHODS:
+                response = _send_hedged(method, url, timeout, **kwargs)
+            else:
+                response = _send(method, url, timeout, **kwargs)
+
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            breaker.record_failure()
+            _count("connection_errors")
+            if isinstance(e, FhirDeadlineExceeded) or attempt >= max_attempts or not _wait_before_retry(attempt):
+                raise
+            _count("retries")
+            continue
+
+        except BaseException: # Any other outcome (e.g. ChunkedEncodingError, InvalidURL, hedging error) must end a half-open probe too
+            breaker.record_failure()
+            raise
+
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            breaker.record_failure()
+            _count("throttled" if response.status_code == 429 else "server_errors")
+            if attempt < max_attempts and _wait_before_retry(attempt, response):
+                _count("retries")
+                continue
+            return response
+
+        breaker.record_success()
+        return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+def put(url: str, **kwargs) -> requests.Response:
+    return request("PUT", url, **kwargs)
+
+def delete(url: str, **kwargs) -> requests.Response:
+    return request("DELETE", url, **kwargs)
+
+def patch(url: str, **kwargs) -> requests.Response:
+    return request("PATCH", url, **kwargs)
@@ -3,6 +3,7 @@ from django.conf import settings
 from django import forms
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Submit
+from django.core.validators import RegexValidator
 
 from phonenumber_field.formfields import PhoneNumberField
 
@@ -17,6 +18,7 @@ class SignInDummyForm(forms.Form):
 
 
 UNLIMITED_REPRESENTAION = settings.UNLIMITED_NUMBER_REPRESENTAION  # You can handle this as a special case in your logic
+FHIR_ID_VALIDATOR = RegexValidator(r'^[A-Za-z0-9\-\.]{1,64}$', _("Invalid FHIR resource ID.")) # FHIR 'id' datatype
 
 class SkincareProfessionalForm(forms.Form):
     title = forms.CharField(label=_("Title"), max_length=10)
@@ -37,6 +39,8 @@ class SkincareProfessionalForm(forms.Form):
 
         if not is_edit:
             self.fields['email'] = forms.EmailField(label=_("Email"), max_length=100)
+        else:
+            self.fields['version_id'] = forms.CharField(widget=forms.HiddenInput(), required=False) # FHIR meta.versionId the form was loaded from, sent as If-Match
 
         # Crispy Forms settings
         self.helper = FormHelper()
@@ -61,6 +65,8 @@ class SkincareClientForm(forms.Form):
 
         if not is_edit:
             self.fields['email'] = forms.EmailField(label=_("Email"), max_length=100, required=True)
+        else:
+            self.fields['version_id'] = forms.CharField(widget=forms.HiddenInput(), required=False) # FHIR meta.versionId the form was loaded from, sent as If-Match
 
         # Crispy Forms settings
         self.helper = FormHelper()
@@ -172,4 +178,21 @@ class ContactUsForm(forms.Form):
         label=_("Message"),
         required=True,
         widget=forms.Textarea(attrs={"class": "form-textarea", "placeholder": _("Your message...")})
-    )
\ No newline at end of file
+    )
+
+
+class BulkAccountStatusForm(forms.Form):
+    """Admin dashboard bulk action: activate/deactivate the selected professionals or clients."""
+    resource_type = forms.ChoiceField(choices=[('Practitioner', _('Professionals')), ('Patient', _('Clients'))], widget=forms.HiddenInput())
+    action = forms.ChoiceField(label=_("Action"), choices=[('activate', _('Activate')), ('deactivate', _('Deactivate'))])
+    # Comma separated FHIR IDs of the selected rows, filled by JS. One field (not one input per row) so that selecting
+    # hundreds of rows doesn't hit DATA_UPLOAD_MAX_NUMBER_FIELDS
+    resource_ids = forms.CharField(widget=forms.HiddenInput(), error_messages={'required': _("Please select at least one row.")})
+
+    def clean_resource_ids(self):
+        resource_ids = [resource_id.strip() for resource_id in self.cleaned_data['resource_ids'].split(",") if resource_id.strip()]
+        if not resource_ids:
+            raise forms.ValidationError(_("Please select at least one row."))
+        for resource_id in resource_ids:
+            FHIR_ID_VALIDATOR(resource_id)
+        return resource_ids
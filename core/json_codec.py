@@ -0,0 +1,75 @@
+import dataclasses
+import json
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.functional import Promise
+
+try:
+    import orjson # Optional: native (Rust) JSON codec, several times faster than stdlib json on FHIR bundles
+except ImportError:
+    orjson = None
+
+
+# ============================================================================
+# JSON codec
+# Used for FHIR payloads (core.fhir_transport) and JSON sent to templates/browsers. Uses orjson when installed and
+# falls back to the stdlib json module otherwise, with the same output types: loads() takes the raw response bytes
+# (no intermediate str), dumps() returns UTF-8 bytes.
+# ============================================================================
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _default(obj):
+    """Serialize what orjson doesn't natively: lazy translations (gettext_lazy) and Decimals (money values, as strings like DjangoJSONEncoder)."""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type): # Natively handled by orjson, needed by the stdlib fallback
+        return dataclasses.asdict(obj)
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return str(obj) # Exact, and the same type with or without orjson
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+
+    def loads(data):
+        """
+        Args:
+            data (bytes | str): JSON document, typically raw HTTP response bytes.
+
+        Returns:
+            The decoded object.
+        """
+        return orjson.loads(data)
+
+    def dumps(obj) -> bytes:
+        """
+        Args:
+            obj: Object to serialize. Dates/datetimes, UUIDs, Decimals, dataclasses and lazy translations are supported.
+
+        Returns:
+            bytes: UTF-8 encoded JSON (non-ASCII characters are not escaped).
+        """
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+else:
+
+    class _JSONEncoder(DjangoJSONEncoder):
+        def default(self, obj):
+            try:
+                return _default(obj)
+            except TypeError:
+                return super().default(obj)
+
+    def loads(data):
+        return json.loads(data) # Accepts bytes directly (encoding detected per RFC 8259)
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, cls=_JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(obj) -> str:
+    """Same as dumps(), as a str (e.g. to embed in a template)."""
+    return dumps(obj).decode("utf-8")
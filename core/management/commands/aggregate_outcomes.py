@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core import analytics
+
+
+class Command(BaseCommand):
+    help = "Update the outcome analytics shown on the admin dashboard with the quiz submissions changed since the last run. Run on a schedule (e.g. hourly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Drop all aggregates and recompute them from every quiz submission (e.g. after submissions were deleted).")
+
+    def handle(self, *args, **options):
+        try:
+            counts = analytics.aggregate_outcomes(rebuild=options["rebuild"])
+        except analytics.AggregationInProgressError as e:
+            self.stderr.write(f"Skipped: {e}")
+            return
+        self.stdout.write(
+            f"Processed {counts['responses']} quiz submissions: updated {counts['clients']} clients "
+            f"({counts['recomputed_clients']} recomputed from their full history) of {counts['practitioners']} professionals."
+        )
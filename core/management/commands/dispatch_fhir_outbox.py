@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver pending FHIR outbox entries (quiz submissions) to the FHIR server. Run periodically, or keep running with --loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep dispatching every --interval seconds.")
+        parser.add_argument("--interval", type=float, default=10, help="Seconds between dispatch runs with --loop.")
+        parser.add_argument("--limit", type=int, default=100, help="Max entries handled per run.")
+
+    def handle(self, *args, **options):
+        while True:
+            outbox.purge_delivered(older_than_days=settings.FHIR_OUTBOX_KEEP_DELIVERED_DAYS)
+            counts = outbox.dispatch_pending(limit=options["limit"])
+            if counts["delivered"] or counts["failed"]:
+                self.stdout.write(f"Delivered {counts['delivered']}, failed {counts['failed']} FHIR outbox entries.")
+
+            if not options["loop"]:
+                break
+            if counts["delivered"] < options["limit"]: # Backlog drained, otherwise go on right away
+                time.sleep(options["interval"])
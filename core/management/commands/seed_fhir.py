@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import startup
+
+
+class Command(BaseCommand):
+    help = "Seed the active quiz Questionnaire and platform plans on the FHIR server. Idempotent: run once per deploy."
+
+    def handle(self, *args, **options):
+        failed = startup.seed_fhir_resources()
+
+        if failed:
+            raise CommandError(f"{len(failed)} FHIR seed entries failed: {failed}")
+
+        self.stdout.write(self.style.SUCCESS("FHIR resources seeded successfully."))
@@ -0,0 +1,48 @@
+import time
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import fhir
+
+
+class Command(BaseCommand):
+    help = (
+        "Update the local read mirror of FHIR resources (settings.FHIR_MIRROR_RESOURCE_TYPES) with the changes since the last sync. "
+        "Run well within FHIR_MIRROR_MAX_STALENESS_SECONDS (e.g. every minute), or keep running with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--resource-type", action="append", choices=settings.FHIR_MIRROR_RESOURCE_TYPES, help="Only sync this type (repeatable). Default: all mirrored types.")
+        parser.add_argument("--rebuild", action="store_true", help="Drop the mirrored resources first and read their whole history.")
+        parser.add_argument("--loop", action="store_true", help="Keep syncing every --interval seconds.")
+        parser.add_argument("--interval", type=float, default=30, help="Seconds between syncs with --loop.")
+
+    def handle(self, *args, **options):
+        if not settings.FHIR_MIRROR_ENABLED:
+            self.stdout.write("FHIR_MIRROR_ENABLED is off: the mirror would not be used. Syncing anyway.")
+
+        resource_types = options["resource_type"] or settings.FHIR_MIRROR_RESOURCE_TYPES
+        rebuild = options["rebuild"]
+        while True:
+            for resource_type in resource_types:
+                try:
+                    counts = fhir.sync_mirror(resource_type, rebuild=rebuild)
+                except requests.RequestException as e:
+                    if not options["loop"]:
+                        raise
+                    # The mirror of this type gets stale and reads go to FHIR until a sync succeeds again
+                    self.stderr.write(f"Sync of {resource_type} failed: {e}")
+                    continue
+
+                if counts["stored"] or not options["loop"]:
+                    self.stdout.write(
+                        f"{resource_type}: read {counts['versions']} versions, stored {counts['stored']} "
+                        f"(of which {counts['deletions']} deletions)."
+                    )
+            rebuild = False
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
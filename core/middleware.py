@@ -1,8 +1,12 @@
 import os
 from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
 from django.core.exceptions import DisallowedHost
 from django.utils.deprecation import MiddlewareMixin
 
+from . import fhir_transport
+from . import fhir
+
 class FlexibleAllowedHostsMiddleware(MiddlewareMixin):
     
     def process_request(self, request):
@@ -28,4 +32,51 @@ class FlexibleAllowedHostsMiddleware(MiddlewareMixin):
             if host in settings.ALLOWED_HOSTS:
                 return  # Allow DEV allowed hosts
 
-            raise DisallowedHost(f"Host '{host}' not allowed.")
\ No newline at end of file
+            raise DisallowedHost(f"Host '{host}' not allowed.")
+
+
+class LegacyAuthBackendMiddleware:
+    """
+    Sessions store the dotted path of the backend the user logged in with, and Django logs the user out if that path is
+    no longer in AUTHENTICATION_BACKENDS. Point sessions of the stock backends at their cached subclasses
+    (settings.LEGACY_AUTHENTICATION_BACKENDS) before AuthenticationMiddleware loads the user.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        backend_path = request.session.get(BACKEND_SESSION_KEY)
+        if backend_path in settings.LEGACY_AUTHENTICATION_BACKENDS:
+            request.session[BACKEND_SESSION_KEY] = settings.LEGACY_AUTHENTICATION_BACKENDS[backend_path]
+        return self.get_response(request)
+
+
+class FhirDeadlineMiddleware:
+    """
+    Give every request a deadline budget shared by all FHIR calls made while serving it.
+    Each FHIR call derives its connect/read timeouts from the remaining budget, so a slow FHIR
+    response can't pin a gunicorn worker beyond settings.FHIR_REQUEST_DEADLINE_SECONDS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with fhir_transport.deadline(settings.FHIR_REQUEST_DEADLINE_SECONDS):
+            return self.get_response(request)
+
+
+class FhirIdentityMapMiddleware:
+    """
+    Give every request its own FHIR identity map (see fhir.identity_map_scope): a resource read by ID is fetched
+    once per request, and later reads (e.g. edit_practitioner re-reading the practitioner a view just showed) reuse it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with fhir.identity_map_scope():
+            return self.get_response(request)
+
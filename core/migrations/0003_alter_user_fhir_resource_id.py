@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_user_clients_plan_id_user_platform_plan_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='fhir_resource_id',
+            field=models.CharField(db_index=True, default='NON_FHIR_RESOURCE', max_length=255),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_fhiroutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientOutcome',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('patient_fhir_id', models.CharField(max_length=255)),
+                ('practitioner_fhir_id', models.CharField(db_index=True, max_length=255)),
+                ('n_checkups', models.PositiveIntegerField(default=0)),
+                ('last_authored', models.DateTimeField()),
+                ('values', models.JSONField()),
+                ('prev_deltas', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionOutcome',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('practitioner_fhir_id', models.CharField(max_length=255)),
+                ('question_idx', models.PositiveSmallIntegerField()),
+                ('n_clients', models.PositiveIntegerField(default=0)),
+                ('n_improved', models.PositiveIntegerField(default=0)),
+                ('n_worsened', models.PositiveIntegerField(default=0)),
+                ('sum_improvement', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SyncWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('last_updated', models.DateTimeField(blank=True, null=True)),
+                ('ids_at_last_updated', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='questionoutcome',
+            constraint=models.UniqueConstraint(fields=('practitioner_fhir_id', 'question_idx'), name='unique_question_outcome'),
+        ),
+        migrations.AddConstraint(
+            model_name='clientoutcome',
+            constraint=models.UniqueConstraint(fields=('patient_fhir_id', 'practitioner_fhir_id'), name='unique_client_outcome'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_outcome_analytics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MirroredResource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource_type', models.CharField(max_length=64)),
+                ('resource_id', models.CharField(max_length=255)),
+                ('last_updated', models.DateTimeField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('resource', models.JSONField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='syncwatermark',
+            name='synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='mirroredresource',
+            constraint=models.UniqueConstraint(fields=('resource_type', 'resource_id'), name='unique_mirrored_resource'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_fhir_read_mirror'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncwatermark',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
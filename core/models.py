@@ -5,11 +5,115 @@ from django.db import models
 class User(AbstractUser):
     # Common fields go here
     email = models.EmailField(unique=True)  # override to enforce uniqueness
-    fhir_resource_id = models.CharField(max_length=255, null=False, blank=False, default="NON_FHIR_RESOURCE")
+    fhir_resource_id = models.CharField(max_length=255, null=False, blank=False, default="NON_FHIR_RESOURCE", db_index=True) # Indexed: users are looked up by their FHIR ID on most pages. Not unique since non FHIR users share the default
     platform_plan_id = models.CharField(max_length=255, null=True, blank=True, default="") # Use to link professional to platform plan subscription (PractitionerRole) -> minimize FHIR queries
     clients_plan_id = models.CharField(max_length=255, null=True, blank=True, default="") # Use to link professional to their clients plan subscription -> minimize FHIR queries
     professional_plan_id  = models.CharField(max_length=255, null=True, blank=True, default="") # Use to link client to professional plan subscription -> minimize FHIR queries
     is_verified = models.BooleanField(default=False)
     
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.username
+
+
+class FhirOutbox(models.Model):
+    """
+    Durable write-behind queue of FHIR resources (e.g. quiz QuestionnaireResponses) delivered by core.outbox.
+    Resources have client-assigned ids and are delivered with PUT, so a delivery can be retried or replayed safely.
+    """
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        DELIVERED = "delivered"
+        FAILED = "failed" # Gave up after settings.FHIR_OUTBOX_MAX_ATTEMPTS, needs attention
+
+    resource_type = models.CharField(max_length=64)
+    resource_id = models.CharField(max_length=64, unique=True) # Client-assigned FHIR id: idempotency key of the delivery
+    resource = models.JSONField()
+    subject_id = models.CharField(max_length=255, db_index=True) # FHIR Patient ID, to show pending submissions on care charts
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField() # Also a lease: a dispatcher pushes it forward while delivering
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.resource_type}/{self.resource_id} ({self.status})"
+
+
+
+# ============================================================================
+# Outcome analytics
+# Precomputed by the `aggregate_outcomes` command (core.analytics) from QuestionnaireResponses changed since its last
+# run, so the admin dashboard renders clinic-wide outcomes without reading FHIR.
+# ============================================================================
+
+class SyncWatermark(models.Model):
+    """How far an incremental FHIR job got: the meta.lastUpdated of the last change it processed."""
+    name = models.CharField(max_length=64, unique=True) # Job name
+    last_updated = models.DateTimeField(null=True, blank=True) # None -> nothing processed yet
+    ids_at_last_updated = models.JSONField(default=list) # Resources processed with exactly `last_updated`, skipped when seen again
+    synced_at = models.DateTimeField(null=True, blank=True) # Start of the last complete run: every change made before it was processed
+    locked_until = models.DateTimeField(null=True, blank=True) # Lease of the run in progress (renewed as it goes): other runs skip the job until then
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_updated}"
+
+
+class ClientOutcome(models.Model):
+    """Care chart of one client with one professional, as of its latest check-up (enough to continue it incrementally)."""
+    patient_fhir_id = models.CharField(max_length=255)
+    practitioner_fhir_id = models.CharField(max_length=255, db_index=True)
+    n_checkups = models.PositiveIntegerField(default=0)
+    last_authored = models.DateTimeField()
+    values = models.JSONField() # Progression value per question after the latest check-up
+    prev_deltas = models.JSONField() # Latest answer per question
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["patient_fhir_id", "practitioner_fhir_id"], name="unique_client_outcome")]
+
+    def __str__(self):
+        return f"Patient/{self.patient_fhir_id} with Practitioner/{self.practitioner_fhir_id}"
+
+
+class QuestionOutcome(models.Model):
+    """Outcome of one question over all clients of one professional. Improvement is a client's value minus the initial value."""
+    practitioner_fhir_id = models.CharField(max_length=255)
+    question_idx = models.PositiveSmallIntegerField() # 0-based position in the questionnaire (linkId - 1)
+    n_clients = models.PositiveIntegerField(default=0)
+    n_improved = models.PositiveIntegerField(default=0)
+    n_worsened = models.PositiveIntegerField(default=0)
+    sum_improvement = models.IntegerField(default=0) # Sums (not averages), so professionals can be combined
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["practitioner_fhir_id", "question_idx"], name="unique_question_outcome")]
+
+    def __str__(self):
+        return f"Practitioner/{self.practitioner_fhir_id} question {self.question_idx + 1}"
+
+
+# ============================================================================
+# FHIR read mirror
+# Local copy of rarely changing FHIR resources (see settings.FHIR_MIRROR_RESOURCE_TYPES), kept current by the
+# `sync_fhir_mirror` command from each type's _history. FHIR stays the source of truth: core.fhir_mirror only
+# serves it while the last complete sync is recent enough.
+# ============================================================================
+
+class MirroredResource(models.Model):
+    """Latest known version of a FHIR resource. Deleted resources are kept as tombstones so older versions don't come back."""
+    resource_type = models.CharField(max_length=64)
+    resource_id = models.CharField(max_length=255)
+    last_updated = models.DateTimeField() # meta.lastUpdated of the stored version (or time of the deletion)
+    deleted = models.BooleanField(default=False)
+    resource = models.JSONField(null=True, blank=True) # None for tombstones
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["resource_type", "resource_id"], name="unique_mirrored_resource")]
+
+    def __str__(self):
+        return f"{self.resource_type}/{self.resource_id}{' (deleted)' if self.deleted else ''}"
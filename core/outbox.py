@@ -0,0 +1,197 @@
+import random
+import threading
+from datetime import timedelta
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import FhirOutbox
+from . import caching
+from . import fhir
+from . import fhir_transport
+
+
+# ============================================================================
+# FHIR write-behind outbox
+# Quiz submissions are stored in the local FhirOutbox table (a fast local insert) and delivered to FHIR afterwards,
+# by a background thread started after each submission and by the `dispatch_fhir_outbox` management command
+# (run periodically, or with --loop). Resources have client-assigned ids and are delivered with PUT, so entries can be
+# retried until FHIR accepts them without creating duplicates. Pending submissions are shown on care charts meanwhile.
+# ============================================================================
+
+def enqueue_questionnaire_response(practitioner_id: str, patient_id: str, question_answers: List[dict]) -> FhirOutbox:
+    """
+    Store a quiz submission for delivery to FHIR, and start delivering it in the background.
+
+    Args:
+        practitioner_id (str): FHIR Practitioner ID (author).
+        patient_id (str): FHIR Patient ID (subject).
+        question_answers (List[dict]): QuestionnaireResponse items (see questionnaires.build_question_answers).
+
+    Returns:
+        FhirOutbox: The stored outbox entry.
+    """
+    questionnaire_response = fhir.build_questionnaire_response(practitioner_id, patient_id, question_answers)
+
+    entry = FhirOutbox.objects.create(
+        resource_type=questionnaire_response["resourceType"],
+        resource_id=questionnaire_response["id"],
+        resource=questionnaire_response,
+        subject_id=patient_id,
+        next_attempt_at=timezone.now(),
+    )
+
+    caching.invalidate_care_summaries(practitioner_id) # Pending submissions count on the professional dashboard
+
+    if settings.FHIR_OUTBOX_DISPATCH_AFTER_ENQUEUE:
+        dispatch_in_background()
+
+    return entry
+
+
+def get_pending_resources(resource_type: str, subject_id: str) -> List[dict]:
+    """
+    Args:
+        resource_type (str): e.g. "QuestionnaireResponse".
+        subject_id (str): FHIR Patient ID.
+
+    Returns:
+        List[dict]: Resources of the patient still waiting for delivery to FHIR, oldest first. Failed entries (retries
+            used up) are left out: they will never reach FHIR and are handled from Django admin.
+    """
+    return list(
+        FhirOutbox.objects
+        .filter(resource_type=resource_type, subject_id=subject_id, status=FhirOutbox.Status.PENDING)
+        .order_by("created_at")
+        .values_list("resource", flat=True)
+    )
+
+
+def get_pending_resources_by_subject(resource_type: str, subject_ids: Iterable[str]) -> Dict[str, List[dict]]:
+    """
+    Same as get_pending_resources, for many patients at once.
+
+    Returns:
+        Dict[str, List[dict]]: FHIR Patient ID -> its pending resources, oldest first. Patients without any are left out.
+    """
+    resources_by_subject = {}
+    for subject_id, resource in (
+        FhirOutbox.objects
+        .filter(resource_type=resource_type, subject_id__in=list(subject_ids), status=FhirOutbox.Status.PENDING)
+        .order_by("created_at")
+        .values_list("subject_id", "resource")
+    ):
+        resources_by_subject.setdefault(subject_id, []).append(resource)
+    return resources_by_subject
+
+
+def _get_retry_delay_seconds(attempts: int) -> float:
+    # Full jitter exponential backoff (same policy as fhir_transport retries, on a longer time scale)
+    return random.uniform(0, min(settings.FHIR_OUTBOX_RETRY_MAX_SECONDS, settings.FHIR_OUTBOX_RETRY_BASE_SECONDS * 2 ** attempts))
+
+
+def _claim(entry: FhirOutbox) -> bool:
+    """Lease an entry to this dispatcher by pushing its next_attempt_at forward. False if another dispatcher got it first."""
+    lease_until = timezone.now() + timedelta(seconds=settings.FHIR_OUTBOX_LEASE_SECONDS)
+    claimed = FhirOutbox.objects.filter(
+        pk=entry.pk, status=FhirOutbox.Status.PENDING, next_attempt_at=entry.next_attempt_at
+    ).update(next_attempt_at=lease_until)
+    return claimed == 1
+
+
+def deliver(entry: FhirOutbox) -> bool:
+    """
+    PUT an outbox entry's resource to FHIR and record the outcome.
+
+    Returns:
+        bool: True if delivered. On failure the entry is rescheduled with backoff, or marked failed after
+            settings.FHIR_OUTBOX_MAX_ATTEMPTS attempts.
+    """
+    try:
+        fhir.put_resource(entry.resource)
+    except Exception as e:
+        attempts = entry.attempts + 1
+        failed = attempts >= settings.FHIR_OUTBOX_MAX_ATTEMPTS
+        FhirOutbox.objects.filter(pk=entry.pk).update(
+            attempts=attempts,
+            status=FhirOutbox.Status.FAILED if failed else FhirOutbox.Status.PENDING,
+            next_attempt_at=timezone.now() + timedelta(seconds=_get_retry_delay_seconds(attempts)),
+            last_error=str(e)[:2000],
+        )
+        print(f"! Delivery of {entry.resource_type}/{entry.resource_id} to FHIR failed (attempt {attempts}): ", str(e))
+        if failed: # No longer shown as pending
+            caching.invalidate_care_summaries(entry.resource.get("author", {}).get("reference", "").split("/")[-1])
+        return False
+
+    FhirOutbox.objects.filter(pk=entry.pk).update(
+        attempts=entry.attempts + 1,
+        status=FhirOutbox.Status.DELIVERED,
+        delivered_at=timezone.now(),
+        last_error="",
+    )
+    return True
+
+
+def dispatch_pending(limit: int = 100) -> dict:
+    """
+    Deliver due pending outbox entries, oldest first. Safe to run from several processes at once.
+
+    Args:
+        limit (int): Max entries handled in this run.
+
+    Returns:
+        dict: {"delivered": n, "failed": n} counts of this run.
+    """
+    counts = {"delivered": 0, "failed": 0}
+
+    due_entries = (
+        FhirOutbox.objects
+        .filter(status=FhirOutbox.Status.PENDING, next_attempt_at__lte=timezone.now())
+        .order_by("next_attempt_at")[:limit]
+    )
+
+    with fhir_transport.priority(fhir_transport.FhirPriority.BACKGROUND):
+        for entry in due_entries:
+            if not _claim(entry):
+                continue
+            with fhir_transport.deadline(settings.FHIR_OUTBOX_LEASE_SECONDS):
+                counts["delivered" if deliver(entry) else "failed"] += 1
+
+    return counts
+
+
+_dispatch_lock = threading.Lock()
+
+def dispatch_in_background():
+    """Run dispatch_pending() in a daemon thread, unless one is already running in this process."""
+    if not _dispatch_lock.acquire(blocking=False):
+        return # The running dispatcher also picks up entries enqueued meanwhile
+
+    def dispatch():
+        try:
+            while dispatch_pending()["delivered"]:
+                pass # Keep going while entries get delivered (e.g. a backlog after a FHIR outage)
+        except Exception as e:
+            print(f"! Background FHIR outbox dispatch failed: ", str(e))
+        finally:
+            _dispatch_lock.release()
+            connection.close() # Threads get their own DB connection, don't leak it
+
+    threading.Thread(target=dispatch, name="fhir-outbox-dispatch", daemon=True).start()
+
+
+def purge_delivered(older_than_days: float) -> int:
+    """
+    Delete entries delivered more than `older_than_days` ago (they are in FHIR now).
+
+    Returns:
+        int: Number of deleted entries.
+    """
+    deleted, _ = FhirOutbox.objects.filter(
+        status=FhirOutbox.Status.DELIVERED,
+        delivered_at__lt=timezone.now() - timedelta(days=older_than_days),
+    ).delete()
+    return deleted
+
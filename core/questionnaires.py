@@ -1,3 +1,8 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from . import fhir as fhir
 
@@ -144,3 +149,104 @@ def get_questionnaire(questionnaire_title: str) -> list[dict]:
 
 
 
+# ============================================================================
+# Compiled questionnaire schema
+# Quiz submissions are validated and turned into QuestionnaireResponse items against a schema compiled (and validated)
+# once per process from `questionnaires`, so submitting a quiz needs no FHIR read before the write.
+# ============================================================================
+
+SUPPORTED_VALUE_TYPES = ("integer", "boolean", "string")
+
+@dataclass(frozen=True, slots=True)
+class CompiledQuestion:
+    link_id: str # linkId of the QuestionnaireResponse item (1-based position of the question)
+    field_name: str # Name of the quiz form field holding the answer
+    value_type: str # One of SUPPORTED_VALUE_TYPES
+    allowed_values: frozenset
+
+@dataclass(frozen=True, slots=True)
+class CompiledQuestionnaire:
+    title: str
+    questions: Tuple[CompiledQuestion, ...]
+
+@lru_cache(maxsize=None)
+def get_compiled_questionnaire(questionnaire_title: str) -> CompiledQuestionnaire:
+    """
+    Compile a questionnaire of the questionnaires dictionary into its answer schema (compiled once, then cached).
+
+    Args:
+        questionnaire_title (str): The title of the questionnaire.
+
+    Returns:
+        CompiledQuestionnaire: linkIds, form field names, value types and allowed answer values of each question.
+
+    Raises:
+        KeyError: If no questionnaire has this title.
+        ValueError: If the questionnaire definition is invalid (no options, unsupported or mixed value types..).
+    """
+    compiled_questions = []
+
+    for i, question in enumerate(get_questionnaire(questionnaire_title)):
+        options = question.get("options") or []
+        if not options:
+            raise ValueError(f"Question {i + 1} of questionnaire '{questionnaire_title}' has no options.")
+
+        value_types = {option.get("value_type") for option in options}
+        if len(value_types) != 1 or not value_types <= set(SUPPORTED_VALUE_TYPES):
+            raise ValueError(f"Question {i + 1} of questionnaire '{questionnaire_title}' has unsupported or mixed value types: {value_types}")
+
+        compiled_questions.append(CompiledQuestion(
+            link_id=str(i + 1),
+            field_name=f"q{i}",
+            value_type=value_types.pop(),
+            allowed_values=frozenset(option["value"] for option in options),
+        ))
+
+    return CompiledQuestionnaire(title=questionnaire_title, questions=tuple(compiled_questions))
+
+def _parse_answer(value_type: str, answer: str):
+    if value_type == "integer":
+        return int(answer)
+    if value_type == "boolean":
+        if answer not in ("true", "false"):
+            raise ValueError(answer)
+        return answer == "true"
+    return answer
+
+def build_question_answers(compiled_questionnaire: CompiledQuestionnaire, form_data) -> List[Dict]:
+    """
+    Validate submitted quiz answers against a compiled questionnaire and shape them as QuestionnaireResponse items.
+
+    Args:
+        compiled_questionnaire (CompiledQuestionnaire): See get_compiled_questionnaire.
+        form_data: Submitted form (e.g. request.POST) with one answer per question field.
+
+    Returns:
+        List[Dict]: [{"linkId", "answer": [{"valueX": value}]}] for fhir.create_questionnaire_response, one per question.
+
+    Raises:
+        ValidationError: If an answer is missing, malformed or not one of the question's options.
+    """
+    question_answers = []
+
+    for question in compiled_questionnaire.questions:
+        answer = form_data.get(question.field_name)
+        if answer is None or answer == "":
+            raise ValidationError(_("Please answer question %(n)s.") % {"n": question.link_id})
+
+        try:
+            value = _parse_answer(question.value_type, answer)
+        except ValueError:
+            value = None
+
+        if value is None or value not in question.allowed_values:
+            raise ValidationError(_("Invalid answer to question %(n)s.") % {"n": question.link_id})
+
+        # Map to FHIR's valueX format
+        question_answers.append({
+            "linkId": question.link_id,
+            "answer": [{f"value{question.value_type.capitalize()}": value}]
+        })
+
+    return question_answers
+
@@ -46,7 +46,7 @@ INSTALLED_APPS = [
     'crispy_forms',
     'crispy_bootstrap5',
     'phonenumber_field',
-    'core.apps.CoreAppConfig' # This is important to run startup function of core app
+    'core.apps.CoreAppConfig'
 ]
 
 MIDDLEWARE = [
@@ -55,8 +55,11 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',  # i18n
     'core.middleware.FlexibleAllowedHostsMiddleware', # Flexiblly consider all ACA possible subdomains on ACA Env as allowed host
+    'core.middleware.FhirDeadlineMiddleware', # Per-request deadline budget for all FHIR calls
+    'core.middleware.FhirIdentityMapMiddleware', # Each FHIR resource is read at most once per request
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'core.middleware.LegacyAuthBackendMiddleware', # Keeps sessions of the stock auth backends logged in (see LEGACY_AUTHENTICATION_BACKENDS)
     'django.contrib.auth.middleware.AuthenticationMiddleware', # Important for Outh
     'allauth.account.middleware.AccountMiddleware', # Important for Outh
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -88,13 +91,71 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite by default. Several gunicorn workers/threads share the file, so connections are kept open, wait for locks
+# instead of failing with "database is locked", and use WAL (see core/db.py) so readers don't block on the writer.
+# Multi-replica deployments can't share a SQLite file: set POSTGRES_HOST to use a server database instead
+# (requires psycopg to be installed). Point it at a pooler (e.g. PgBouncer) to bound connections across replicas.
+POSTGRES_HOST = os.environ.get("POSTGRES_HOST", "")
+
+if POSTGRES_HOST:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'HOST': POSTGRES_HOST,
+            'PORT': os.environ.get("POSTGRES_PORT", "5432"),
+            'NAME': os.environ.get("POSTGRES_DB", "skinsight"),
+            'USER': os.environ.get("POSTGRES_USER", ""),
+            'PASSWORD': os.environ.get("POSTGRES_PASSWORD", ""),
+            'CONN_MAX_AGE': int(os.environ.get("DB_CONN_MAX_AGE", 60)), # Seconds a connection is reused. 0 when the pooler is in transaction mode
+            'CONN_HEALTH_CHECKS': True, # Drop reused connections the server/pooler closed meanwhile
+            'DISABLE_SERVER_SIDE_CURSORS': True, # Server-side cursors don't work through a transaction-mode pooler
+            'OPTIONS': {
+                'connect_timeout': 5,
+            },
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': int(os.environ.get("DB_CONN_MAX_AGE", 600)), # Reuse connections (one per worker thread) instead of opening one per request
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': 20, # Seconds to wait for a lock held by another worker before "database is locked"
+            },
+        }
+    }
+
+# SQLite PRAGMAs applied on every new connection (see core/db.py)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL", # Readers don't block the writer and vice versa. Persistent: stored in the db file
+    "synchronous": "NORMAL", # Safe with WAL (no corruption, may lose the last commits on power loss) and avoids an fsync per commit
+    "busy_timeout": 20000, # ms. Same as OPTIONS timeout, also covers locks hit inside SQLite (e.g. WAL checkpoints)
+    "temp_store": "MEMORY",
+    "cache_size": -20000, # KiB (negative) of page cache per connection
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# A shared cache (Redis) is needed on production so all gunicorn workers and replicas share the FHIR rate limiter and cached data.
+# Without REDIS_URL each worker process gets its own in-memory cache.
+REDIS_URL = os.environ.get("REDIS_URL", "")
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # APP domain Name
 APP_DOMAIN_NAME = "skinsight-care.com"
 
@@ -131,9 +192,21 @@ AUTH_USER_MODEL = 'core.User'
 
 # Authentication settings
 AUTHENTICATION_BACKENDS = (
-    'django.contrib.auth.backends.ModelBackend',
-    'allauth.account.auth_backends.AuthenticationBackend',  # enables OAuth2
+    'core.auth_backends.CachedModelBackend', # django.contrib.auth.backends.ModelBackend serving request.user from cache
+    'core.auth_backends.CachedAllauthBackend',  # enables OAuth2
 )
+# Sessions logged in with the stock backends are moved to their cached subclasses (core.middleware.LegacyAuthBackendMiddleware) instead of being logged out
+LEGACY_AUTHENTICATION_BACKENDS = {
+    'django.contrib.auth.backends.ModelBackend': 'core.auth_backends.CachedModelBackend',
+    'allauth.account.auth_backends.AuthenticationBackend': 'core.auth_backends.CachedAllauthBackend',
+}
+
+# Users and sessions are only cached in a cache shared by all workers (REDIS_URL). With one LocMemCache per worker, a logout,
+# deactivation, password or role change would only be seen by the worker that handled it: the others would keep the stale copy.
+USER_CACHE_SECONDS = 300 if REDIS_URL else 0 # Logged in users (with their roles) are cached this long, invalidated on user/groups change. 0 disables
+
+# With a shared cache, sessions are read from it and only hit the database on a cache miss (writes go to both)
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db' if REDIS_URL else 'django.contrib.sessions.backends.db'
 
 # Drive the redirect logic on user login based on user's group (admin, professional, client, other)
 LOGIN_REDIRECT_URL = '/' # This is the default redirect URL after login, it will be overridden by the adapter logic
@@ -222,6 +295,54 @@ CARE_CHART_MAX_N_QUESTIONNAIRES = 6 # The max number of quiz submissions to show
 CARE_CHART_ANSWER_INITIAL_VAL = 5 # Represents the "middle" value on the scale, and quiz submissions answers are accumalated on top of it
 CARE_CHART_ANSWER_MIN_VAL = 2
 CARE_CHART_ANSWER_MAX_VAL = 10
+CARE_CHART_MAX_POINTS = 120 # Longer care charts are downsampled to this many check-ups (LTTB, keeps trends). 0 disables
+CARE_SUMMARIES_CACHE_SECONDS = 60 * 60 # Professional dashboard check-up summaries are cached this long. Quiz submissions invalidate them explicitly, this is only a safety net
+
+# ==== FHIR Transport Config =====
+FHIR_REQUEST_DEADLINE_SECONDS = 20 # Total budget for all FHIR calls made while serving one request. Keep below gunicorn worker timeout (30s)
+FHIR_CONNECT_TIMEOUT_SECONDS = 3.05 # Upper bound of TCP connect timeout of a single FHIR call
+FHIR_READ_TIMEOUT_SECONDS = 10 # Upper bound of read timeout of a single FHIR call
+FHIR_MIN_CALL_BUDGET_SECONDS = 0.1 # Don't start a FHIR call if less than this is left of the request budget
+FHIR_HEDGED_READS = bool(int(os.environ.get("FHIR_HEDGED_READS", 0))) # Send a backup GET if the first one is slow -> bounds tail latency
+FHIR_HEDGE_DELAY_SECONDS = 0.8 # Wait this long for a GET response before sending the hedged copy (~p95 of FHIR reads)
+FHIR_HEDGE_MAX_WORKERS = 8 # Threads per process used to send hedged GETs
+FHIR_MAX_RETRIES = 3 # Retries of idempotent calls on 429, 5xx and connection errors
+FHIR_RETRY_BASE_DELAY_SECONDS = 0.2 # Full-jitter exponential backoff: sleep random(0, base * 2^attempt)
+FHIR_RETRY_MAX_DELAY_SECONDS = 5 # Don't retry if FHIR asks to wait longer than this (Retry-After)
+FHIR_CIRCUIT_FAILURE_THRESHOLD = 5 # Consecutive failures of an endpoint (e.g. Patient) that open its circuit
+FHIR_CIRCUIT_RESET_TIMEOUT_SECONDS = 30 # Time an open circuit fails fast before letting a probe call through
+FHIR_RATE_LIMIT_PER_SECOND = int(os.environ.get("FHIR_RATE_LIMIT_PER_SECOND", 50)) # FHIR calls per second shared by all workers. Keep under the provisioned throughput. 0 disables
+FHIR_SEARCH_PAGE_SIZE = 1000 # _count of searches that read all pages of their results (1000 is the Azure FHIR maximum)
+FHIR_BATCH_MAX_ENTRIES = 500 # Entries per batch Bundle (bulk actions split larger sets). Azure FHIR rejects bundles above its configured limit (500 by default)
+FHIR_PRIORITY_SHARES = { # Share of FHIR_RATE_LIMIT_PER_SECOND each priority class may use -> lower classes yield to interactive traffic
+    "interactive": 1.0,
+    "background": 0.6,
+    "bulk": 0.3,
+}
+
+# ==== FHIR Outbox Config =====
+FHIR_OUTBOX_DISPATCH_AFTER_ENQUEUE = True # Deliver each quiz submission right away in a background thread (the dispatch_fhir_outbox command retries leftovers)
+FHIR_OUTBOX_MAX_ATTEMPTS = 20 # Deliveries tried before an entry is marked failed
+FHIR_OUTBOX_RETRY_BASE_SECONDS = 5 # Backoff between delivery attempts: full jitter, doubling from this ..
+FHIR_OUTBOX_RETRY_MAX_SECONDS = 600 # .. up to this
+FHIR_OUTBOX_LEASE_SECONDS = 60 # An entry being delivered is skipped by other dispatchers this long
+FHIR_OUTBOX_KEEP_DELIVERED_DAYS = 7 # Delivered entries are purged by the dispatch_fhir_outbox command after this
+
+# ==== Outcome Analytics Config =====
+OUTCOME_ANALYTICS_SAFETY_LAG_SECONDS = 2 * 60 # A run only processes changes older than this: concurrent FHIR writes may become visible out of meta.lastUpdated order
+OUTCOME_ANALYTICS_LEASE_SECONDS = 10 * 60 # A run holds the job this long, renewed with every page. Overlapping runs are skipped
+
+# ==== FHIR Read Mirror Config =====
+FHIR_MIRROR_ENABLED = bool(int(os.environ.get("FHIR_MIRROR_ENABLED", 0))) # Serve reads of rarely changing resources from a local copy kept current by the sync_fhir_mirror command
+FHIR_MIRROR_RESOURCE_TYPES = ["Practitioner", "PlanDefinition", "Questionnaire"] # Mirrored resource types
+FHIR_MIRROR_MAX_STALENESS_SECONDS = 5 * 60 # Reads go to FHIR when the last complete sync of a type started longer ago than this. Run the sync well within it (e.g. every minute)
+FHIR_MIRROR_SAFETY_LAG_SECONDS = 60 # Each sync reads the changes of this last period again: concurrent FHIR writes may become visible out of meta.lastUpdated order
+
+# ==== Homepage Config =====
+HOME_DIRECTORY_CACHE_SECONDS = 60 * 60 # Rendered professionals directory is cached per language. Changes invalidate it explicitly, this is only a safety net
+HOME_DIRECTORY_FRESH_SECONDS = 5 * 60 # Directory data older than this is refreshed in the background while the stale copy is served
+STALE_WHILE_REVALIDATE_LOCK_SECONDS = 60 # Max time of one background refresh. Only one worker refreshes a value at a time
+STALE_WHILE_REVALIDATE_COLD_WAIT_SECONDS = 15 # On a cold cache, requests wait this long for the worker building the value instead of building it too
 
 # ==== Plans, Subscriptions, Payment ====
 PLATFORM_CURRENCY = "USD"  # Currency used for platform plans and subscriptions
@@ -1,107 +1,99 @@
 from django.conf import settings
+from urllib.parse import urlencode
 
 from . import questionnaires
 from . import platform_plans
 from . import fhir
-
-# Populate active quiz as Questionnaire FHIR resource on app startup if not populated
-# This is to create QuestionnaireResponses FHIR resources (quiz form submits) that are linked to Questionnaire and ensure compliant FHIR.
-# However, when loading quiz_page, the questions will be loaded from file questionnaires.py (from which we populate initially) to minimize calls to FHIR
-def init_quiz_questionnaire_fhir_resource():
-    
-    print("> Populate active quiz as Questionnaire FHIR resource on app startup if not populated..")
-    new_questoinnaire_title = settings.ACTIVE_QUESTIONNAIRE_TITLE
-    if new_questoinnaire_title is None:
-        print("\t- No active questionnnaire ID provided to populate. No quiz will be populated.")
-    else:
-        try:
-
-            # TODO: remove for production
-            DELETE_DUPLICATE_QUESTIONNAIRE = False
-            if DELETE_DUPLICATE_QUESTIONNAIRE:
-                try:
-                    print("\t- Delete existing questionnaire with same title..")
-                    fhir.delete_questionnaire(new_questoinnaire_title)
-                    print("\t- Deleted successfully")
-                except Exception as e:
-                    print("Failed to delete existing quiz: " + str(e))
-            
-
-            # Check if questionnaire with already populated as FHIR resource
-            print("\t- Check if quiz with title exists..")
-            questionnaire = fhir.get_questionnaire(new_questoinnaire_title)
-
-            if questionnaire is None: # If not populated as FHIR resource -> Create FHIR resource
-
-                print("\t- A Questionnaire with the same title has not been populated to FHIR server. will create FHIR resource..")
-                questions = questionnaires.get_questionnaire(new_questoinnaire_title)
-                
-                print("\t- Create questionnaire FHIR resource..")
-                
-                questionnaire_fhir_id = fhir.create_questionnaire(title=new_questoinnaire_title, questions=questions)
-                print(f"\t- Successfully Created {{new_questionnaire_title}} quiz as Questionnaire FHIR resource with ID: {questionnaire_fhir_id}")
-
-            else: # If questionnnaire is already populated as FHIR resource
-                print("\t- A Questionnaire with the same title has already been populated as questionnaire FHIR resource.")
-                print("\t- Aborted questtionnaire FHIR resource creation.")
-
-        except Exception as e:
-            print("Failed to populate quiz: " + str(e))
-
-
-# Initialize platform plans (e.g. Basic, Standard, Premium)
-def init_platform_plans():
-
-    print("> Populate platform plans as PlanDefinition(s) FHIR resource on app startup if not populated..")
-
-    try:
-
-        # Get existing plans
-        platform_plans_fhir_ids = platform_plans.platform_plans.keys()
-        existing_plans = fhir.get_platform_plan_definitions(plan_fhir_ids=platform_plans_fhir_ids)
-        
-        if existing_plans:
-
-            print(f"\t- {len(existing_plans)} existing platform plans with IDs:", [plan["id"] for plan in existing_plans])
-
-            # TODO: remove for production
-            DELETE_EXISTING_PLANS = False
-            if DELETE_EXISTING_PLANS:
-                try:
-                    print("\t- Delete existing platform plans..")
-                    for plan in existing_plans:
-                        plan_id = plan["id"]
-                        plan_title = plan["title"]
-                        fhir.delete_plan_definition(plan_definition_id=plan_id)
-                        print(f"\t- Deleted plan {plan_title} successfully")
-                    
-                except Exception as e:
-                    print("\t ! Failed to delete existing plan: " + str(e))
-        
-            else: # If plan is already populated as FHIR resource
-                print("\t- One of more platform plans have already been populated as PlanDefinition FHIR resource(s).")
-                print("\t- Aborted PlanDefinition FHIR resource creation.")
-                return
-
-        print("\t- Create platform plan(s) PlanDefinition FHIR resource(s)..")
-
-        author_id = settings.PLATFORM_ADMIN_FHIR_ID # On startup there is no logged in user, so we use platform admin FHIR ID
-        creator_django_user_id = 0
-
-        existing_plans = platform_plans.platform_plans
-        for plan_title, plan_details in existing_plans.items():
-            plan_id = fhir.create_plan_definition(
-                plan_definition_type=fhir.PlanDefinitionType.PLATFORM_TO_PROFESSIONALS_PLAN,
-                author_id= author_id, 
-                creator_django_user_id=creator_django_user_id,
-                title=plan_title,
-                description=plan_title,
-                plan_details=plan_details
-            )
-            print(f"\t- Successfully Created {plan_title} plan as PlanDefinition FHIR resource with ID: {plan['id']}")
-        
-        print("\t- Successfully populated all platform plans as PlanDefinition FHIR resources.")
-
-
-    except Exception as e:
-        print("Failed to populate platform plan: " + str(e))
\ No newline at end of file
+from . import fhir_transport
+
+# Seed FHIR resources the app depends on: the active quiz (Questionnaire) and platform plans (PlanDefinition).
+# This runs once per deploy via `python manage.py seed_fhir`, never on worker boot, and is safe to re-run:
+# - The Questionnaire uses a conditional create (If-None-Exist on its title) -> created only if missing.
+#   QuestionnaireResponses (quiz form submits) are linked to it to keep FHIR compliant. When loading quiz_page,
+#   the questions are still loaded from questionnaires.py (from which we populate) to minimize calls to FHIR.
+# - Platform plans have deterministic IDs derived from their title and are PUT by ID -> kept in sync with platform_plans.py.
+# All entries are sent in a single batch Bundle.
+
+
+def build_quiz_questionnaire_seed_entries() -> list:
+    """
+    Returns:
+        list: Batch Bundle entry that creates the active quiz as Questionnaire FHIR resource if no Questionnaire with its title exists.
+    """
+    questionnaire_title = settings.ACTIVE_QUESTIONNAIRE_TITLE
+    if questionnaire_title is None:
+        print("\t- No active questionnnaire title provided to populate. No quiz will be populated.")
+        return []
+
+    questions = questionnaires.get_questionnaire(questionnaire_title)
+    questionnaire_resource = fhir.build_questionnaire_resource(title=questionnaire_title, questions=questions)
+
+    return [{
+        "resource": questionnaire_resource,
+        "request": {
+            "method": "POST",
+            "url": "Questionnaire",
+            "ifNoneExist": urlencode({"title": questionnaire_title}),
+        },
+    }]
+
+
+def build_platform_plans_seed_entries() -> list:
+    """
+    Returns:
+        list: Batch Bundle entries that PUT every platform plan (e.g. Basic, Standard, Premium) as PlanDefinition by its ID.
+    """
+    author_id = settings.PLATFORM_ADMIN_FHIR_ID # On seeding there is no logged in user, so we use platform admin FHIR ID
+    creator_django_user_id = 0
+
+    entries = []
+    for plan_title, plan_details in platform_plans.platform_plans.items():
+        plan_definition = fhir.build_plan_definition(
+            plan_definition_type=fhir.PlanDefinitionType.PLATFORM_TO_PROFESSIONALS_PLAN,
+            author_id=author_id,
+            creator_django_user_id=creator_django_user_id,
+            title=plan_title,
+            description=plan_title,
+            plan_details=plan_details
+        )
+        entries.append({
+            "resource": plan_definition,
+            "request": {
+                "method": "PUT",
+                "url": f"PlanDefinition/{plan_definition['id']}",
+            },
+        })
+
+    return entries
+
+
+@fhir_transport.priority(fhir_transport.FhirPriority.BULK)
+def seed_fhir_resources() -> list:
+    """
+    Send all seed entries in one batch Bundle.
+
+    Returns:
+        list: Tuples (request url, response status) of entries that failed. Empty if all succeeded.
+    """
+    print("> Seed quiz Questionnaire and platform plans PlanDefinition(s) FHIR resources..")
+
+    entries = build_quiz_questionnaire_seed_entries() + build_platform_plans_seed_entries()
+    if not entries:
+        print("\t- Nothing to seed.")
+        return []
+
+    response_entries = fhir.submit_batch(entries, idempotent=True)
+    if len(response_entries) != len(entries):
+        return [("Bundle", f"Expected {len(entries)} response entries, got {len(response_entries)}")]
+
+    failed = []
+    for entry, response_entry in zip(entries, response_entries):
+        request_url = entry["request"]["url"]
+        status = response_entry.get("response", {}).get("status", "")
+        if fhir.is_batch_entry_successful(response_entry):
+            print(f"\t- {entry['request']['method']} {request_url}: {status}") # 200 OK -> already existed / updated, 201 Created -> created
+        else:
+            print(f"\t ! {entry['request']['method']} {request_url} failed: {status}")
+            failed.append((request_url, status))
+
+    return failed
@@ -0,0 +1,166 @@
+import random
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from . import care_chart
+
+
+# ============================================================================
+# Care chart progressions
+# Both engines of core.care_chart must give exactly the results of the original per-question loop (kept verbatim
+# below), for any scale bounds, on single charts, cohorts and charts continued from a saved state.
+# ============================================================================
+
+def original_progressions(sorted_submissions, n_questions):
+    """The progression loop of utils.create_care_chart_js_data before core.care_chart, kept verbatim as the reference."""
+    INIT_VAL = settings.CARE_CHART_ANSWER_INITIAL_VAL
+    MIN_VAL = settings.CARE_CHART_ANSWER_MIN_VAL
+    MAX_VAL = settings.CARE_CHART_ANSWER_MAX_VAL
+
+    progression_per_question = [[] for _ in range(n_questions)]
+    current_values = [INIT_VAL] * n_questions
+    previous_deltas = [0] * n_questions  # Used to track direction from last step
+
+    for submission in sorted_submissions:
+        # Parse answers from submission
+        answers = {
+            int(item["linkId"]): item["answer"][0].get("valueInteger", 0)
+            for item in submission.get("item", [])
+            if "answer" in item and item["answer"]
+        }
+
+        for i in range(n_questions):
+            qid = i + 1
+            delta = answers.get(qid, 0)
+            prev_delta = previous_deltas[i]
+            current_value = current_values[i]
+
+            if not progression_per_question[i]:  # first entry
+                new_value = current_value + delta
+            else:
+                if prev_delta >= 0:
+                    # If previous was positive or zero, just add
+                    new_value = current_value + delta
+                else:
+                    if delta >= 0:
+                        # Moving toward positive: recovery
+                        new_value = current_value + delta
+                    elif abs(delta) > abs(prev_delta):
+                        # More negative: worsen by delta - prev
+                        worsen = abs(delta) - abs(prev_delta)
+                        new_value = current_value - worsen
+                    elif abs(delta) < abs(prev_delta):
+                        # Less negative: improve by prev - delta
+                        improve = abs(prev_delta) - abs(delta)
+                        new_value = current_value + improve
+                    else:
+                        # Same negative: no change
+                        new_value = current_value
+
+            # Clamp to reasonable bounds
+            if new_value > MAX_VAL:
+                new_value = MAX_VAL
+            elif new_value < MIN_VAL:
+                new_value = MIN_VAL
+
+            new_value = max(0, new_value)
+            progression_per_question[i].append(new_value)
+
+            # Update trackers
+            current_values[i] = new_value
+            previous_deltas[i] = delta
+
+    return progression_per_question
+
+
+def build_submissions(rng: random.Random, n_submissions: int, n_questions: int) -> list:
+    """Random quiz submissions: answers in [-3, 3], with unanswered questions and out of range linkIds mixed in."""
+    submissions = []
+    for _ in range(n_submissions):
+        items = []
+        for q in range(n_questions):
+            if rng.random() < 0.1:
+                items.append({"linkId": str(q + 1), "answer": []}) # unanswered
+            elif rng.random() < 0.9:
+                items.append({"linkId": str(q + 1), "answer": [{"valueInteger": rng.randint(-3, 3)}]})
+        if rng.random() < 0.05:
+            items.append({"linkId": str(n_questions + 1), "answer": [{"valueInteger": 3}]}) # not a question of the chart
+        rng.shuffle(items)
+        submissions.append({"resourceType": "QuestionnaireResponse", "item": items})
+    return submissions
+
+
+class CareChartProgressionsTests(SimpleTestCase):
+    N_CASES = 200
+
+    def random_cases(self, rng: random.Random):
+        """Random scale bounds (settings to override), number of questions and cohort of histories."""
+        for _ in range(self.N_CASES):
+            min_val = rng.randint(-2, 4)
+            max_val = rng.randint(min_val, 12)
+            bounds = {
+                "CARE_CHART_ANSWER_MIN_VAL": min_val,
+                "CARE_CHART_ANSWER_MAX_VAL": max_val,
+                "CARE_CHART_ANSWER_INITIAL_VAL": rng.randint(min_val - 2, max_val + 2),
+            }
+            n_questions = rng.randint(0, 15)
+            cohort = {f"patient-{i}": build_submissions(rng, rng.randint(0, 30), n_questions) for i in range(rng.randint(1, 6))}
+            yield bounds, n_questions, cohort
+
+    def check_engine(self, seed: int):
+        rng = random.Random(seed)
+        for bounds, n_questions, cohort in self.random_cases(rng):
+            with self.subTest(n_questions=n_questions, **bounds), override_settings(**bounds):
+                self.check_case(rng, n_questions, cohort)
+
+    def check_case(self, rng: random.Random, n_questions: int, cohort: dict):
+        expected = {patient_id: original_progressions(submissions, n_questions) for patient_id, submissions in cohort.items()}
+
+        for patient_id, submissions in cohort.items():
+            self.assertEqual(care_chart.compute_progressions(submissions, n_questions), expected[patient_id])
+
+        expected_cohort = {patient_id: progressions for patient_id, progressions in expected.items() if cohort[patient_id]}
+        self.assertEqual(care_chart.compute_cohort_progressions(cohort, n_questions), expected_cohort)
+
+        # Continued from the state after a first part of the history (incremental outcome aggregation)
+        deltas_by_subject = {patient_id: care_chart.get_answer_deltas(submissions, n_questions) for patient_id, submissions in cohort.items()}
+        splits = {patient_id: rng.randint(0, len(deltas)) for patient_id, deltas in deltas_by_subject.items()}
+        first_parts = care_chart.compute_cohort_progressions_from_deltas(
+            {patient_id: deltas[:splits[patient_id]] for patient_id, deltas in deltas_by_subject.items()}, n_questions
+        )
+        initial_states = {
+            patient_id: care_chart.ProgressionState(
+                values=[progression[-1] for progression in progressions],
+                prev_deltas=deltas_by_subject[patient_id][splits[patient_id] - 1],
+            )
+            for patient_id, progressions in first_parts.items()
+        }
+        second_parts = care_chart.compute_cohort_progressions_from_deltas(
+            {patient_id: deltas[splits[patient_id]:] for patient_id, deltas in deltas_by_subject.items()}, n_questions, initial_states
+        )
+        no_progressions = [[] for _ in range(n_questions)]
+        for patient_id, progressions in expected_cohort.items():
+            continued = [
+                first + second
+                for first, second in zip(first_parts.get(patient_id, no_progressions), second_parts.get(patient_id, no_progressions))
+            ]
+            self.assertEqual(continued, progressions)
+
+    def test_python_engine_matches_original_loop(self):
+        with mock.patch.object(care_chart, "np", None):
+            self.check_engine(seed=0)
+
+    @skipIf(care_chart.np is None, "numpy is not installed")
+    def test_numpy_engine_matches_original_loop(self):
+        with mock.patch.object(care_chart, "NUMPY_MIN_CHECKUPS", 0): # Short charts too
+            self.check_engine(seed=1)
+
+    def test_reference_engine_matches_original_loop(self):
+        rng = random.Random(2)
+        for bounds, n_questions, cohort in self.random_cases(rng):
+            with self.subTest(n_questions=n_questions, **bounds), override_settings(**bounds):
+                for submissions in cohort.values():
+                    deltas = care_chart.get_answer_deltas(submissions, n_questions)
+                    self.assertEqual(care_chart._compute_progressions_python(deltas, n_questions), original_progressions(submissions, n_questions))
@@ -39,6 +39,8 @@ urlpatterns = [
     path('admin/dashboard', views.admin_dashboard_view, name='admin_dashboard'),  # this makes '/admin/dashboard' point to your admin dashboard view
     path('admin/quiz_populate/', views.quiz_populate_view, name='quiz_populate'),
     path('admin/quiz_deactivate/<str:questionnaire_title>/', views.quiz_deactivate_view, name='quiz_deactivate'),
+    path('admin/fhir-metrics', views.fhir_metrics_view, name='fhir_metrics'),
+    path('admin/bulk-account-status', views.bulk_account_status_view, name='bulk_account_status'),  # activate/deactivate selected professionals or clients at once
 
     # Professional URLs
     path('professional/dashboard', views.professional_dashboard_view, name='professional_dashboard'),  # this makes '/professional/dashboard' point to your professional dashboard view
@@ -59,6 +61,7 @@ urlpatterns = [
 
     path('client/quiz-start/<str:client_fhir_id>/', views.quiz_start_view, name='quiz_start'),  # this makes '/quizz_start' point to your quizz start view
     path('client/care-chart/<str:client_id>/', views.care_chart_view, name='care_chart'), 
+    path('client/care-chart/<str:client_id>/data', views.care_chart_data_view, name='care_chart_data'),
     
 
     # General URLs
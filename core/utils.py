@@ -3,11 +3,13 @@ from django.contrib.auth.models import Group
 from django.shortcuts import redirect
 from django.core.exceptions import PermissionDenied
 
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Dict
 from django.utils.translation import gettext_lazy as _
 
 from .models import User
+from . import caching
+from . import care_chart
 
 
 
@@ -40,6 +42,24 @@ def get_fhir_resource_extension_value(extensions: list, target_url: str):
 def email_exists(email):
     return User.objects.filter(email=email).exists()
 
+def get_user_roles(user) -> frozenset:
+    """
+    Get the names of the groups (roles: admin, professional, client) of a user.
+    Loaded once per user object and kept on it, so they are cached along with the user (see core/auth_backends.py).
+
+    Args:
+        user: Django user (can be anonymous)
+
+    Returns:
+        frozenset: Group names of the user
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    if getattr(user, "_roles", None) is None:
+        user._roles = frozenset(user.groups.values_list("name", flat=True))
+    return user._roles
+
 def get_user_fhir_id(request):
     """
     Get the FHIR resource ID for the logged-in user if they belong to 'professional' or 'client' group.
@@ -58,12 +78,13 @@ def get_user_fhir_id(request):
 
     user = request.user
 
-    if user.groups.filter(name="professional").exists() or user.groups.filter(name="client").exists():
+    user_roles = get_user_roles(user)
+    if "professional" in user_roles or "client" in user_roles:
         return user.fhir_resource_id
 
     else:
         raise PermissionDenied(
-            f"The logged-in user (group: {user.groups.first().name if user.groups.exists() else 'none'}) "
+            f"The logged-in user (group: {next(iter(user_roles), 'none')}) "
             f"doesn't have an associated FHIR resource ID."
         )
 
@@ -111,65 +132,11 @@ def create_care_chart_js_data(sorted_submissions: List[dict], questionnaire_ques
         for sub in sorted_submissions
     ]
 
-    # Initialize progressions
     n_questions = len(questionnaire_questions)
-
     INIT_VAL = settings.CARE_CHART_ANSWER_INITIAL_VAL # represents the "middle" on the scale
-    MIN_VAL = settings.CARE_CHART_ANSWER_MIN_VAL # Answers can't be larget than this value
-    MAX_VAL = settings.CARE_CHART_ANSWER_MAX_VAL # Answers can't be smaller than this value
-
-    progression_per_question = [[] for _ in range(n_questions)]
-    current_values = [INIT_VAL] * n_questions
-    previous_deltas = [0] * n_questions  # Used to track direction from last step
-
-    for submission in sorted_submissions:
-        # Parse answers from submission
-        answers = {
-            int(item["linkId"]): item["answer"][0].get("valueInteger", 0)
-            for item in submission.get("item", [])
-            if "answer" in item and item["answer"]
-        }
 
-        for i in range(n_questions):
-            qid = i + 1
-            delta = answers.get(qid, 0)
-            prev_delta = previous_deltas[i]
-            current_value = current_values[i]
-
-            if not progression_per_question[i]:  # first entry
-                new_value = current_value + delta
-            else:
-                if prev_delta >= 0:
-                    # If previous was positive or zero, just add
-                    new_value = current_value + delta
-                else:
-                    if delta >= 0:
-                        # Moving toward positive: recovery
-                        new_value = current_value + delta
-                    elif abs(delta) > abs(prev_delta):
-                        # More negative: worsen by delta - prev
-                        worsen = abs(delta) - abs(prev_delta)
-                        new_value = current_value - worsen
-                    elif abs(delta) < abs(prev_delta):
-                        # Less negative: improve by prev - delta
-                        improve = abs(prev_delta) - abs(delta)
-                        new_value = current_value + improve
-                    else:
-                        # Same negative: no change
-                        new_value = current_value
-
-            # Clamp to reasonable bounds
-            if new_value > MAX_VAL:
-                new_value = MAX_VAL
-            elif new_value < MIN_VAL:
-                new_value = MIN_VAL
-
-            new_value = max(0, new_value)
-            progression_per_question[i].append(new_value)
-
-            # Update trackers
-            current_values[i] = new_value
-            previous_deltas[i] = delta
+    # Progression values of all questions (see core/care_chart.py)
+    progression_per_question = care_chart.compute_progressions(sorted_submissions, n_questions)
 
     # Build datasets
     datasets = [
@@ -199,6 +166,134 @@ def create_care_chart_js_data(sorted_submissions: List[dict], questionnaire_ques
     }
 
 
+def get_care_chart_js_data_since(care_chart_js_data: dict, sorted_submissions: List[dict], since: datetime) -> dict:
+    """
+    Keep only the chart points of submissions authored after `since`, for incremental care chart fetches.
+    Progression values are cumulative, so `care_chart_js_data` must be computed over the full history first.
+
+    Args:
+        care_chart_js_data (dict): Output of create_care_chart_js_data for `sorted_submissions`.
+        sorted_submissions (List[dict]): QuestionnaireResponses the chart was computed from, sorted by authored date.
+        since (datetime): Only points of submissions authored strictly after this are kept.
+
+    Returns:
+        dict: {"labels", "authored", "datasets": [{"data"}]} with the new points only, datasets in the same order as the full chart.
+    """
+    authored = [submission["authored"] for submission in sorted_submissions]
+    n_padding = len(care_chart_js_data["labels"]) - len(authored) # "Default" timepoint added to charts with a single submission
+
+    new_idxs = [
+        n_padding + i
+        for i, authored_time in enumerate(authored)
+        if datetime.fromisoformat(authored_time).replace(tzinfo=None) > since.replace(tzinfo=None)
+    ]
+
+    return {
+        "labels": [care_chart_js_data["labels"][idx] for idx in new_idxs],
+        "authored": [authored[idx - n_padding] for idx in new_idxs],
+        "datasets": [
+            {"data": [dataset["data"][idx] for idx in new_idxs]}
+            for dataset in care_chart_js_data["datasets"]
+        ],
+    }
+
+
+def downsample_care_chart_js_data(care_chart_js_data: dict, max_points: int) -> dict:
+    """
+    Reduce a care chart to at most `max_points` check-ups, keeping its trends (see care_chart.lttb_indices).
+    All datasets share the labels, so the same check-ups are kept for every question: they are selected on the mean
+    of all questions.
+
+    Args:
+        care_chart_js_data (dict): Output of create_care_chart_js_data, optionally with an "authored" list.
+        max_points (int): Max number of points per dataset. 0 disables downsampling.
+
+    Returns:
+        dict: The chart with the same keys, or `care_chart_js_data` itself if it is short enough.
+    """
+    labels = care_chart_js_data["labels"]
+    datasets = care_chart_js_data["datasets"]
+    if not max_points or len(labels) <= max_points or not datasets:
+        return care_chart_js_data
+
+    mean_values = [sum(values) / len(datasets) for values in zip(*(dataset["data"] for dataset in datasets))]
+    kept_idxs = care_chart.lttb_indices(mean_values, max_points)
+
+    downsampled = dict(care_chart_js_data)
+    downsampled["labels"] = [labels[idx] for idx in kept_idxs]
+    if "authored" in care_chart_js_data:
+        downsampled["authored"] = [care_chart_js_data["authored"][idx] for idx in kept_idxs]
+    downsampled["datasets"] = [
+        {**dataset, "data": [dataset["data"][idx] for idx in kept_idxs]}
+        for dataset in datasets
+    ]
+    return downsampled
+
+
+def get_clients_care_summaries(responses_by_subject: Dict[str, List[dict]], questionnaire_questions: List[dict], now: datetime = None) -> Dict[str, dict]:
+    """
+    Summarize the check-ups of many clients at once for the professional dashboard, using their care chart
+    progressions (computed for all clients at once by care_chart.compute_cohort_progressions).
+
+    Args:
+        responses_by_subject (Dict[str, List[dict]]): Patient FHIR ID -> QuestionnaireResponses sorted by authored date
+            (e.g. fhir.get_questionnaire_responses_by_subject).
+        questionnaire_questions (List[dict]): Questions of the questionnaire, as for create_care_chart_js_data.
+        now (datetime): Defines "this month". Defaults to the current UTC time.
+
+    Returns:
+        Dict[str, dict]: Patient FHIR ID -> {
+            "last_checkup" (str): Date of the latest check-up (YYYY-MM-DD),
+            "n_checkups_this_month" (int): Number of check-ups authored this month,
+            "trend" (str): "improving", "worsening" or "stable": mean progression of all questions at the latest
+                check-up compared to the one before (or to the initial value after a first check-up)
+        }
+    """
+    now = now or datetime.now(timezone.utc)
+    now = now.astimezone(timezone.utc) if now.tzinfo else now.replace(tzinfo=timezone.utc)
+
+    # Progressions of all clients at once (see core/care_chart.py)
+    n_questions = len(questionnaire_questions)
+    progressions_by_subject = care_chart.compute_cohort_progressions(responses_by_subject, n_questions)
+
+    summaries = {}
+    for patient_id, sorted_submissions in responses_by_subject.items():
+        if not sorted_submissions:
+            continue
+
+        # authored is stored in UTC, with or without offset
+        authored_times = [datetime.fromisoformat(submission["authored"]) for submission in sorted_submissions]
+        authored_times = [
+            authored_time.astimezone(timezone.utc) if authored_time.tzinfo else authored_time.replace(tzinfo=timezone.utc)
+            for authored_time in authored_times
+        ]
+
+        trend = "stable"
+        progression_per_question = progressions_by_subject[patient_id]
+        if progression_per_question:
+            latest_mean = sum(progression[-1] for progression in progression_per_question) / n_questions
+            # A first check-up is compared to the initial value, like the "Default" point of its care chart
+            previous_mean = sum(
+                progression[-2] if len(progression) > 1 else settings.CARE_CHART_ANSWER_INITIAL_VAL
+                for progression in progression_per_question
+            ) / n_questions
+            if latest_mean > previous_mean:
+                trend = "improving"
+            elif latest_mean < previous_mean:
+                trend = "worsening"
+
+        summaries[patient_id] = {
+            "last_checkup": authored_times[-1].date().isoformat(),
+            "n_checkups_this_month": sum(
+                1 for authored_time in authored_times
+                if (authored_time.year, authored_time.month) == (now.year, now.month)
+            ),
+            "trend": trend,
+        }
+
+    return summaries
+
+
 def get_professional_to_clients_plan_details_as_dict(plan_definition: dict):
     plan_extensions = plan_definition.get("extension", [])
 
@@ -242,64 +337,77 @@ def get_whatsapp_number(fhir_resource_obj):
                         return telecom.get("value", "")
     raise Exception(_("Cannot find WhatsApp number for this FHIR resource."))
 
+def _get_users_by_fhir_resource_id_queryset(fhir_resource_ids):
+    return User.objects.filter(fhir_resource_id__in=fhir_resource_ids).exclude(username="admin") # TODO: Remove exclude for produciton. This is a temp fix because admin is using exisiting  fhir resource ids to test the app 
+
 def get_user_by_fhir_resource_id(fhir_resource_id):
-    user = User.objects.filter(fhir_resource_id=fhir_resource_id).exclude(username="admin").first() # TODO: Remove exclude for produciton. This is a temp fix because admin is using exisiting  fhir resource ids to test the app 
+    user = _get_users_by_fhir_resource_id_queryset([fhir_resource_id]).first()
     return user
 
+def get_users_by_fhir_resource_ids(fhir_resource_ids) -> Dict[str, User]:
+    """
+    Bulk version of get_user_by_fhir_resource_id: fetch the users of many FHIR resources in a single (indexed) query.
+
+    Args:
+        fhir_resource_ids (Iterable[str]): FHIR resource IDs of the users.
+
+    Returns:
+        Dict[str, User]: FHIR resource ID -> user. IDs without a user are missing from the dict.
+    """
+    users = dict()
+    for user in _get_users_by_fhir_resource_id_queryset(set(fhir_resource_ids)).order_by("-pk"):
+        users[user.fhir_resource_id] = user # Ordered so the first user (like .first()) wins on duplicates
+    return users
+
 # Plan IDs are stored in Django User to minimize FHIR queries and search
+# Getters read only the requested column and setters write it with a single UPDATE, instead of loading and saving the full user
 
-def set_professional_platform_plan_id(professional_fhir_id, plan_fhir_id):
-    user = get_user_by_fhir_resource_id(professional_fhir_id)
-    if not user:
+def _get_user_field(fhir_resource_id, field_name):
+    # Same user as get_user_by_fhir_resource_id (.first() -> lowest pk) when several share the FHIR resource ID
+    values = _get_users_by_fhir_resource_id_queryset([fhir_resource_id]).order_by("pk").values_list(field_name, flat=True)[:1]
+    if not values:
         raise Exception ("Cannot find user")
-    user.platform_plan_id = plan_fhir_id
-    user.save()
+    return values[0]
 
-def get_professional_platform_plan_id(professional_fhir_id):
-    user = get_user_by_fhir_resource_id(professional_fhir_id)
-    if not user:
+def _set_user_field(fhir_resource_id, field_name, value):
+    user_ids = list(_get_users_by_fhir_resource_id_queryset([fhir_resource_id]).order_by("pk").values_list("pk", flat=True)[:1])
+    if not user_ids:
         raise Exception ("Cannot find user")
+    User.objects.filter(pk=user_ids[0]).update(**{field_name: value})
+    caching.invalidate_cached_users(user_ids) # update() skips post_save
 
-    if not hasattr(user, 'platform_plan_id'):
-        return ""
-    
-    return user.platform_plan_id
+def set_professional_platform_plan_id(professional_fhir_id, plan_fhir_id):
+    _set_user_field(professional_fhir_id, "platform_plan_id", plan_fhir_id)
+
+def get_professional_platform_plan_id(professional_fhir_id):
+    return _get_user_field(professional_fhir_id, "platform_plan_id")
 
 def set_professional_clients_plan_id(professional_fhir_id, plan_fhir_id):
-    user = get_user_by_fhir_resource_id(professional_fhir_id)
-    if not user:
-        raise Exception ("Cannot find user")
-    
-    user.clients_plan_id = plan_fhir_id
-    user.save()
+    _set_user_field(professional_fhir_id, "clients_plan_id", plan_fhir_id)
+
+    caching.invalidate_home_directory() # Clients plans are listed on homepage
 
 def get_professional_clients_plan_id(professional_fhir_id):
-    user = get_user_by_fhir_resource_id(professional_fhir_id)
-    if not user:
-        raise Exception ("Cannot find user")
+    return _get_user_field(professional_fhir_id, "clients_plan_id")
 
-    if not hasattr(user, 'clients_plan_id'):
-        return ""
-    
-    return user.clients_plan_id
+def get_professionals_clients_plan_ids(professional_fhir_ids) -> Dict[str, str]:
+    """
+    Bulk version of get_professional_clients_plan_id, in a single query.
+
+    Args:
+        professional_fhir_ids (Iterable[str]): FHIR IDs of the professionals.
+
+    Returns:
+        Dict[str, str]: professional FHIR ID -> clients plan ID. Professionals without a user are missing from the dict.
+    """
+    users = get_users_by_fhir_resource_ids(professional_fhir_ids)
+    return {fhir_resource_id: user.clients_plan_id for fhir_resource_id, user in users.items()}
 
 def set_client_professional_plan_id(client_fhir_id, plan_fhir_id):
-    user = get_user_by_fhir_resource_id(client_fhir_id)
-    if not user:
-        raise Exception ("Cannot find user")
-    
-    user.professional_plan_id = plan_fhir_id
-    user.save()
+    _set_user_field(client_fhir_id, "professional_plan_id", plan_fhir_id)
 
 def get_client_professional_plan_id(client_fhir_id):
-    user = get_user_by_fhir_resource_id(client_fhir_id)
-    if not user:
-        raise Exception ("Cannot find user")
-
-    if not hasattr(user, 'professional_plan_id'):
-        return ""
-    
-    return user.professional_plan_id
+    return _get_user_field(client_fhir_id, "professional_plan_id")
 
 def render_rating_stars(score: int, max: int = 5):
     if score < 0 or score > max:
@@ -1,4 +1,10 @@
 from django.shortcuts import render, redirect
+from django.http import JsonResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+from django.template.loader import render_to_string
+from django.core.cache import cache
+from django.utils import translation
 from django.urls import reverse
 from django.core.mail import send_mail
 from django.contrib import messages
@@ -6,17 +12,24 @@ from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 
 from django.contrib.auth.decorators import user_passes_test
-from django.core.exceptions import PermissionDenied
+from django.views.decorators.http import require_POST
+from django.core.exceptions import PermissionDenied, ValidationError
 
-import json
 import random
-from datetime import date, timedelta
+import hashlib
+from datetime import date, datetime, timedelta
+from typing import Dict, List
 
 from . import utils as utils
 from . import forms as fms
 from . import fhir as fhir
+from . import fhir_transport
+from . import json_codec
 from . import questionnaires as questionnaires
 from . import platform_plans
+from . import caching
+from . import outbox
+from . import analytics
 
 
 # ==============================================================================
@@ -25,16 +38,16 @@ from . import platform_plans
 # ==============================================================================
 
 def is_admin(user):
-    return user.groups.filter(name='admin').exists()
+    return 'admin' in utils.get_user_roles(user)
 
 def is_professional(user):
-    return user.groups.filter(name='professional').exists()
+    return 'professional' in utils.get_user_roles(user)
 
 def is_admin_or_professional(user):
     return is_admin(user) or is_professional(user)
 
 def is_client(user):
-    return user.groups.filter(name='client').exists()
+    return 'client' in utils.get_user_roles(user)
 
 def is_admin_or_client(user):
     return is_admin(user) or is_client(user)
@@ -47,60 +60,97 @@ def is_dashboard_owner(user):
 
 # ==============================================================================
 
-def home_view(request):
+def get_home_professionals() -> list:
+    """
+    Build the professionals listed on the homepage: active practitioners that have a clients plan.
 
-    practitioners = [] # practitioners info to list on homepage. Empty list if try/except leads to no initiation.
+    Returns:
+        list: Practitioners data (see fhir.list_practitioners) with "clients_plan", "rating" and "n_reviews" added.
+    """
+    # Get all active practitioners
+    practitioners = fhir.list_practitioners(only_active=True)
+    # For each practitioner, add their Client's plan to their data
 
-    try:
+    # Clients plan ids of all practitioners in one query
+    clients_plan_ids = utils.get_professionals_clients_plan_ids(practitioner["practitioner_id"] for practitioner in practitioners)
 
-        # Get all active practitioners
-        practitioners = fhir.list_practitioners(only_active=True)
-        # For each practitioner, add their Client's plan to their data
-        
-        practitioner_idxs_to_remove = [] # Remove practitioners with mising info
-        for i in range(len(practitioners)):
-            practitioner = practitioners[i]
+    practitioner_idxs_to_remove = [] # Remove practitioners with mising info
+    for i in range(len(practitioners)):
+        practitioner = practitioners[i]
 
-            practitioner_id = practitioner["practitioner_id"]
-            try:
-                clients_plan_id = utils.get_professional_clients_plan_id(practitioner_id)
-                clients_plan = fhir.get_plan_definition(clients_plan_id)
+        practitioner_id = practitioner["practitioner_id"]
+        try:
+            clients_plan_id = clients_plan_ids.get(practitioner_id)
+            if not clients_plan_id:
+                practitioner_idxs_to_remove.append(i)
+                continue
 
-                # Only show practitioners with clients plan data.
-                if clients_plan is None:
-                    practitioner_idxs_to_remove.append(i)
-                    
-            except Exception as e:
+            clients_plan = fhir.get_plan_definition(clients_plan_id)
+
+            # Only show practitioners with clients plan data.
+            if clients_plan is None:
                 practitioner_idxs_to_remove.append(i)
+                continue
 
-            
-            practitioners[i]["clients_plan"] = utils.get_professional_to_clients_plan_details_as_dict(clients_plan) # Convert FHIR format to easy to render dict
+        except Exception as e:
+            practitioner_idxs_to_remove.append(i)
+            continue
 
-            # Add rating and n_reviews
-            # TODO: replace this with real data. ! Important: for simulated data, we can't use random to avoid generating new values on refresh. instead we use (i) to set values
-            rating = 5 # Give all 5 till reviews are added
-            n_reviews = (i+1) * int(str(i+1)[-1]) # Example i = 24 -> n_reviews = (24 + 1) * (4) = 100
-            practitioners[i]["rating"] = utils.render_rating_stars(score=rating)
-            practitioners[i]["n_reviews"] = n_reviews
 
-        # Keep only professionals (practitioners) with full info
-        practitioners = [practitioner for i, practitioner in enumerate(practitioners) if i not in practitioner_idxs_to_remove]
-    
+        practitioners[i]["clients_plan"] = utils.get_professional_to_clients_plan_details_as_dict(clients_plan) # Convert FHIR format to easy to render dict
+
+        # Add rating and n_reviews
+        # TODO: replace this with real data. ! Important: for simulated data, we can't use random to avoid generating new values on refresh. instead we use (i) to set values
+        rating = 5 # Give all 5 till reviews are added
+        n_reviews = (i+1) * int(str(i+1)[-1]) # Example i = 24 -> n_reviews = (24 + 1) * (4) = 100
+        practitioners[i]["rating"] = utils.render_rating_stars(score=rating)
+        practitioners[i]["n_reviews"] = n_reviews
+
+    # Keep only professionals (practitioners) with full info
+    practitioners = [practitioner for i, practitioner in enumerate(practitioners) if i not in practitioner_idxs_to_remove]
+
+    return practitioners
+
+def home_view(request):
+
+    professionals_directory_html = "" # Empty directory if try/except leads to no initiation.
+
+    try:
+        # Directory data is served stale-while-revalidate: when outdated it is refreshed in the background and the last good
+        # copy is served meanwhile (also while FHIR is unavailable), so homepage latency doesn't depend on FHIR.
+        stale_while_revalidate_args = {
+            "build": get_home_professionals,
+            "fresh_seconds": settings.HOME_DIRECTORY_FRESH_SECONDS,
+            "on_refreshed": caching.bump_home_directory_version,
+        }
+
+        # The rendered professionals directory is cached per language and invalidated when a professional, their status or their
+        # clients plan changes (see caching.invalidate_home_directory), or when its data got refreshed.
+        cache_key = caching.get_home_directory_cache_key(translation.get_language())
+        professionals_directory_html = cache.get(cache_key)
+
+        if professionals_directory_html is None:
+            practitioners = caching.get_stale_while_revalidate(caching.HOME_DIRECTORY_DATA_KEY, **stale_while_revalidate_args)
+            professionals_directory_html = render_to_string('pages/home_professionals_directory.html', context={"professionals": practitioners}, request=request)
+            cache.set(cache_key, professionals_directory_html, timeout=settings.HOME_DIRECTORY_CACHE_SECONDS)
+        else:
+            caching.refresh_if_stale(caching.HOME_DIRECTORY_DATA_KEY, **stale_while_revalidate_args) # The data entry itself isn't loaded
+
     except Exception as e:
         messages.error(request, _("Error: Unable to get skincare professionals' list."))
         print(f"! Error while fetching homepage practitioners list: ", str(e))
 
-    return render(request, 'pages/home.html', context={"professionals":practitioners})
+    return render(request, 'pages/home.html', context={"professionals_directory_html": professionals_directory_html})
 
 @user_passes_test(is_dashboard_owner, login_url='/auth')
 def dashboard_router_view(request):
     user = request.user
         
-    if user.groups.filter(name='admin').exists():
+    if is_admin(user):
         return redirect('admin_view')
-    elif user.groups.filter(name='professional').exists():
+    elif is_professional(user):
         return redirect('professional_dashboard')
-    elif user.groups.filter(name='client').exists():
+    elif is_client(user):
         return redirect('client_dashboard')
     
 def contact_us_view(request):
@@ -143,13 +193,99 @@ def admin_dashboard_view(request):
     
     clients_table_data = fhir.list_patients(practitioner_fhir_id=None, only_active=False)  # Fetch all clients (of all professionals), including deactivated ones
     practitioners_table_data = fhir.list_practitioners(only_active=False)  # Fetch all practitioners, including deactivated ones
-    
+
+    # Clinic-wide outcomes, precomputed by the aggregate_outcomes command (no FHIR call)
+    outcomes = analytics.get_outcomes_overview(questionnaires.get_questionnaire(questionnaire_title=settings.ACTIVE_QUESTIONNAIRE_TITLE))
+    if outcomes:
+        practitioner_names = {row.practitioner_id: row.full_name for row in practitioners_table_data}
+        for practitioner_outcome in outcomes["per_practitioner"]:
+            practitioner_outcome["full_name"] = practitioner_names.get(practitioner_outcome["practitioner_id"], practitioner_outcome["practitioner_id"])
+
     context = {
-        "clients_table_data": clients_table_data,
-        "practitioners_table_data": practitioners_table_data
+        "clients_table_data": [dict(row) for row in clients_table_data], # Plain dicts for json_script
+        "practitioners_table_data": [dict(row) for row in practitioners_table_data],
+        "outcomes": outcomes,
     }
     return render(request, 'pages/admin/dashboard.html', context=context)
 
+@user_passes_test(is_admin, login_url='/auth')
+@require_POST
+def bulk_account_status_view(request):
+    """Activate/Deactivate the professionals or clients selected on the admin dashboard, with batch requests to FHIR."""
+    form = fms.BulkAccountStatusForm(request.POST)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect('admin_view')
+
+    resource_type = form.cleaned_data['resource_type']
+    resource_ids = form.cleaned_data['resource_ids']
+    active = form.cleaned_data['action'] == 'activate'
+
+    try:
+        if resource_type == 'Practitioner':
+            results = fhir.set_practitioners_active(resource_ids, active)
+        else:
+            results = fhir.set_patients_active(resource_ids, active)
+    except Exception as e:
+        messages.error(request, _("Failed to update accounts: Please contact support. " + str(e)))
+        return redirect('admin_view')
+
+    failed_ids = [resource_id for resource_id, updated in results.items() if not updated]
+    n_updated = len(results) - len(failed_ids)
+    if n_updated:
+        if active:
+            messages.success(request, _("%(count)d account(s) successfully activated.") % {"count": n_updated})
+        else:
+            messages.success(request, _("%(count)d account(s) successfully deactivated.") % {"count": n_updated})
+    if failed_ids:
+        messages.error(request, _("Failed to update %(count)d account(s): %(ids)s") % {"count": len(failed_ids), "ids": ", ".join(failed_ids)})
+
+    return redirect('admin_view')
+
+def get_clients_care_summaries(professional_fhir_id: str, client_ids: List[str]) -> Dict[str, dict]:
+    """
+    Check-up summaries of a professional's clients (see utils.get_clients_care_summaries), cached per professional.
+    Built from one search of all the professional's submissions, plus the ones still in the FHIR outbox (as on care charts).
+
+    Args:
+        professional_fhir_id (str): FHIR Practitioner ID.
+        client_ids (List[str]): FHIR Patient IDs of the professional's clients.
+
+    Returns:
+        Dict[str, dict]: Patient FHIR ID -> summary.
+    """
+    cache_key = caching.get_care_summaries_cache_key(professional_fhir_id)
+    clients_care_summaries = cache.get(cache_key)
+    if clients_care_summaries is not None:
+        return clients_care_summaries
+
+    questionnaire_title = settings.ACTIVE_QUESTIONNAIRE_TITLE
+    responses_by_subject = fhir.get_questionnaire_responses_by_subject(professional_fhir_id, questionnaire_title)
+
+    # Submissions not delivered to FHIR yet count too, so the dashboard agrees with the care charts
+    pending_responses_by_subject = outbox.get_pending_resources_by_subject("QuestionnaireResponse", client_ids)
+    for patient_id, pending_responses in pending_responses_by_subject.items():
+        responses = responses_by_subject.get(patient_id, [])
+        delivered_ids = {questionnaire_response["id"] for questionnaire_response in responses if "id" in questionnaire_response}
+        responses += [
+            questionnaire_response for questionnaire_response in pending_responses
+            if questionnaire_response["id"] not in delivered_ids
+            and questionnaire_response.get("author", {}).get("reference") == f"Practitioner/{professional_fhir_id}"
+            and questionnaire_response.get("questionnaire", "").endswith(f"/{questionnaire_title}")
+        ]
+        if responses:
+            responses.sort(key=lambda questionnaire_response: datetime.fromisoformat(questionnaire_response["authored"]).replace(tzinfo=None))
+            responses_by_subject[patient_id] = responses
+
+    clients_care_summaries = utils.get_clients_care_summaries(
+        responses_by_subject=responses_by_subject,
+        questionnaire_questions=questionnaires.get_questionnaire(questionnaire_title=questionnaire_title),
+    )
+    cache.set(cache_key, clients_care_summaries, timeout=settings.CARE_SUMMARIES_CACHE_SECONDS)
+    return clients_care_summaries
+
 @user_passes_test(is_professional, login_url='/auth')
 def professional_dashboard_view(request):
     professional_fhir_id = request.user.fhir_resource_id  # Get the FHIR-ID associated to logged in professional account
@@ -158,9 +294,22 @@ def professional_dashboard_view(request):
     professional = fhir.get_practitioner(professional_fhir_id)
 
     clients_table_data = fhir.list_patients(practitioner_fhir_id=professional_fhir_id, only_active=False)  # Fetch all clients, including deactivated ones
+
+    # Per-client check-up status (last check-up, check-ups this month, trend)
+    try:
+        clients_care_summaries = get_clients_care_summaries(professional_fhir_id, [client_row.patient_id for client_row in clients_table_data])
+        for client_row in clients_table_data:
+            client_care_summary = clients_care_summaries.get(client_row.patient_id)
+            if client_care_summary:
+                client_row.last_checkup = client_care_summary["last_checkup"]
+                client_row.n_checkups_this_month = client_care_summary["n_checkups_this_month"]
+                client_row.trend = client_care_summary["trend"]
+    except Exception as e:
+        print(f"! Error while building clients check-up summaries: ", str(e)) # The clients table is still shown, without the status columns
+
     context = {
         "professional": professional,
-        "clients_table_data": clients_table_data
+        "clients_table_data": [dict(row) for row in clients_table_data] # Plain dicts for json_script
     }
     return render(request, 'pages/professional/dashboard.html', context=context)
 
@@ -196,39 +345,21 @@ def quiz_start_view(request, client_fhir_id):
     if request.method == "POST":
         
         try:
-            questionnaire_title = settings.ACTIVE_QUESTIONNAIRE_TITLE
-            questions = fhir.get_questionnaire(title=questionnaire_title)
-
-            n_questions = len(questions)
+            # Validate and re-shape submitted answers against the in-memory questionnaire schema (no FHIR read needed)
+            compiled_questionnaire = questionnaires.get_compiled_questionnaire(settings.ACTIVE_QUESTIONNAIRE_TITLE)
+            question_answers = questionnaires.build_question_answers(compiled_questionnaire, request.POST)
 
-            question_answers = []
-
-            # Re-shape submitted form questoin_answers key-values to fit FHIR QuestionnaireResponse resource creation
-            for i in range(n_questions):
-                field_index = i
-                field_name = f"q{field_index}"
-                answer = request.POST.get(field_name)
-
-                value_type = "integer" #parsed.get("value_type", "string")
-                value = int(answer) #parsed.get("value")
-
-                # Map to FHIR's valueX format
-                fhir_value_key = f"value{value_type.capitalize()}"
-                answer_entry = {
-                    "linkId": str(field_index + 1),
-                    #"text": question["q"],
-                    "answer": [{fhir_value_key: value}]
-                }
-
-                question_answers.append(answer_entry)
-
-            response = fhir.create_questionnaire_response(
+            # Stored locally and delivered to FHIR in the background (see core/outbox.py): FHIR latency or outages don't block or lose submissions
+            outbox.enqueue_questionnaire_response(
                 practitioner_id=practitioner_fhir_id,
                 patient_id=patient_fhir_id,
                 question_answers=question_answers
             )
             messages.success(request, _("Your quiz was successfully submitted."))
             return redirect(reverse("care_chart", args=[patient_fhir_id])) # Redirect to care_chart of the client to display progress
+        except ValidationError as e:
+            messages.error(request, _("Submission failed: ") + " ".join(e.messages))
+            return redirect(reverse("quiz_start", args=[patient_fhir_id]))
         except Exception as e:
             messages.error(request, f"Submission failed: {e}")
             return redirect('professional_dashboard') # TODO: change to better redirect. e.g. Professional -> client file page
@@ -253,7 +384,7 @@ def quiz_start_view(request, client_fhir_id):
         context = {
             "professional": practitioner,
             "client": patient,
-            "quiz_questions_json": json.dumps(quiz_questions, ensure_ascii=False)
+            "quiz_questions_json": json_codec.dumps_str(quiz_questions)
         }
 
         return render(request, 'pages/quiz_start.html', context=context)
@@ -264,12 +395,10 @@ def care_chart_view(request, client_id):
     try:
         # Get the FHIR-ID associated to logged in professional account
         practitioner_fhir_id = request.user.fhir_resource_id 
-        # Load professional FHIR data to render name, image, center name ..
-        practitioner = fhir.get_practitioner(practitioner_fhir_id)
         patient_fhir_id = client_id
 
-        # Load client FHIR data
-        patient = fhir.get_patient(patient_fhir_id)
+        # Load client FHIR data, with their professionals (name, image, center name ..) in the same request
+        patient, general_practitioners = fhir.get_patient_with_general_practitioners(patient_fhir_id)
         if not patient:
             messages.error(request, _("Client not found."))
             raise Exception(_("Client not found."))
@@ -280,38 +409,116 @@ def care_chart_view(request, client_id):
         ]
         if not any(practitioner_fhir_id in ref for ref in general_practitioner_refs):
             raise PermissionDenied("You are not authorized to edit this client.")
+
+        practitioner = next(
+            (general_practitioner for general_practitioner in general_practitioners if general_practitioner["id"] == practitioner_fhir_id),
+            None
+        ) or fhir.get_practitioner(practitioner_fhir_id)
     
     except Exception as e:
             messages.error(request, f"Can't load page: {e}")
             return redirect('professional_dashboard')
 
+    # Chart data is fetched asynchronously by care_chart.js from care_chart_data_view, so the page renders without waiting for submissions
+    context = {
+        "professional": practitioner,
+        "client": patient,
+    }
+
+    return render(request, 'pages/client/care_chart.html', context=context)
+
+@user_passes_test(is_professional_or_client, login_url='/auth')
+def care_chart_data_view(request, client_id):
+    """
+    Return the care chart data of a client as JSON (labels and Chart.js datasets), fetched asynchronously by care_chart.js.
+
+    - Supports conditional requests: responses carry an ETag, and a matching If-None-Match gets a 304 without a body.
+    - `?since=<authored>`: only return the check-ups authored after this ISO timestamp (incremental fetch). Every response
+      has an "authored" list so the browser knows which timestamp to send next.
+    """
+    user = request.user
+    user_fhir_id = user.fhir_resource_id
+
+    try:
+        since = request.GET.get("since")
+        since = datetime.fromisoformat(since) if since else None
+    except ValueError:
+        return JsonResponse({"error": _("Invalid 'since' timestamp.")}, status=400)
+
     try:
-        # Get quiz submissions
+        # Patient and all their submissions (every page). Ownership is checked before anything is returned
         questionnaire_title = settings.ACTIVE_QUESTIONNAIRE_TITLE
-        sorted_submissions = fhir.get_questionnaire_responses(
-            practitioner_id=practitioner_fhir_id,
+        patient, questionnaire_responses = fhir.get_patient_with_questionnaire_responses(
             patient_id=client_id,
             questionnaire_title=questionnaire_title
         )
+        if patient is None:
+            raise PermissionDenied
 
-        if sorted_submissions is None:
-            raise Exception(_("No submissions found for specified professional, client, and quiz."))
-        
-        # Create JS Data needed to render chart
+        general_practitioner_refs = [
+            ref.get("reference", "") for ref in patient.get("generalPractitioner", [])
+        ]
+
+        # !Important: Check ownership. A professional can only see charts of their own clients, a client only their own chart.
+        if is_professional(user):
+            if not any(user_fhir_id in ref for ref in general_practitioner_refs):
+                raise PermissionDenied
+            practitioner_fhir_id = user_fhir_id
+        else:
+            if user_fhir_id != client_id or not general_practitioner_refs:
+                raise PermissionDenied
+            practitioner_fhir_id = general_practitioner_refs[0].split("/")[-1]
+
+        # Submissions not delivered to FHIR yet are shown too (optimistically)
+        delivered_ids = {questionnaire_response["id"] for questionnaire_response in questionnaire_responses}
+        pending_questionnaire_responses = [
+            questionnaire_response for questionnaire_response in outbox.get_pending_resources("QuestionnaireResponse", client_id)
+            if questionnaire_response["id"] not in delivered_ids
+            and questionnaire_response.get("questionnaire", "").endswith(f"/{questionnaire_title}")
+        ]
+
+        # Keep quiz submissions of the client's current professional
+        sorted_submissions = sorted(
+            [
+                questionnaire_response for questionnaire_response in questionnaire_responses + pending_questionnaire_responses
+                if questionnaire_response.get("author", {}).get("reference") == f"Practitioner/{practitioner_fhir_id}"
+            ],
+            key=lambda questionnaire_response: datetime.fromisoformat(questionnaire_response["authored"]).replace(tzinfo=None)
+        )
+
+    except PermissionDenied:
+        return JsonResponse({"error": _("You are not authorized to view this chart.")}, status=403)
+    except Exception as e:
+        print(f"! Error while fetching care chart data: ", str(e))
+        return JsonResponse({"error": _("Unable to load care chart data.")}, status=502)
+
+    if sorted_submissions:
+        # Create JS Data needed to render chart. Progression is cumulative, so it is always computed over the full history
         questionnaire_questions = questionnaires.get_questionnaire(questionnaire_title=questionnaire_title)
         care_chart_js_data = utils.create_care_chart_js_data(sorted_submissions=sorted_submissions, questionnaire_questions=questionnaire_questions)
+        care_chart_js_data["authored"] = [None] * (len(care_chart_js_data["labels"]) - len(sorted_submissions)) + [submission["authored"] for submission in sorted_submissions]
 
-        context = {
-            "professional": practitioner,
-            "client": patient,
-            "care_chart_js_data": care_chart_js_data
-        }
-    
-    except Exception as e:
-        messages.error(request, _("Failed to load page: Please contact support. ") + str(e))
-        return redirect('professional_dashboard')
+        if since is not None:
+            care_chart_js_data = utils.get_care_chart_js_data_since(care_chart_js_data, sorted_submissions, since)
+        else:
+            # Long histories are downsampled, so payload and render time don't grow with them. New check-ups (since) are sent as is
+            care_chart_js_data = utils.downsample_care_chart_js_data(care_chart_js_data, max_points=settings.CARE_CHART_MAX_POINTS)
+    else:
+        care_chart_js_data = {"labels": [], "authored": [], "datasets": []}
+    care_chart_js_data["max_points"] = settings.CARE_CHART_MAX_POINTS
 
-    return render(request, 'pages/client/care_chart.html', context=context)
+    content = json_codec.dumps(care_chart_js_data)
+    etag = quote_etag(hashlib.sha1(content).hexdigest())
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type="application/json")
+    response["ETag"] = etag
+    # Revalidated on every fetch (an unchanged chart is a cheap 304): a check-up just submitted must show right away
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ["Cookie", "Accept-Language"])
+
+    return response
 
 @user_passes_test(is_admin, login_url='/auth')
 def client_dashboard_view(request):
@@ -328,29 +535,12 @@ def client_dashboard_view(request):
         linked_professional_fhir_id = client["general_practitioner"][0]["reference"].split("/")[-1]  # Extract FHIR ID from reference
         professional = fhir.get_practitioner(linked_professional_fhir_id).get("resource")
 
-        # Get care chart data
-        # Get quiz submissions for this client that are subimtted by curreent linked professional
-        questionnaire_title = settings.ACTIVE_QUESTIONNAIRE_TITLE
-        sorted_submissions = fhir.get_questionnaire_responses(
-            practitioner_id=linked_professional_fhir_id,
-            patient_id=client_fhir_id,
-            questionnaire_title=questionnaire_title
-        )
-
-        if sorted_submissions is None:
-            raise Exception(_("No submissions found for specified professional, client, and quiz."))
-        
-        # Create JS Data needed to render chart
-        questionnaire_questions = questionnaires.get_questionnaire(questionnaire_title=questionnaire_title)
-        care_chart_js_data = utils.create_care_chart_js_data(sorted_submissions=sorted_submissions, questionnaire_questions=questionnaire_questions)
-
-
+        # Care chart data is fetched asynchronously by care_chart.js from care_chart_data_view, so the page renders without waiting for submissions
         context = {
             "client_fhir_id": client_fhir_id,
             "client": client,
             "professional_fhir_id": linked_professional_fhir_id,
             "professional": professional,
-            "care_chart_js_data": care_chart_js_data
         }
 
         return render(request, 'pages/client/dashboard.html', context=context)
@@ -398,6 +588,15 @@ def quiz_populate_view(request):
     return render(request, 'pages/admin/quiz_populate_to_fhir.html', {"new_questionnaire_title": new_questionnaire_title, "requires_crispy": True})
 
 
+@user_passes_test(is_admin, login_url='/auth')
+def fhir_metrics_view(request):
+    """
+    Return FHIR transport metrics (retries, throttling, circuit breaker states) of the worker process serving the request.
+    It should only be accessible by admin users.
+    """
+    return JsonResponse(fhir_transport.get_metrics())
+
+
 @user_passes_test(is_admin, login_url='/auth')
 def quiz_deactivate_view(request, questionnaire_title):
     """
@@ -449,11 +648,11 @@ def edit_professional_view(request, practitioner_id):
 
     # Deny professional from editiing another professional profile data
     user = request.user
-    if user.groups.filter(name='admin').exists():
+    if is_admin(user):
         pass # allow to edit profile with any passed practitioner_id
 
     # Check if user is in 'professional' group
-    elif user.groups.filter(name='professional').exists():
+    elif is_professional(user):
         if user.fhir_resource_id != practitioner_id:
             raise PermissionDenied
         
@@ -461,9 +660,17 @@ def edit_professional_view(request, practitioner_id):
         form = fms.SkincareProfessionalForm(request.POST, is_edit=True)
         if form.is_valid():
             try:
-                fhir.edit_practitioner(practitioner_fhir_id=practitioner_id, updates=form.cleaned_data)
+                fhir.edit_practitioner(
+                    practitioner_fhir_id=practitioner_id,
+                    updates=form.cleaned_data,
+                    version_id=form.cleaned_data.get('version_id') or None,
+                )
                 messages.success(request, _("Professional successfully updated."))
                 return redirect(reverse('edit_professional', args=[practitioner_id]))
+            except fhir.FhirConflictError:
+                # Someone saved the profile after this form was loaded, reload it so the latest data is shown
+                messages.error(request, _("This profile was changed by someone else meanwhile. Your changes were not saved, please review the latest data and try again."))
+                return redirect(reverse('edit_professional', args=[practitioner_id]))
             except Exception as e:
                 messages.error(request, _("Failed to update professional: Please contact support" + str(e)))
     else:
@@ -496,6 +703,7 @@ def edit_professional_view(request, practitioner_id):
                 'phone_number': phone_number,
                 'whatsapp_number': whatsapp_number,
                 'photo_url': practitioner.get('photo', [{}])[0].get('url', ''),
+                'version_id': practitioner.get('meta', {}).get('versionId', ''),
             }
             form = fms.SkincareProfessionalForm(initial=initial_fields, is_edit=True) # is_edit=True -> remove Email field
         except Exception as e:
@@ -714,9 +922,17 @@ def edit_client_view(request, client_id):
         form = fms.SkincareClientForm(request.POST, is_edit=True)
         if form.is_valid():
             try:
-                fhir.edit_patient(patient_fhir_id=client_id, updates=form.cleaned_data)
+                fhir.edit_patient(
+                    patient_fhir_id=client_id,
+                    updates=form.cleaned_data,
+                    version_id=form.cleaned_data.get('version_id') or None,
+                )
                 messages.success(request, _("Client successfully updated."))
                 return redirect('professional_dashboard')
+            except fhir.FhirConflictError:
+                # Someone saved the client after this form was loaded, reload it so the latest data is shown
+                messages.error(request, _("This client was changed by someone else meanwhile. Your changes were not saved, please review the latest data and try again."))
+                return redirect(reverse('edit_client', args=[client_id]))
             except Exception as e:
                 messages.error(request, _("Failed to update client: Please contact support. " + str(e)))
     else:
@@ -741,6 +957,7 @@ def edit_client_view(request, client_id):
             'phone_number': phone_number,
             'whatsapp_number': whatsapp_number,
             'phone_number': patient.get('telecom', [{}])[0].get('value', ''),
+            'version_id': patient.get('meta', {}).get('versionId', ''),
         }
         form = fms.SkincareClientForm(initial=initial_fields, is_edit=True)
 
@@ -0,0 +1,111 @@
+# Gunicorn configuration for production (loaded by the Dockerfile CMD)
+# https://docs.gunicorn.org/en/stable/settings.html
+#
+# Almost all request time is spent waiting on the Azure FHIR API (I/O bound), so by default we run a few processes
+# with a thread pool each (gthread) instead of single-threaded sync workers.
+# Every value can be overridden by env vars, e.g. to try the configurations compared by benchmarks/bench_gunicorn_workers.py
+
+import os
+import multiprocessing
+
+
+def get_cpu_limit() -> float:
+    """
+    CPUs available to the container: cgroup CPU quota if set (Azure Container Apps sets it), otherwise CPUs the process may run on.
+    """
+    try: # cgroup v2, e.g. "200000 100000" or "max 100000"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(int(quota) / int(period), 1)
+    except (OSError, ValueError):
+        pass
+
+    try: # cgroup v1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return max(quota / period, 1)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+def get_memory_limit_mb():
+    """
+    Memory available to the container in MB (cgroup limit), or None if unlimited/unknown.
+    """
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value == "max":
+            return None
+        limit_mb = int(value) // (1024 * 1024)
+        if limit_mb < 1024 * 1024: # cgroup v1 reports a huge number when unlimited
+            return limit_mb
+    return None
+
+
+def get_workers(cpu_limit: float, memory_limit_mb) -> int:
+    """
+    (2 x CPUs) + 1 processes, but not more than fit in the memory limit (leaving room for the master and page cache).
+    """
+    workers = int(2 * cpu_limit) + 1
+    if memory_limit_mb is not None:
+        worker_memory_mb = int(os.environ.get("GUNICORN_WORKER_MEMORY_MB", 150))
+        workers = min(workers, int(memory_limit_mb * 0.8) // worker_memory_mb)
+    return max(workers, 1)
+
+
+# ==== Server ====
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+# ==== Workers ====
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread") # "sync", "gthread" or "gevent" (needs gevent installed)
+workers = int(os.environ.get("GUNICORN_WORKERS", get_workers(get_cpu_limit(), get_memory_limit_mb())))
+threads = int(os.environ.get("GUNICORN_THREADS", 8)) # Concurrent requests per worker while waiting on FHIR (gthread only)
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100)) # Concurrent requests per worker (gevent only)
+
+# Keep above settings.FHIR_REQUEST_DEADLINE_SECONDS so FHIR deadlines fire (and render an error) before gunicorn kills the worker
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = 100
+
+# Import Django and the app once in the master, then fork: workers share the imported code pages (copy-on-write)
+preload_app = True
+
+# ==== Logging ====
+accesslog = "-"
+errorlog = "-"
+
+
+# ==== Hooks ====
+
+def post_fork(server, worker):
+    """
+    With preload_app the master imported Django before forking. Anything holding sockets or threads must not be shared
+    with the parent, so re-initialize it in every worker:
+    - FHIR HTTP session pools, hedging thread pool, circuit breakers and metrics (core.fhir_transport)
+    - Cache connections (the Azure access token and rate limiter state are read from the cache)
+    - Database connections
+    """
+    from django.core.cache import caches
+    from django.db import connections
+    from core import fhir_transport
+
+    fhir_transport.reset_after_fork()
+    caches.close_all()
+    connections.close_all()
@@ -4,6 +4,51 @@ document.addEventListener("DOMContentLoaded", function () {
     // Professionals & Clients
     const rowsPerPage = 5;
 
+    // Bulk activate/deactivate: selected IDs are kept in a Set, so the selection survives pagination and search.
+    // "Select all" selects every row matching the current search (all pages), e.g. all clients of a clinic.
+    function setupBulkSelection(prefix, getFilteredIds) {
+      const selectedIds = new Set();
+      const dataBody = document.getElementById(prefix + "DataBody");
+      const selectAll = document.getElementById(prefix + "SelectAll");
+      const selectedCount = document.getElementById(prefix + "SelectedCount");
+      const bulkForm = document.getElementById(prefix + "BulkForm");
+      const bulkIds = document.getElementById(prefix + "BulkIds");
+
+      function refresh() {
+        const filteredIds = getFilteredIds();
+        selectedCount.textContent = selectedIds.size;
+        selectAll.checked = filteredIds.length > 0 && filteredIds.every(id => selectedIds.has(id));
+        for (const checkbox of dataBody.querySelectorAll("input[data-row-id]")) {
+          checkbox.checked = selectedIds.has(checkbox.dataset.rowId);
+        }
+      }
+
+      dataBody.addEventListener("change", (event) => {
+        const rowId = event.target.dataset.rowId;
+        if (!rowId) return;
+        if (event.target.checked) selectedIds.add(rowId); else selectedIds.delete(rowId);
+        refresh();
+      });
+
+      selectAll.addEventListener("change", () => {
+        for (const id of getFilteredIds()) {
+          if (selectAll.checked) selectedIds.add(id); else selectedIds.delete(id);
+        }
+        refresh();
+      });
+
+      bulkForm.addEventListener("submit", (event) => {
+        const action = bulkForm.querySelector("select[name=action]").selectedOptions[0].text;
+        if (selectedIds.size === 0 || !confirm(`${action}: ${selectedIds.size}?`)) {
+          event.preventDefault();
+          return;
+        }
+        bulkIds.value = [...selectedIds].join(",");
+      });
+
+      return { refresh, isSelected: (id) => selectedIds.has(id) };
+    }
+
 
     // ==============================================================
     // Professiaonals
@@ -17,6 +62,7 @@ document.addEventListener("DOMContentLoaded", function () {
     const professionalsSearchInput = document.getElementById("professionalsSearchInput");
     const professionalsPaginationPrevBtn = document.getElementById("professionalsPaginationPrevBtn");
     const professionalsPaginationNextBtn = document.getElementById("professionalsPaginationNextBtn");
+    const professionalsSelection = setupBulkSelection("professionals", () => practitionersFilteredData.map(row => row.practitioner_id));
   
     function professionalsRenderTable(data, page = 1) {
       professionalsDataBody.innerHTML = "";
@@ -25,6 +71,7 @@ document.addEventListener("DOMContentLoaded", function () {
       for (const row of paginated) {
         professionalsDataBody.innerHTML += `
           <tr class="hover:bg-gray-50">
+            <td class="px-6 py-4"><input type="checkbox" data-row-id="${row.practitioner_id}" ${professionalsSelection.isSelected(row.practitioner_id) ? "checked" : ""}></td>
             <td class="px-6 py-4">${row.title + " " + row.first_name + " " + row.last_name}<br />(<a href="/professional/edit/${row.practitioner_id}"><button class="text-pink-600 hover:underline">تعديل البيانات</button></a>)</td>
             <td class="px-6 py-4">${row.gender}</td>
             <td class="px-6 py-4">${row.organization_name}</td>
@@ -54,6 +101,7 @@ document.addEventListener("DOMContentLoaded", function () {
       professionalsCurrentPage = 1;
       professionalsRenderTable(practitionersFilteredData, professionalsCurrentPage);
       professionalsUpdatePagination(practitionersFilteredData);
+      professionalsSelection.refresh();
     }
   
     // Initial Render
@@ -93,6 +141,7 @@ document.addEventListener("DOMContentLoaded", function () {
     const clientsSearchInput = document.getElementById("clientsSearchInput");
     const clientsPaginationPrevBtn = document.getElementById("clientsPaginationPrevBtn");
     const clientsPaginationNextBtn = document.getElementById("clientsPaginationNextBtn");
+    const clientsSelection = setupBulkSelection("clients", () => clientsFilteredData.map(row => row.patient_id));
 
     function clientsRenderTable(data, page = 1) {
       clientsDataBody.innerHTML = "";
@@ -101,6 +150,7 @@ document.addEventListener("DOMContentLoaded", function () {
       for (const row of paginated) {
         clientsDataBody.innerHTML += `
           <tr class="hover:bg-gray-50">
+            <td class="px-6 py-4"><input type="checkbox" data-row-id="${row.patient_id}" ${clientsSelection.isSelected(row.patient_id) ? "checked" : ""}></td>
             <td class="px-6 py-4">
               ${row.full_name} (
                 <a href="/client/edit/${row.patient_id}"><button class="text-pink-600 hover:underline">تعديل البيانات</button></a>
@@ -130,6 +180,7 @@ document.addEventListener("DOMContentLoaded", function () {
       clientsCurrentPage = 1;
       clientsRenderTable(clientsFilteredData, clientsCurrentPage);
       clientsUpdatePagination(clientsFilteredData);
+      clientsSelection.refresh();
     }
 
     // Initial Render
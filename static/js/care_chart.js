@@ -1,15 +1,88 @@
 // SkinProfileChart
-const ctx = document.getElementById('skinProfileChart').getContext('2d');
+const canvas = document.getElementById('skinProfileChart');
+const ctx = canvas.getContext('2d');
+const chartDataUrl = canvas.dataset.url; // Care chart JSON endpoint, set in the template
 
+let quizChart = null;
+let lastAuthored = null; // Authored timestamp of the latest check-up on the chart, used to only fetch newer ones
+let hasDefaultTimepoint = false;
+let maxPoints = 0; // Charts longer than this are downsampled by the server, 0 = never
 
-const chartData = JSON.parse(document.getElementById("care-chart-js-data").textContent); // care-chart-js-data is populated in the template using context 
-const datasets = chartData.datasets;
-const labels = chartData.labels; // Represent timeponits (quiz submissions)
 
-const n_questions = datasets.length;
+async function fetchChartData(since) {
+  const url = since ? `${chartDataUrl}?since=${encodeURIComponent(since)}` : chartDataUrl;
+  // Browser HTTP cache revalidates with If-None-Match, so unchanged data costs a 304
+  const response = await fetch(url, { credentials: 'same-origin', headers: { 'Accept': 'application/json' } });
+  if (!response.ok) {
+    throw new Error(`Care chart data request failed: ${response.status}`);
+  }
+  return response.json();
+}
+
+
+function updateLastAuthored(authored) {
+  const known = authored.filter(a => a !== null);
+  if (known.length) {
+    lastAuthored = known[known.length - 1];
+  }
+}
+
+
+async function loadChart() {
+  const chartData = await fetchChartData(null);
+  updateLastAuthored(chartData.authored);
+  hasDefaultTimepoint = chartData.authored.length > 0 && chartData.authored[0] === null;
+  maxPoints = chartData.max_points || 0;
+
+  if (quizChart) {
+    quizChart.data.labels = chartData.labels;
+    quizChart.data.datasets = chartData.datasets;
+    quizChart.update();
+  } else {
+    quizChart = buildChart(chartData.labels, chartData.datasets); // labels represent timeponits (quiz submissions)
+  }
+}
+
+
+async function loadNewCheckUps() {
+  if (!quizChart || !lastAuthored) {
+    return loadChart();
+  }
+
+  const newData = await fetchChartData(lastAuthored);
+  if (!newData.labels.length) {
+    return;
+  }
+
+  // A chart with a single check-up is padded with a "Default" timepoint, which disappears once there are two
+  if (hasDefaultTimepoint || newData.datasets.length !== quizChart.data.datasets.length) {
+    return loadChart();
+  }
+
+  // Appending would grow the chart past the server's limit: reload it downsampled instead
+  if (maxPoints && quizChart.data.labels.length + newData.labels.length > maxPoints) {
+    return loadChart();
+  }
+
+  quizChart.data.labels.push(...newData.labels);
+  newData.datasets.forEach((dataset, i) => quizChart.data.datasets[i].data.push(...dataset.data));
+  updateLastAuthored(newData.authored);
+  quizChart.update();
+}
+
+
+// Pick up check-ups submitted while the tab was in the background
+document.addEventListener('visibilitychange', () => {
+  if (document.visibilityState === 'visible') {
+    loadNewCheckUps().catch(error => console.error(error));
+  }
+});
+
+loadChart().catch(error => console.error(error));
 
 
-const quizChart = new Chart(ctx, {
+function buildChart(labels, datasets) {
+  return new Chart(ctx, {
   type: 'line',
   data: {
     labels: labels,
@@ -67,3 +140,4 @@ const quizChart = new Chart(ctx, {
     }
   }
 });
+}
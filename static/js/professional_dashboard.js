@@ -2,6 +2,7 @@ document.addEventListener("DOMContentLoaded", function () {
   // Your entire script goes here...
 
   const rowsPerPage = 5;
+  const trendIcons = { improving: "🟢 ▲", worsening: "🔴 ▼", stable: "⚪ ▬" }; // Care chart progression at the last check-up
   let currentPage = 1;
   const clients = JSON.parse(document.getElementById("clients-tbl-data").textContent); // clients_tbl_data is populated in the template using context 
   let filteredData = [...clients]; // assign initial data here
@@ -26,6 +27,9 @@ document.addEventListener("DOMContentLoaded", function () {
           <td class="px-6 py-4">${row.gender}</td>
           <td class="px-6 py-4">${row.birth_date}</td>
           <td class="px-6 py-4">${row.active}</td>
+          <td class="px-6 py-4">${row.last_checkup ?? "-"}</td>
+          <td class="px-6 py-4">${row.n_checkups_this_month}</td>
+          <td class="px-6 py-4">${trendIcons[row.trend] ?? "-"}</td>
           <td class="px-6 py-4 space-x-2 rtl:space-x-reverse">
             <a href="/client/quiz-start/${row.patient_id}"><button class="text-pink-600 hover:underline">📝 اختبار جديد</button></a><span class="text-gray-300">|</span>
             <a href="/client/care-chart/${row.patient_id}"><button class="text-pink-600 hover:underline">📈 مخطط العناية</button></a><span class="text-gray-300">|</span>